@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+# Copyright (c) 2017 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Offline benchmark for databases hot paths
+
+    Each scale runs in its own process with a synthetic profile in a
+    temporary XDG_DATA_HOME: no network, no display, user profile is
+    never touched. Results are printed as JSON.
+
+    Usage: ./benchmark.py [--scales 1k,100k,1m] [--iterations 200]
+                          [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from statistics import mean, median
+from time import perf_counter, time
+
+# Synthetic profiles, history rows change, others are fixed
+SCALES = {"1k": 1000, "100k": 100000, "1m": 1000000}
+BOOKMARKS = 10000
+TAGS = 200
+ADBLOCK_HOSTS = 60000
+ADBLOCK_CSS = 40000
+PHISHING = 50000
+EXCEPTIONS = 1000
+# Rows inserted per transaction
+BATCH = 10000
+SEED = 42
+
+
+class Profile:
+    """
+        Fill Eolie databases with synthetic data
+    """
+
+    def __init__(self, history):
+        """
+            Init profile
+            @param history as int (rows)
+        """
+        self.__random = random.Random(SEED)
+        self.__history = history
+        self.__words = [self.__word() for i in range(0, 5000)]
+        self.__netlocs = ["%s.%s" % (self.__word(),
+                                     self.__random.choice(["com", "org",
+                                                           "net", "fr",
+                                                           "de", "io"]))
+                          for i in range(0, max(history // 20, 50))]
+
+    @property
+    def words(self):
+        """
+            Get words used in titles and paths
+            @return [str]
+        """
+        return self.__words
+
+    @property
+    def netlocs(self):
+        """
+            Get history netlocs
+            @return [str]
+        """
+        return self.__netlocs
+
+    def fill_history(self, database):
+        """
+            Add history entries and their access times
+            @param database as DatabaseHistory
+        """
+        now = time()
+        with sqlite3.connect(database.DB_PATH) as sql:
+            for start in range(0, self.__history, BATCH):
+                rows = []
+                atimes = []
+                for i in range(start, min(start + BATCH, self.__history)):
+                    netloc = self.__random.choice(self.__netlocs)
+                    uri = "https://%s/%s/%s-%s" % (netloc,
+                                                   self.__pick(),
+                                                   self.__pick(), i)
+                    mtime = now - self.__random.random() * 31536000
+                    # Few popular pages, many visited once
+                    popularity = int(self.__random.paretovariate(1.5))
+                    rows.append((i + 1, self.__title(), uri, netloc,
+                                 "guid%s" % i, mtime, popularity))
+                    for j in range(0, self.__random.randint(1, 3)):
+                        atimes.append((i + 1, mtime - j * 3600))
+                sql.executemany("INSERT INTO history\
+                                 (id, title, uri, netloc, guid, mtime,\
+                                  popularity)\
+                                 VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                sql.executemany("INSERT INTO history_atime\
+                                 (history_id, atime) VALUES (?, ?)", atimes)
+            sql.execute("ANALYZE")
+
+    def fill_bookmarks(self, database):
+        """
+            Add tagged bookmarks
+            @param database as DatabaseBookmarks
+        """
+        now = time()
+        with sqlite3.connect(database.DB_PATH) as sql:
+            sql.executemany("INSERT INTO tags (id, title) VALUES (?, ?)",
+                            [(i + 1, "%s%s" % (self.__pick(), i))
+                             for i in range(0, TAGS)])
+            bookmarks = []
+            tags = []
+            for i in range(0, BOOKMARKS):
+                uri = "https://%s/%s" % (self.__random.choice(self.__netlocs),
+                                         self.__pick())
+                bookmarks.append((i + 1, self.__title(), uri,
+                                  self.__random.randint(0, 50),
+                                  now - self.__random.random() * 31536000,
+                                  "bookmark%s" % i, now))
+                for tag_id in self.__random.sample(range(1, TAGS + 1),
+                                                   self.__random.randint(0,
+                                                                         3)):
+                    tags.append((i + 1, tag_id))
+            sql.executemany("INSERT INTO bookmarks\
+                             (id, title, uri, popularity, atime, guid, mtime)\
+                             VALUES (?, ?, ?, ?, ?, ?, ?)", bookmarks)
+            sql.executemany("INSERT INTO bookmarks_tags\
+                             (bookmark_id, tag_id) VALUES (?, ?)", tags)
+
+    def fill_adblock(self, database):
+        """
+            Add hosts and css rules, EasyList like sizes
+            @param database as DatabaseAdblock
+            @return blocked hosts as [str]
+        """
+        now = int(time())
+        hosts = ["%s.%s.com" % (self.__word(), self.__word())
+                 for i in range(0, ADBLOCK_HOSTS)]
+        with sqlite3.connect(database.DB_PATH) as sql:
+            sql.executemany("INSERT INTO adblock (dns, mtime) VALUES (?, ?)",
+                            [(host, now) for host in hosts])
+            rules = []
+            for i in range(0, ADBLOCK_CSS):
+                name = "#%s-%s" % (self.__pick(), i)
+                whitelist = ""
+                blacklist = ""
+                # Most rules are generic, some are domain specific
+                if i % 10 == 0:
+                    whitelist = self.__random.choice(self.__netlocs)
+                elif i % 25 == 0:
+                    blacklist = self.__random.choice(self.__netlocs)
+                rules.append((name, whitelist, blacklist, now))
+            sql.executemany("INSERT INTO adblock_css\
+                             (name, whitelist, blacklist, mtime)\
+                             VALUES (?, ?, ?, ?)", rules)
+        return hosts
+
+    def fill_phishing(self, database):
+        """
+            Add phishing uris
+            @param database as DatabasePhishing
+            @return phishing uris as [str]
+        """
+        now = int(time())
+        uris = ["http://%s.%s.net/%s" % (self.__word(), self.__word(),
+                                         self.__pick())
+                for i in range(0, PHISHING)]
+        with sqlite3.connect(database.DB_PATH) as sql:
+            sql.executemany("INSERT INTO phishing (uri, mtime) VALUES (?, ?)",
+                            [(uri, now) for uri in uris])
+        return uris
+
+    def fill_exceptions(self, database):
+        """
+            Add exceptions
+            @param database as DatabaseExceptions
+            @return values as [str]
+        """
+        values = self.__random.sample(self.__netlocs,
+                                      min(EXCEPTIONS, len(self.__netlocs)))
+        for value in values:
+            database.add_exception(value)
+        return values
+
+    def sample(self, values, count):
+        """
+            Get count random values
+            @param values as [object]
+            @param count as int
+            @return [object]
+        """
+        return [self.__random.choice(values) for i in range(0, count)]
+
+#######################
+# PRIVATE             #
+#######################
+    def __word(self):
+        """
+            Get a random word
+            @return str
+        """
+        return "".join(self.__random.choice("abcdefghijklmnopqrstuvwxyz")
+                       for i in range(0, self.__random.randint(4, 10)))
+
+    def __pick(self):
+        """
+            Get a known word
+            @return str
+        """
+        return self.__random.choice(self.__words)
+
+    def __title(self):
+        """
+            Get a random title
+            @return str
+        """
+        return " ".join(self.__pick()
+                        for i in range(0, self.__random.randint(2, 8)))
+
+
+def measure(command, inputs):
+    """
+        Run command for each input
+        @param command as function
+        @param inputs as [tuple]
+        @return {} times in ms
+    """
+    durations = []
+    for args in inputs:
+        started = perf_counter()
+        command(*args)
+        durations.append((perf_counter() - started) * 1000)
+    return get_stats(durations)
+
+
+def get_stats(durations):
+    """
+        Get distribution for durations
+        @param durations as [float] (ms)
+        @return {}
+    """
+    durations = sorted(durations)
+    return {"calls": len(durations),
+            "min_ms": round(durations[0], 4),
+            "median_ms": round(median(durations), 4),
+            "mean_ms": round(mean(durations), 4),
+            "p95_ms": round(durations[int(len(durations) * 0.95)], 4),
+            "p99_ms": round(durations[int(len(durations) * 0.99)], 4),
+            "max_ms": round(durations[-1], 4)}
+
+
+def run_scale(name, iterations):
+    """
+        Create a profile and benchmark it
+        XDG_DATA_HOME must point to an empty directory
+        @param name as str
+        @param iterations as int
+        @return {}
+    """
+    from urllib.parse import urlparse
+    from gi.repository import Gio
+    from eolie.database_history import DatabaseHistory
+    from eolie.database_bookmarks import DatabaseBookmarks
+    from eolie.database_adblock import DatabaseAdblock
+    from eolie.database_phishing import DatabasePhishing
+    from eolie.database_exceptions import DatabaseExceptions
+
+    # Databases only need cursors and exceptions from application
+    app = Gio.Application.new(None, Gio.ApplicationFlags.NON_UNIQUE)
+    app.set_default()
+    app.cursors = {}
+    app.debug = False
+    app.sync_worker = None
+
+    started = perf_counter()
+    profile = Profile(SCALES[name])
+    history = DatabaseHistory()
+    profile.fill_history(history)
+    bookmarks = DatabaseBookmarks()
+    profile.fill_bookmarks(bookmarks)
+    adblock = DatabaseAdblock()
+    hosts = profile.fill_adblock(adblock)
+    phishing = DatabasePhishing()
+    phishing_uris = profile.fill_phishing(phishing)
+    app.adblock_exceptions = DatabaseExceptions("adblock")
+    exceptions = profile.fill_exceptions(app.adblock_exceptions)
+    setup = perf_counter() - started
+
+    netlocs = profile.sample(profile.netlocs, iterations)
+    words = profile.sample(profile.words, iterations)
+    # Half known, half unknown
+    requests = ["https://%s/ad.js" % host
+                for host in profile.sample(hosts, iterations // 2)] +\
+               ["https://%s/script.js" % netloc
+                for netloc in netlocs[:iterations - iterations // 2]]
+    pages = ["https://%s/" % netloc for netloc in netlocs]
+    phishing_requests = profile.sample(phishing_uris, iterations // 2) +\
+        pages[:iterations - iterations // 2]
+    parsed = [urlparse(uri)
+              for uri in ["https://%s/" % value
+                          for value in profile.sample(exceptions,
+                                                      iterations // 2)] +
+              pages[:iterations - iterations // 2]]
+
+    results = {
+        "history.search":
+            measure(history.search, [(word, 20) for word in words]),
+        "history.search (two words)":
+            measure(history.search,
+                    [("%s %s" % (word, word[:3]), 20) for word in words]),
+        "history.get_populars":
+            measure(history.get_populars,
+                    [(netloc, 20) for netloc in netlocs]),
+        "history.get_populars (all)":
+            measure(history.get_populars,
+                    [("", 20)] * max(iterations // 10, 1)),
+        "history.get_match":
+            measure(history.get_match,
+                    [(netloc[:4],) for netloc in netlocs]),
+        "bookmarks.search":
+            measure(bookmarks.search, [(word, 20) for word in words]),
+        "bookmarks.get_populars":
+            measure(bookmarks.get_populars,
+                    [(20,)] * max(iterations // 10, 1)),
+        "adblock.is_blocked":
+            measure(adblock.is_blocked, [(uri,) for uri in requests]),
+        "adblock.get_css_rules":
+            measure(adblock.get_css_rules,
+                    [(uri,) for uri in pages[:max(iterations // 10, 1)]]),
+        "phishing.is_phishing":
+            measure(phishing.is_phishing,
+                    [(uri,) for uri in phishing_requests]),
+        "exceptions.find_parsed":
+            measure(app.adblock_exceptions.find_parsed,
+                    [(value,) for value in parsed])
+    }
+    return {"sizes": {"history": SCALES[name],
+                      "bookmarks": BOOKMARKS,
+                      "tags": TAGS,
+                      "adblock_hosts": ADBLOCK_HOSTS,
+                      "adblock_css": ADBLOCK_CSS,
+                      "phishing": PHISHING,
+                      "exceptions": len(exceptions)},
+            "setup_s": round(setup, 2),
+            "results": results}
+
+
+def main():
+    """
+        Run each scale in a child process with its own profile
+    """
+    parser = argparse.ArgumentParser(
+                            description="Eolie databases benchmark")
+    parser.add_argument("--scales", default=",".join(SCALES.keys()),
+                        help="comma separated list of %s" %
+                             ", ".join(SCALES.keys()))
+    parser.add_argument("--iterations", type=int, default=200,
+                        help="calls per hot path")
+    parser.add_argument("--output", help="JSON file, stdout if missing")
+    parser.add_argument("--run-scale", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child process, databases may print on stdout, use a file
+    if args.run_scale is not None:
+        with open(args.output, "w") as f:
+            json.dump(run_scale(args.run_scale, args.iterations), f)
+        return
+
+    report = {"time": int(time()),
+              "python": platform.python_version(),
+              "sqlite": sqlite3.sqlite_version,
+              "platform": platform.platform(),
+              "iterations": args.iterations,
+              "scales": {}}
+    source = os.path.dirname(os.path.abspath(__file__))
+    for name in args.scales.split(","):
+        if name not in SCALES.keys():
+            parser.error("unknown scale: %s" % name)
+        with tempfile.TemporaryDirectory(prefix="eolie-benchmark-") as tmp:
+            env = dict(os.environ)
+            env["XDG_DATA_HOME"] = tmp
+            env["XDG_CACHE_HOME"] = tmp
+            env["PYTHONPATH"] = os.pathsep.join(
+                [source] + [p for p in [env.get("PYTHONPATH")] if p])
+            output = os.path.join(tmp, "results.json")
+            print("Running %s..." % name, file=sys.stderr)
+            subprocess.check_call([sys.executable, os.path.abspath(__file__),
+                                   "--run-scale", name,
+                                   "--iterations", str(args.iterations),
+                                   "--output", output],
+                                  env=env, stdout=sys.stderr)
+            with open(output, "r") as f:
+                report["scales"][name] = json.load(f)
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+# Copyright (c) 2017 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Replay request traces through web extension send-request hooks
+
+    AdblockExtension and JSblockExtension are connected to fake WebKit
+    pages, like in a web process. Each page of the trace navigates,
+    then sends its main document and subresources requests.
+    ProxyExtensionServer needs a session bus and is not replayed, its
+    hook only keeps request uris.
+
+    A trace is a JSON list of {"page": uri, "requests": [uri]} or a HAR
+    file. Without trace, a synthetic one is generated. Blocking data
+    can come from offline copies of hosts and EasyList files, synthetic
+    data is used otherwise. No network, no display, user profile is
+    never touched. Results are printed as JSON.
+
+    Usage: ./benchmark_extension.py [--trace trace.json|trace.har]
+                                    [--hosts hosts.txt]
+                                    [--filters easylist.txt]
+                                    [--pages 200] [--passes 1]
+                                    [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from time import perf_counter, time
+
+from benchmark import Profile, get_stats, SEED
+
+
+class FakeExtension:
+    """
+        WebKit2WebExtension.WebExtension signals
+    """
+
+    def __init__(self):
+        """
+            Init extension
+        """
+        self.__handlers = []
+
+    def connect(self, signal, callback, *args):
+        """
+            Connect page-created
+            @param signal as str
+            @param callback as function
+        """
+        if signal == "page-created":
+            self.__handlers.append((callback, args))
+
+    def create_page(self, page_id):
+        """
+            Create a page and emit page-created
+            @param page_id as int
+            @return FakeWebPage
+        """
+        webpage = FakeWebPage(page_id)
+        for (callback, args) in self.__handlers:
+            callback(self, webpage, *args)
+        return webpage
+
+
+class FakeWebPage:
+    """
+        WebKit2WebExtension.WebPage used by extensions
+    """
+
+    def __init__(self, page_id):
+        """
+            Init page
+            @param page_id as int
+        """
+        self.__id = page_id
+        self.__uri = None
+        self.__document = FakeDocument([])
+        self.__handlers = {}
+
+    def get_id(self):
+        """
+            Get page id
+            @return int
+        """
+        return self.__id
+
+    def get_uri(self):
+        """
+            Get page uri
+            @return str/None
+        """
+        return self.__uri
+
+    def get_dom_document(self):
+        """
+            Get page document
+            @return FakeDocument
+        """
+        return self.__document
+
+    def connect(self, signal, callback, *args):
+        """
+            Connect signal
+            @param signal as str
+            @param callback as function
+        """
+        if signal not in self.__handlers.keys():
+            self.__handlers[signal] = []
+        self.__handlers[signal].append((callback, args))
+
+    def load(self, uri, scripts):
+        """
+            Navigate to uri, a new document with scripts
+            @param uri as str
+            @param scripts as [str]
+        """
+        self.__uri = uri
+        self.__document = FakeDocument(scripts)
+        for (callback, args) in self.__handlers.get("notify::uri", []):
+            callback(self, None, *args)
+
+    def send_request(self, uri):
+        """
+            Emit send-request, first handler returning True stops emission
+            @param uri as str
+            @return True if request is blocked
+        """
+        request = FakeURIRequest(uri)
+        for (callback, args) in self.__handlers.get("send-request", []):
+            if callback(self, request, None, *args):
+                return True
+        return False
+
+
+class FakeDocument:
+    """
+        WebKit2WebExtension.DOMDocument with scripts
+    """
+
+    def __init__(self, scripts):
+        """
+            Init document
+            @param scripts as [str]
+        """
+        self.__scripts = FakeCollection(scripts)
+
+    def get_elements_by_tag_name_as_html_collection(self, tag):
+        """
+            Get elements for tag, only scripts are known
+            @param tag as str
+            @return FakeCollection
+        """
+        return self.__scripts if tag == "script" else FakeCollection([])
+
+
+class FakeCollection:
+    """
+        WebKit2WebExtension.DOMHTMLCollection of scripts
+    """
+
+    def __init__(self, uris):
+        """
+            Init collection
+            @param uris as [str]
+        """
+        self.__scripts = [FakeScript(uri) for uri in uris]
+
+    def get_length(self):
+        """
+            Get scripts count
+            @return int
+        """
+        return len(self.__scripts)
+
+    def item(self, index):
+        """
+            Get script
+            @param index as int
+            @return FakeScript
+        """
+        return self.__scripts[index]
+
+
+class FakeScript:
+    """
+        WebKit2WebExtension.DOMHTMLScriptElement
+    """
+
+    def __init__(self, uri):
+        """
+            Init script
+            @param uri as str
+        """
+        self.__uri = uri
+
+    def get_src(self):
+        """
+            Get script uri
+            @return str
+        """
+        return self.__uri
+
+
+class FakeURIRequest:
+    """
+        WebKit2.URIRequest
+    """
+
+    def __init__(self, uri):
+        """
+            Init request
+            @param uri as str
+        """
+        self.__uri = uri
+        self.__headers = FakeHeaders()
+
+    def get_uri(self):
+        """
+            Get request uri
+            @return str
+        """
+        return self.__uri
+
+    def get_http_headers(self):
+        """
+            Get request headers
+            @return FakeHeaders
+        """
+        return self.__headers
+
+
+class FakeHeaders:
+    """
+        Soup.MessageHeaders
+    """
+
+    def __init__(self):
+        """
+            Init headers
+        """
+        self.__headers = []
+
+    def append(self, name, value):
+        """
+            Add header
+            @param name as str
+            @param value as str
+        """
+        self.__headers.append((name, value))
+
+
+class FakeSettings:
+    """
+        Settings with fixed values
+    """
+
+    def __init__(self, values):
+        """
+            Init settings
+            @param values as {str: bool}
+        """
+        from gi.repository import GLib
+        self.__values = {key: GLib.Variant("b", value)
+                         for (key, value) in values.items()}
+
+    def get_value(self, key):
+        """
+            Get value for key
+            @param key as str
+            @return GLib.Variant
+        """
+        return self.__values[key]
+
+    def connect(self, signal, callback, *args):
+        """
+            Values never change
+            @param signal as str
+            @param callback as function
+        """
+        pass
+
+
+def load_trace(path):
+    """
+        Load a trace or a HAR file
+        @param path as str
+        @return [{"page": str, "requests": [str]}]
+    """
+    with open(path, "r") as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or "log" not in data.keys():
+        return data
+    # HAR: group entries by page, first entry is main document
+    pages = {}
+    for entry in data["log"].get("entries", []):
+        pageref = entry.get("pageref", "")
+        uri = entry["request"]["url"]
+        if pageref not in pages.keys():
+            pages[pageref] = {"page": uri, "requests": []}
+        else:
+            pages[pageref]["requests"].append(uri)
+    return list(pages.values())
+
+
+def generate_trace(profile, hosts, count):
+    """
+        Generate a trace: first party resources, CDNs and blocked hosts
+        @param profile as Profile
+        @param hosts as [str] (blocked)
+        @param count as int (pages)
+        @return [{"page": str, "requests": [str]}]
+    """
+    rand = random.Random(SEED)
+    cdns = ["cdn%s.%s.net" % (i, word)
+            for (i, word) in enumerate(profile.sample(profile.words, 50))]
+    trace = []
+    for netloc in profile.sample(profile.netlocs, count):
+        requests = []
+        for i in range(0, rand.randint(20, 80)):
+            kind = rand.random()
+            extension = rand.choice(["js", "css", "png", "jpg", "woff2"])
+            word = rand.choice(profile.words)
+            if kind < 0.5:
+                host = netloc
+            elif kind < 0.75:
+                host = rand.choice(cdns)
+            elif kind < 0.9:
+                host = rand.choice(hosts)
+            else:
+                host = "ads.%s" % rand.choice(cdns)
+                word = "ads/%s" % word
+            requests.append("https://%s/%s/%s.%s" % (host, word, i,
+                                                     extension))
+        trace.append({"page": "https://%s/" % netloc,
+                      "requests": requests})
+    return trace
+
+
+def generate_filters(hosts, trace):
+    """
+        Generate EasyList like network filters
+        @param hosts as [str] (blocked by hosts lists)
+        @param trace as [{}]
+        @return [str]
+    """
+    rand = random.Random(SEED)
+    lines = ["[Adblock Plus 2.0]", "! Synthetic filters"]
+    lines += ["||%s^$third-party" % host for host in rand.sample(
+                                            hosts, min(len(hosts), 20000))]
+    lines += ["/ads/*$script,image", "/ads/*$stylesheet", "||ads.*^"]
+    for page in trace[:50]:
+        netloc = page["page"].split("/")[2]
+        lines.append("@@||%s/ads/$domain=%s" % (netloc, netloc))
+    lines += ["example.com##.ad", "##.banner"]
+    return lines
+
+
+def run(args):
+    """
+        Build blocking data and replay trace
+        XDG_DATA_HOME must point to an empty directory
+        @param args as argparse.Namespace
+        @return {}
+    """
+    from gi.repository import Gio
+    from eolie.database_adblock import DatabaseAdblock
+    from eolie.database_exceptions import DatabaseExceptions
+    from eolie.extension_adblock import AdblockExtension
+    from eolie.extension_jsblock import JSblockExtension
+    from eolie.helper_filters import NetworkFilters
+    from eolie.helper_policy import PolicySnapshot
+    from eolie.helper_timing import HookStats
+
+    # Same application than python-webextension/extension.py.in
+    app = Gio.Application.new(None, Gio.ApplicationFlags.IS_SERVICE)
+    app.set_default()
+    app.cursors = {}
+    app.debug = False
+    app.hook_stats = HookStats()
+    app.hook_stats.set_enabled(True)
+
+    started = perf_counter()
+    profile = Profile(1000)
+    adblock = DatabaseAdblock()
+    if args.hosts is None:
+        hosts = profile.fill_adblock(adblock)
+    else:
+        hosts = []
+        with open(args.hosts, "r", errors="ignore") as f:
+            for line in f:
+                fields = line.split("#")[0].split()
+                if len(fields) > 1:
+                    hosts.append(fields[1])
+        with sqlite3.connect(adblock.DB_PATH) as sql:
+            sql.executemany("INSERT INTO adblock (dns, mtime) VALUES (?, ?)",
+                            [(host, int(time())) for host in hosts])
+    if args.trace is None:
+        trace = generate_trace(profile, hosts or ["ads.example.com"],
+                               args.pages)
+    else:
+        trace = load_trace(args.trace)
+    if args.filters is None:
+        lines = generate_filters(hosts, trace)
+    else:
+        with open(args.filters, "r", errors="ignore") as f:
+            lines = f.readlines()
+    rules = NetworkFilters().write(lines)
+    # Web processes read exceptions from policy snapshot
+    databases = {"adblock": DatabaseExceptions("adblock"),
+                 "js": DatabaseExceptions("js")}
+    for page in trace[::10]:
+        databases["js"].add_exception(page["page"].split("/")[2])
+    snapshot = PolicySnapshot()
+    snapshot.write(databases)
+    app.adblock_exceptions = snapshot.get_exceptions("adblock")
+    app.js_exceptions = snapshot.get_exceptions("js")
+    setup = perf_counter() - started
+
+    extension = FakeExtension()
+    settings = FakeSettings({"adblock": True,
+                             "do-not-track": True,
+                             "jsblock": True})
+    adblock_extension = AdblockExtension(extension, settings)
+    JSblockExtension(extension, settings)
+    webpage = extension.create_page(1)
+
+    requests = []
+    pages = []
+    blocked = 0
+    for i in range(0, args.passes):
+        for page in trace:
+            page_started = perf_counter()
+            scripts = [uri for uri in page["requests"]
+                       if uri.split("?")[0].endswith(".js")]
+            webpage.load(page["page"], scripts)
+            for uri in [page["page"]] + page["requests"]:
+                request_started = perf_counter()
+                if webpage.send_request(uri):
+                    blocked += 1
+                requests.append((perf_counter() - request_started) * 1000)
+            pages.append((perf_counter() - page_started) * 1000)
+
+    return {"trace": args.trace or "synthetic",
+            "pages": len(trace),
+            "passes": args.passes,
+            "hosts": len(hosts),
+            "filters": rules,
+            "setup_s": round(setup, 2),
+            "blocked": blocked,
+            "adblock_cache": {"hits": adblock_extension.hits,
+                              "misses": adblock_extension.misses},
+            "requests": get_stats(requests),
+            "pages_total": get_stats(pages),
+            "hooks": app.hook_stats.get(webpage.get_id())}
+
+
+def main():
+    """
+        Replay in a child process with its own profile
+    """
+    parser = argparse.ArgumentParser(
+                            description="Eolie web extension benchmark")
+    parser.add_argument("--trace", help="JSON trace or HAR file")
+    parser.add_argument("--hosts", help="hosts file")
+    parser.add_argument("--filters", help="Adblock Plus filters file")
+    parser.add_argument("--pages", type=int, default=200,
+                        help="pages in synthetic trace")
+    parser.add_argument("--passes", type=int, default=1,
+                        help="trace replays")
+    parser.add_argument("--output", help="JSON file, stdout if missing")
+    parser.add_argument("--child", action="store_true",
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child process, databases may print on stdout, use a file
+    if args.child:
+        with open(args.output, "w") as f:
+            json.dump(run(args), f)
+        return
+
+    source = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory(prefix="eolie-benchmark-") as tmp:
+        env = dict(os.environ)
+        env["XDG_DATA_HOME"] = tmp
+        env["XDG_CACHE_HOME"] = tmp
+        env["PYTHONPATH"] = os.pathsep.join(
+            [source] + [p for p in [env.get("PYTHONPATH")] if p])
+        output = os.path.join(tmp, "results.json")
+        argv = [sys.executable, os.path.abspath(__file__), "--child",
+                "--pages", str(args.pages),
+                "--passes", str(args.passes),
+                "--output", output]
+        for option in ["trace", "hosts", "filters"]:
+            value = getattr(args, option)
+            if value is not None:
+                argv += ["--%s" % option, os.path.abspath(value)]
+        subprocess.check_call(argv, env=env, stdout=sys.stderr)
+        with open(output, "r") as f:
+            report = json.load(f)
+    report["time"] = int(time())
+    report["python"] = platform.python_version()
+    report["platform"] = platform.platform()
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -19,7 +19,6 @@ gi.require_version('GtkSpell', '3.0')
 from gi.repository import Gtk, Gio, GLib, Gdk, WebKit2
 
 from gettext import gettext as _
-from pickle import dump, load
 from urllib.parse import urlparse
 from getpass import getuser
 from time import time
@@ -34,13 +33,20 @@ from eolie.database_adblock import DatabaseAdblock
 from eolie.database_exceptions import DatabaseExceptions
 from eolie.database_settings import DatabaseSettings
 from eolie.database_phishing import DatabasePhishing
+from eolie.database_session import DatabaseSession
 from eolie.sqlcursor import SqlCursor
 from eolie.search import Search
 from eolie.download_manager import DownloadManager
 from eolie.menu_pages import PagesMenu
 from eolie.helper_dbus import DBusHelper
-from eolie.helper_task import TaskHelper
+from eolie.helper_task import TaskHelper, TaskPool
+from eolie.helper_fetch import FetchHelper
+from eolie.helper_dns import DNSHelper
+from eolie.helper_timing import TimingHelper, HookStats
+from eolie.helper_maintenance import MaintenanceHelper
+from eolie.helper_policy import PolicySnapshot
 from eolie.define import EOLIE_DATA_PATH, TimeSpan, TimeSpanValues, LoadingType
+from eolie.define import TaskQueue
 from eolie.utils import is_unity, wanted_loading_type
 
 
@@ -58,7 +64,6 @@ class Application(Gtk.Application):
             @param extension_dir as str
         """
         self.__version = version
-        self.__state_cache = []
         # First check WebKit2 version
         if WebKit2.MINOR_VERSION < 18:
             exit("You need WebKit2GTK >= 2.18")
@@ -84,7 +89,15 @@ class Application(Gtk.Application):
                 if GLib.file_test(path, GLib.FileTest.EXISTS):
                     GLib.setenv("SSL_CERT_FILE", path, True)
                     break
-        self.sync_worker = None  # Not initialised
+        self.timing = TimingHelper()
+        self.hook_stats = HookStats()
+        self.__sync_worker = None  # Not initialised
+        self.__sync_checked = False
+        self.__phishing = None
+        self.__search = None
+        self.__pages_menu = None
+        self.__first_draw_id = None
+        self.__first_drawn = False
         self.__extension_dir = extension_dir
         self.debug = False
         self.show_tls = False
@@ -156,6 +169,16 @@ class Application(Gtk.Application):
         self.add_action(quit_action)
         return menu
 
+    def update_policy_snapshot(self):
+        """
+            Write exceptions read by web processes
+            Should be called when an exception changes
+        """
+        databases = {"adblock": self.adblock_exceptions}
+        if self.js_exceptions is not None:
+            databases["js"] = self.js_exceptions
+        self.policy_snapshot.write(databases)
+
     def update_default_style_sheet(self):
         """
             Should be called on startup
@@ -188,6 +211,9 @@ class Application(Gtk.Application):
             maximized = active_window.is_maximized()
         window = Window(self, size, maximized)
         window.connect('delete-event', self.__on_delete_event)
+        if not self.__first_drawn and self.__first_draw_id is None:
+            self.__first_draw_id = window.connect_after("draw",
+                                                        self.__on_first_draw)
         window.show()
         return window
 
@@ -244,33 +270,27 @@ class Application(Gtk.Application):
         except Exception as e:
             print("Application::set_profiles():", e)
 
-    def quit(self, vacuum=False):
+    def quit(self):
         """
             Quit application
-            @param vacuum as bool
+            Databases are maintained while running, see MaintenanceHelper
         """
-        # Save webpage state
+        # Save pending webpage states
         self.__save_state()
+        self.history.flush(False)
         # Stop pending tasks
         self.download_manager.cancel()
         self.adblock.stop()
-        # Clear history
+        self.maintenance_helper.stop()
+        # Others retention values are enforced in background
         active_id = str(self.settings.get_enum("history-storage"))
-        if active_id != TimeSpan.FOREVER:
-            atime = time()
-            if active_id != TimeSpan.NEVER:
-                atime -= TimeSpanValues[active_id]/1000000
-            self.history.clear_to(int(atime))
-        # If sync is running, to avoid db lock, we do not vacuum
-        if self.sync_worker is not None and self.sync_worker.syncing:
-            self.sync_worker.stop()
-            Gio.Application.quit(self)
-        elif vacuum:
-            task_helper = TaskHelper()
-            task_helper.run(self.__vacuum,
-                            callback=(lambda x: Gio.Application.quit(self),))
-        else:
-            Gio.Application.quit(self)
+        if active_id == TimeSpan.NEVER:
+            self.history.clear_to(int(time()))
+        if self.__sync_worker is not None and self.__sync_worker.syncing:
+            self.__sync_worker.stop()
+        if self.debug:
+            self.__dump_stats()
+        Gio.Application.quit(self)
 
     @property
     def profiles(self):
@@ -280,6 +300,49 @@ class Application(Gtk.Application):
         """
         return self.__profiles
 
+    @property
+    def sync_worker(self):
+        """
+            Get sync worker, created on first use
+            @return SyncWorker/None if sync modules are missing
+        """
+        if not self.__sync_checked:
+            self.__sync_checked = True
+            from eolie.mozilla_sync import SyncWorker
+            if SyncWorker.check_modules():
+                self.__sync_worker = self.timing.run("sync", SyncWorker)
+        return self.__sync_worker
+
+    @property
+    def phishing(self):
+        """
+            Get phishing database, created on first use
+            @return DatabasePhishing
+        """
+        if self.__phishing is None:
+            self.__phishing = self.timing.run("phishing", DatabasePhishing)
+        return self.__phishing
+
+    @property
+    def search(self):
+        """
+            Get search engines, created on first use
+            @return Search
+        """
+        if self.__search is None:
+            self.__search = self.timing.run("search", Search)
+        return self.__search
+
+    @property
+    def pages_menu(self):
+        """
+            Get pages menu, created on first use
+            @return PagesMenu
+        """
+        if self.__pages_menu is None:
+            self.__pages_menu = self.timing.run("pages menu", PagesMenu)
+        return self.__pages_menu
+
     @property
     def start_page(self):
         """
@@ -340,8 +403,12 @@ class Application(Gtk.Application):
     def __init(self):
         """
             Init main application
+            Only subsystems needed by first window are created here,
+            others are created on first use or when idle
         """
+        self.timing.start("settings")
         self.settings = Settings.new()
+        self.timing.stop("settings")
 
         # Init extensions
         GLib.setenv("PYTHONPATH", self.__extension_dir, True)
@@ -352,23 +419,16 @@ class Application(Gtk.Application):
 
         # Add a global DBus helper
         self.helper = DBusHelper()
-        # First init sync worker
-        from eolie.mozilla_sync import SyncWorker
-        if SyncWorker.check_modules():
-            self.sync_worker = SyncWorker()
-            # Run a first sync in 10 seconds, speed up app start
-            GLib.timeout_add_seconds(10,
-                                     self.sync_worker.sync,
-                                     False)
-            # Then run a sync every hour
-            GLib.timeout_add_seconds(3600,
-                                     self.sync_worker.sync,
-                                     True)
-        else:
-            self.sync_worker = None
+        # Shared http session
+        self.fetch_helper = FetchHelper()
+        # Shared worker threads
+        self.task_pool = TaskPool()
+        self.dns_helper = DNSHelper()
+        self.maintenance_helper = MaintenanceHelper()
         if self.prefers_app_menu():
             menu = self.get_app_menu()
             self.set_app_menu(menu)
+        self.timing.start("css")
         cssProviderFile = Gio.File.new_for_uri(
                 'resource:///org/gnome/Eolie/application.css')
         cssProvider = Gtk.CssProvider()
@@ -377,29 +437,34 @@ class Application(Gtk.Application):
         styleContext = Gtk.StyleContext()
         styleContext.add_provider_for_screen(screen, cssProvider,
                                              Gtk.STYLE_PROVIDER_PRIORITY_USER)
-        self.history = DatabaseHistory()
-        self.bookmarks = DatabaseBookmarks()
+        self.timing.stop("css")
+        self.history = self.timing.run("history", DatabaseHistory)
+        self.bookmarks = self.timing.run("bookmarks", DatabaseBookmarks)
+        self.session = self.timing.run("session", DatabaseSession)
         # We store cursors for main thread
         SqlCursor.add(self.history)
         SqlCursor.add(self.bookmarks)
-        self.websettings = DatabaseSettings()
-        self.adblock = DatabaseAdblock()
-        self.adblock.update()
-        self.phishing = DatabasePhishing()
+        SqlCursor.add(self.session)
+        self.websettings = self.timing.run("websettings", DatabaseSettings)
+        self.adblock = self.timing.run("adblock", DatabaseAdblock)
+        self.timing.start("exceptions")
         self.adblock_exceptions = DatabaseExceptions("adblock")
-        # Do not remove this!
-        self.update_default_style_sheet()
         self.popup_exceptions = DatabaseExceptions("popups")
         self.image_exceptions = DatabaseExceptions("images")
         if self.settings.get_user_value("jsblock") is not None:
             self.js_exceptions = DatabaseExceptions("js")
         else:
             self.js_exceptions = None
-        self.phishing.update()
-        self.art = Art()
-        self.search = Search()
+        self.policy_snapshot = PolicySnapshot()
+        self.update_policy_snapshot()
+        self.timing.stop("exceptions")
+        # Do not remove this!
+        self.timing.run("default style sheet",
+                        self.update_default_style_sheet)
+        self.art = self.timing.run("art", Art)
         self.download_manager = DownloadManager()
-        self.pages_menu = PagesMenu()
+        # Run remaining init once first window is drawn
+        GLib.idle_add(self.__init_deferred, priority=GLib.PRIORITY_LOW)
 
         # Check MOZ_PLUGIN_PATH
         if self.settings.get_value('enable-plugins') and\
@@ -475,6 +540,36 @@ class Application(Gtk.Application):
         self.set_accels_for_action("win.shortcut::zoom_default",
                                    ["<Control>KP_0", "<Control>0"])
 
+    def __init_deferred(self):
+        """
+            Init non critical subsystems, called when idle
+        """
+        self.timing.start("deferred init")
+        task_helper = TaskHelper()
+        task_helper.run(self.history.build_completion_index,
+                        queue=TaskQueue.BACKGROUND)
+        self.adblock.update()
+        self.phishing.update()
+        # Enforce history retention now and then every hour
+        self.__on_retention_timeout()
+        GLib.timeout_add_seconds(3600, self.__on_retention_timeout)
+        self.settings.connect("changed::history-storage",
+                              lambda x, y: self.__on_retention_timeout())
+        self.maintenance_helper.start()
+        if self.sync_worker is not None:
+            # Run a first sync in 10 seconds, speed up app start
+            GLib.timeout_add_seconds(10,
+                                     self.sync_worker.sync,
+                                     False)
+            # Then run a sync every hour
+            GLib.timeout_add_seconds(3600,
+                                     self.sync_worker.sync,
+                                     True)
+        self.timing.stop("deferred init")
+        if self.debug:
+            for line in self.timing.dump():
+                print("Startup:", line)
+
     def __listen_to_gnome_sm(self):
         """
             Save state on EndSession signal
@@ -491,130 +586,95 @@ class Application(Gtk.Application):
         except Exception as e:
             print("Application::__listen_to_gnome_sm():", e)
 
-    def __vacuum(self):
-        """
-            VACUUM DB
-            @thread safe
-        """
-        try:
-            with SqlCursor(self.bookmarks) as sql:
-                sql.isolation_level = None
-                sql.execute("VACUUM")
-                sql.isolation_level = ""
-            with SqlCursor(self.history) as sql:
-                sql.isolation_level = None
-                sql.execute("VACUUM")
-                sql.isolation_level = ""
-            with SqlCursor(self.adblock) as sql:
-                sql.isolation_level = None
-                sql.execute("VACUUM")
-                sql.isolation_level = ""
-            with SqlCursor(self.phishing) as sql:
-                sql.isolation_level = None
-                sql.execute("VACUUM")
-                sql.isolation_level = ""
-        except Exception as e:
-            print("Application::__vacuum(): ", e)
-        self.art.vacuum()
-
-    def __get_state(self, window):
-        """
-            Return state for window
-            @param window as Window
-            @return {}
-        """
-        def get_state_for_webview(webview):
-            uri = webview.uri
-            parsed = urlparse(uri)
-            if parsed.scheme in ["http", "https"]:
-                ephemeral = webview.ephemeral
-                state = webview.get_session_state().serialize()
-                return (uri, webview.title, webview.atime,
-                        webview.gtime, ephemeral, state.get_data())
-            else:
-                return None
-
-        window_state = {}
-        window_state["id"] = str(window)
-        window_state["size"] = window.get_size()
-        window_state["maximized"] = window.is_maximized()
-        session_states = []
-        if self.settings.get_value("remember-session"):
-            # Save current first, will be loaded first on restore
-            current = window.container.current.webview
-            state = get_state_for_webview(current)
-            if state is not None:
-                session_states.append(state)
-            # Do not get view from container to save order
-            for view in window.container.views:
-                if view.webview == current or view.destroying:
-                    continue
-                state = get_state_for_webview(view.webview)
-                if state is not None:
-                    session_states.append(state)
-        window_state["states"] = session_states
-        return window_state
-
     def __save_state(self):
         """
             Save windows state
+            Pages are saved while browsing, only write pending changes
         """
-        try:
-            window_states = []
-            for window in self.get_windows():
-                window_state = self.__get_state(window)
-                window_states.append(window_state)
-            for window_state in self.__state_cache:
-                window_states.append(window_state)
-            dump(window_states,
-                 open(EOLIE_DATA_PATH + "/session_states.bin", "wb"))
-        except Exception as e:
-            print("Application::__save_state()", e)
-
-    def __clean_state_cache(self, window_id):
-        """
-            Remove window id from cache
-            @param window_id as str
-        """
-        for state in self.__state_cache:
-            if state["id"] == window_id:
-                self.__state_cache.remove(state)
-                break
+        self.session.flush(self.get_windows())
 
     def __create_initial_windows(self, foreground):
         """
             Create initial windows based on saved session
+            Only first page state is loaded here, others are loaded by
+            container when pages are added
             @param foreground  as bool if foreground loading allowed
         """
         size = (800, 600)
         maximized = False
         try:
-            windows = load(open(EOLIE_DATA_PATH + "/session_states.bin", "rb"))
+            windows = self.session.get_windows()
             if self.settings.get_value("remember-session"):
-                for window in windows:
-                    if not window["states"]:
+                for (window_id, width, height,
+                     window_maximized, current) in windows:
+                    pages = self.session.get_pages(window_id, current)
+                    if not pages:
+                        self.session.remove_window(window_id)
                         continue
-                    new_window = self.get_new_window(window["size"],
-                                                     window["maximized"])
+                    new_window = self.get_new_window((width, height),
+                                                     window_maximized)
+                    self.session.move_window(window_id, str(new_window))
                     items = []
                     i = 0 if foreground else 1
-                    for (uri, title, atime,
-                         gtime, ephemeral, state) in window["states"]:
+                    for (page_id, uri, title, atime,
+                         gtime, ephemeral) in pages:
                         loading_type = wanted_loading_type(i)
-                        webkit_state = WebKit2.WebViewSessionState(
-                                                         GLib.Bytes.new(state))
                         items.append((uri, title, atime, gtime, ephemeral,
-                                      webkit_state, loading_type))
+                                      page_id, loading_type))
                         i += 1
                     new_window.container.add_webviews(items)
             elif windows:
-                    size = windows[0]["size"]
-                    maximized = windows[0]["maximized"]
+                size = (windows[0][1], windows[0][2])
+                maximized = windows[0][3]
+                for window in windows:
+                    self.session.remove_window(window[0])
         except Exception as e:
             print("Application::__create_initial_windows()", e)
         if not self.get_windows():
             self.get_new_window(size, maximized)
 
+    def __on_first_draw(self, window, cr):
+        """
+            Mark first window as drawn
+            @param window as Window
+            @param cr as cairo.Context
+        """
+        window.disconnect(self.__first_draw_id)
+        self.__first_draw_id = None
+        self.__first_drawn = True
+        self.timing.mark("first window drawn")
+        if self.debug:
+            print("Startup: first window drawn in %.1f ms" %
+                  (self.timing.timings[-1][1] * 1000))
+
+    def __dump_stats(self):
+        """
+            Write pages, tasks and startup stats to a JSON file
+        """
+        try:
+            stats = {"pages": self.hook_stats.get(),
+                     "tasks": self.task_pool.get_stats(),
+                     "startup": self.timing.timings}
+            path = EOLIE_DATA_PATH + "/stats.json"
+            with open(path, "w") as f:
+                json.dump(stats, f, indent=2)
+            print("Application::quit(): stats written to", path)
+        except Exception as e:
+            print("Application::__dump_stats():", e)
+
+    def __on_retention_timeout(self):
+        """
+            Remove history older than history-storage in background
+        """
+        active_id = str(self.settings.get_enum("history-storage"))
+        if active_id not in [TimeSpan.FOREVER, TimeSpan.NEVER]:
+            atime = time() - TimeSpanValues[active_id]/1000000
+            task_helper = TaskHelper()
+            task_helper.run(self.history.clear_to, int(atime),
+                            queue=TaskQueue.BACKGROUND,
+                            token="history-retention")
+        return True
+
     def __on_handle_local_options(self, app, options):
         """
             Handle local options
@@ -638,6 +698,7 @@ class Application(Gtk.Application):
         if options.contains("debug"):
             GLib.setenv("WEBKIT_DEBUG", "network", True)
             self.debug = True
+            self.hook_stats.set_enabled(True)
         if options.contains("show-tls"):
             self.show_tls = True
         if options.contains("disable-artwork-cache"):
@@ -682,18 +743,21 @@ class Application(Gtk.Application):
             Close window
         """
         if len(self.get_windows()) > 1:
-            state = self.__get_state(window)
-            self.__state_cache.append(state)
-            GLib.timeout_add(25000, self.__clean_state_cache, state["id"])
+            # Keep window in session for a while, allow restoring it if
+            # user is closing all windows
+            self.session.flush([window])
+            GLib.timeout_add(25000, self.session.remove_window, str(window))
             window.destroy()
         else:
             window.hide()
-            self.quit(True)
+            self.quit()
 
     def __try_closing(self, window, views):
         """
             Try closing all views
         """
+        # Offloaded views do not have forms
+        views = [view for view in views if not view.offloaded]
         if views:
             view = views.pop(0)
             page_id = view.webview.get_page_id()
@@ -0,0 +1,152 @@
+# Copyright (c) 2017 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+class BookmarksTree:
+    """
+        Snapshot of bookmarks and folders, see DatabaseBookmarks.get_tree()
+        Same answers than DatabaseBookmarks getters without any query
+    """
+
+    def __init__(self, rows, tags):
+        """
+            Init tree
+            @param rows as [(id as int, guid as str, uri as str,
+                             title as str, position as int,
+                             deleted as bool, mtime as float,
+                             parent_guid as str/None,
+                             parent_name as str/None)]
+            @param tags as [(id as int, title as str)], sorted by title
+        """
+        self.__nodes = {}
+        self.__guids = {}
+        self.__children = {}
+        for row in rows:
+            node = {"id": row[0],
+                    "guid": row[1],
+                    "uri": row[2],
+                    "title": row[3],
+                    "position": row[4],
+                    "deleted": bool(row[5]),
+                    "mtime": row[6],
+                    "parent_guid": row[7],
+                    "parent_name": row[8],
+                    "tags": []}
+            self.__nodes[node["id"]] = node
+            self.__guids[node["guid"]] = node
+            # Bookmarks without parent are not unfiled children
+            if node["parent_guid"] is not None:
+                if node["parent_guid"] not in self.__children.keys():
+                    self.__children[node["parent_guid"]] = []
+                self.__children[node["parent_guid"]].append(node)
+        for children in self.__children.values():
+            children.sort(key=lambda x: x["position"] or 0)
+        for (bookmark_id, title) in tags:
+            node = self.__nodes.get(bookmark_id, None)
+            if node is not None:
+                node["tags"].append(title)
+
+    def get(self, bookmark_id):
+        """
+            Get bookmark
+            @param bookmark_id as int
+            @return {}/None
+        """
+        return self.__nodes.get(bookmark_id, None)
+
+    def get_by_guid(self, guid):
+        """
+            Get bookmark for guid
+            @param guid as str
+            @return {}/None
+        """
+        return self.__guids.get(guid, None)
+
+    def get_ids_for_mtime(self, mtime):
+        """
+            Get bookmarks, not folders, that need to be synced
+            @param mtime as float
+            @return [int]
+        """
+        return [node["id"] for node in self.__nodes.values()
+                if node["mtime"] > mtime and node["uri"] != node["guid"] and
+                not node["deleted"]]
+
+    def get_deleted_ids(self):
+        """
+            Get deleted bookmarks
+            @return [int]
+        """
+        return [node["id"] for node in self.__nodes.values()
+                if node["deleted"]]
+
+    def get_parent_guid(self, bookmark_id):
+        """
+            Get parent guid for bookmark
+            @param bookmark_id as int
+            @return str
+        """
+        node = self.__nodes.get(bookmark_id, None)
+        if node is None or node["parent_guid"] is None:
+            return "unfiled"
+        return node["parent_guid"]
+
+    def get_parent_name(self, bookmark_id):
+        """
+            Get parent name for bookmark
+            @param bookmark_id as int
+            @return str
+        """
+        node = self.__nodes.get(bookmark_id, None)
+        if node is None or node["parent_name"] is None:
+            return ""
+        return node["parent_name"]
+
+    def get_children(self, guid):
+        """
+            Get children guids, deleted ones excluded
+            @param guid as str
+            @return [str]
+        """
+        return [node["guid"] for node in self.__children.get(guid, [])
+                if not node["deleted"]]
+
+    def sort_folders(self, folder_ids):
+        """
+            Sort folders, children before their parents
+            @param folder_ids as [int]
+            @return [int]
+        """
+        pending = set(folder_ids)
+        visited = set()
+        folders = []
+        for folder_id in folder_ids:
+            # Depth first walk, without recursion
+            stack = [(folder_id, False)]
+            while stack:
+                (current_id, expanded) = stack.pop()
+                if expanded:
+                    folders.append(current_id)
+                    continue
+                # Already walked, also stops on cycles
+                if current_id in visited:
+                    continue
+                visited.add(current_id)
+                # Added once children are handled
+                stack.append((current_id, True))
+                node = self.__nodes[current_id]
+                for child_guid in reversed(self.get_children(node["guid"])):
+                    child = self.__guids[child_guid]
+                    if child["id"] in pending and\
+                            child["id"] not in visited:
+                        stack.append((child["id"], False))
+        return folders
@@ -10,11 +10,14 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from gi.repository import Gtk, GLib
+from gi.repository import Gtk, GLib, WebKit2
 
 from gettext import gettext as _
+from time import time
 
 from eolie.view import View
+from eolie.webview_placeholder import WebViewPlaceholder
+from eolie.webview_pool import WebViewPool
 from eolie.popover_webview import WebViewPopover
 from eolie.pages_manager import PagesManager
 from eolie.sites_manager import SitesManager
@@ -85,12 +88,13 @@ class Container(Gtk.Overlay):
         self.__current = None
         self.__next_timeout_id = None
         self.__previous_timeout_id = None
-        self.__preload_timeout_id = None
-        self.__preloaded = []
         self.__pending_items = []
-
-        self.__preloaded_max = El().settings.get_value(
-                                              "preloaded-webviews").get_int32()
+        self.__pool = WebViewPool(window)
+        self.connect("destroy", self.__on_destroy)
+        self.__offload_delay = El().settings.get_value(
+                                          "offload-idle-pages").get_int32()
+        if self.__offload_delay > 0:
+            GLib.timeout_add_seconds(60, self.__on_offload_timeout)
 
         self.__stack = DelayedStack()
         self.__stack.set_hexpand(True)
@@ -136,7 +140,11 @@ class Container(Gtk.Overlay):
             @param atime as int
             @return WebView
         """
-        webview = self.__get_webview(ephemeral)
+        # Do not create a WebView for offloaded pages
+        if loading_type == LoadingType.OFFLOAD:
+            webview = WebViewPlaceholder(ephemeral, self.__window)
+        else:
+            webview = self.__pool.get(ephemeral)
         if gtime is not None:
             webview.set_gtime(gtime)
         if atime is not None:
@@ -150,10 +158,6 @@ class Container(Gtk.Overlay):
             elif loading_type in [LoadingType.OFFLOAD, LoadingType.FOREGROUND]:
                 webview.set_uri(uri)
         self.add_webview_with_new_view(webview, loading_type)
-        if self.__preload_timeout_id is not None:
-            GLib.source_remove(self.__preload_timeout_id)
-        self.__preload_timeout_id = GLib.timeout_add(2000,
-                                                     self.__preload_webviews)
         return webview
 
     def add_webviews(self, items):
@@ -161,6 +165,8 @@ class Container(Gtk.Overlay):
             Add webviews to container
             @param items as [(uri, title, atime, gtime,
                               ephemeral, state, loading_type)]
+            state can be a session page id, state will be loaded from
+            session db when page is added
         """
         running = self.__pending_items != []
         self.__pending_items += items
@@ -185,6 +191,9 @@ class Container(Gtk.Overlay):
             self.__pages_manager.update_visible_child()
             self.__sites_manager.update_visible_child()
             self.__stack.set_visible_child(view)
+        elif view.offloaded:
+            # Nothing to snapshot, pages manager uses cached artwork
+            self.__stack.add(view)
         elif loading_type in [LoadingType.BACKGROUND, LoadingType.OFFLOAD] or\
                 self.in_expose:
             # Little hack, we force webview to be shown (offscreen)
@@ -218,6 +227,7 @@ class Container(Gtk.Overlay):
         self.__pages_manager.add_view(view)
         self.__sites_manager.add_view(view)
         self.__stack.set_visible_child(view)
+        El().session.add_page(view.webview)
         count = len(self.__stack.get_children())
         self.__window.toolbar.actions.count_label.set_text(str(count))
         El().update_unity_badge()
@@ -259,6 +269,7 @@ class Container(Gtk.Overlay):
             @param view as View
             @param switch as bool
         """
+        view.load_webview()
         self.__current = view
         self.__pages_manager.update_visible_child()
         self.__sites_manager.update_visible_child()
@@ -298,6 +309,9 @@ class Container(Gtk.Overlay):
             Ask user before closing view if forms filled
             @param view as View
         """
+        if view.offloaded:
+            self.close_view(view)
+            return
         page_id = view.webview.get_page_id()
         El().helper.call("FormsFilled", page_id, None,
                          self.__on_forms_filled, view)
@@ -316,6 +330,7 @@ class Container(Gtk.Overlay):
         reversed_children = list(reversed(children))
         children_count = len(children)
         El().history.set_page_state(view.webview.uri)
+        El().session.remove_page(view.webview)
         self.__window.close_popovers()
         # Needed to unfocus titlebar
         self.__window.set_focus(None)
@@ -366,9 +381,7 @@ class Container(Gtk.Overlay):
         """
             Stop webview preloading
         """
-        if self.__preload_timeout_id is not None:
-            GLib.source_remove(self.__preload_timeout_id)
-            self.__preload_timeout_id = None
+        self.__pool.stop()
 
     def next(self):
         """
@@ -421,6 +434,14 @@ class Container(Gtk.Overlay):
         """
         return self.__expose_stack.get_visible_child_name() == "expose"
 
+    @property
+    def pool(self):
+        """
+            Get webview pool
+            @return WebViewPool
+        """
+        return self.__pool
+
     @property
     def pages_manager(self):
         """
@@ -482,31 +503,6 @@ class Container(Gtk.Overlay):
             self.__expose_stack.set_visible_child_name("stack")
             self.__pages_manager.update_visible_child()
 
-    def __get_webview(self, ephemeral):
-        """
-            Get a new webview
-            @param ephemeral as bool
-            @return WebView
-        """
-        if self.__preloaded and not ephemeral:
-            webview = self.__preloaded.pop(0)
-        else:
-            webview = View.get_new_webview(ephemeral, self.__window)
-        return webview
-
-    def __preload_webviews(self):
-        """
-            Preload some webviews
-        """
-        self.__preload_timeout_id = None
-        # Ignore stupid values
-        if self.__preloaded_max < 1 or self.__preloaded_max > 20:
-            return
-        webview = View.get_new_webview(False, self.__window)
-        self.__preloaded.append(webview)
-        if len(self.__preloaded) < self.__preloaded_max:
-            return True
-
     def __get_new_view(self, webview):
         """
             Get a new view
@@ -532,12 +528,52 @@ class Container(Gtk.Overlay):
         if self.__pending_items:
             (uri, title, atime, gtime,
              ephemeral, state, loading_type) = self.__pending_items.pop(0)
+            session_id = None
+            # Placeholder will load state from session when shown
+            if isinstance(state, str) and\
+                    loading_type == LoadingType.OFFLOAD:
+                session_id = state
+                state = None
+            # Load state from session only now, do not block restore
+            elif isinstance(state, str):
+                session_id = state
+                data = El().session.get_state(session_id)
+                if data is None:
+                    state = None
+                else:
+                    state = WebKit2.WebViewSessionState(GLib.Bytes.new(data))
             webview = self.add_webview(uri, loading_type, ephemeral, state)
+            if session_id is not None:
+                webview.set_session_id(session_id)
             webview.set_title(title)
             webview.set_atime(atime)
             webview.set_gtime(gtime)
             GLib.idle_add(self.__add_pending_items)
 
+    def __on_offload_timeout(self):
+        """
+            Offload pages not shown for a while
+        """
+        limit = time() - self.__offload_delay * 60
+        for view in self.__get_children():
+            webview = view.webview
+            if view == self.__current or view.offloaded or\
+                    webview.ephemeral or\
+                    webview.is_loading() or\
+                    webview.is_playing_audio() or\
+                    webview.atime == 0 or\
+                    webview.atime > limit:
+                continue
+            view.offload()
+        return True
+
+    def __on_destroy(self, widget):
+        """
+            Stop preloading
+            @param widget as Gtk.Widget
+        """
+        self.__pool.stop()
+
     def __on_paned_notify_position(self, paned, ignore):
         """
             Update SitesManager width based on current position
@@ -37,6 +37,9 @@ class Context:
             cookie_manager.set_accept_policy(
                                      El().settings.get_enum("cookie-storage"))
         context.set_web_extensions_directory(El().extension_dir)
+        # Web processes only record hooks stats in debug mode
+        context.set_web_extensions_initialization_user_data(
+                                                GLib.Variant("b", El().debug))
         context.set_process_model(
                             WebKit2.ProcessModel.MULTIPLE_SECONDARY_PROCESSES)
         context.set_spell_checking_enabled(
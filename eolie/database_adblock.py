@@ -20,7 +20,9 @@ from time import time
 
 from eolie.helper_task import TaskHelper
 from eolie.sqlcursor import SqlCursor
-from eolie.define import EOLIE_DATA_PATH, ADBLOCK_JS, El
+from eolie.helper_filters import NetworkFilters
+from eolie.define import EOLIE_DATA_PATH, ADBLOCK_JS, ADBLOCK_FILTERS_PATH, El
+from eolie.define import FetchPriority, TaskQueue
 from eolie.utils import debug, remove_www
 
 
@@ -95,6 +97,8 @@ class DatabaseAdblock:
         self.__cancellable = Gio.Cancellable.new()
         self.__task_helper = TaskHelper()
         self.__adblock_mtime = int(time())
+        # Network filters from css lists, compiled with last list
+        self.__filters_lines = []
 
         # Lazy loading if not empty
         if not GLib.file_test(self.DB_PATH, GLib.FileTest.IS_REGULAR):
@@ -103,6 +107,8 @@ class DatabaseAdblock:
                     GLib.mkdir_with_parents(EOLIE_DATA_PATH, 0o0750)
                 # Create db schema
                 with SqlCursor(self) as sql:
+                    # No VACUUM needed later, see MaintenanceHelper
+                    sql.execute("PRAGMA auto_vacuum=INCREMENTAL")
                     sql.execute(self.__create_adblock)
                     sql.execute(self.__create_adblock_css)
                     sql.commit()
@@ -148,10 +154,12 @@ class DatabaseAdblock:
             # Update host rules
             uris = list(self.__URIS)
             uri = uris.pop(0)
-            self.__task_helper.load_uri_content(uri,
-                                                self.__cancellable,
-                                                self.__on_load_uri_content,
-                                                uris)
+            self.__task_helper.load_uri_content(
+                                            uri,
+                                            self.__cancellable,
+                                            self.__on_load_uri_content,
+                                            uris,
+                                            priority=FetchPriority.BACKGROUND)
         else:
             self.__on_save_rules()
 
@@ -316,6 +324,8 @@ class DatabaseAdblock:
                 self.__save_css_default_rule(line)
             elif line.find("##") != -1:
                 self.__save_css_domain_rule(line)
+            else:
+                self.__filters_lines.append(line)
             count += 1
             if count == 1000:
                 with SqlCursor(self) as sql:
@@ -328,6 +338,9 @@ class DatabaseAdblock:
                 sql.execute("DELETE FROM adblock_css\
                              WHERE mtime!=?", (self.__adblock_mtime,))
                 sql.commit()
+            count = NetworkFilters().write(self.__filters_lines)
+            debug("DatabaseAdblock: %s network filters" % count)
+            self.__filters_lines = []
         SqlCursor.remove(self)
 
     def __on_save_css_rules(self, result, uris):
@@ -338,10 +351,12 @@ class DatabaseAdblock:
         """
         if uris:
             uri = uris.pop(0)
-            self.__task_helper.load_uri_content(uri,
-                                                self.__cancellable,
-                                                self.__on_load_uri_css_content,
-                                                uris)
+            self.__task_helper.load_uri_content(
+                                            uri,
+                                            self.__cancellable,
+                                            self.__on_load_uri_css_content,
+                                            uris,
+                                            priority=FetchPriority.BACKGROUND)
 
     def __on_load_uri_css_content(self, uri, status, content, uris):
         """
@@ -353,7 +368,8 @@ class DatabaseAdblock:
         """
         if status:
             self.__task_helper.run(self.__save_css_rules, content, uris,
-                                   callback=(self.__on_save_css_rules, uris))
+                                   callback=(self.__on_save_css_rules, uris),
+                                   queue=TaskQueue.BACKGROUND)
 
     def __on_save_rules(self, result=None, uris=[]):
         """
@@ -363,10 +379,12 @@ class DatabaseAdblock:
         """
         if uris:
             uri = uris.pop(0)
-            self.__task_helper.load_uri_content(uri,
-                                                self.__cancellable,
-                                                self.__on_load_uri_content,
-                                                uris)
+            self.__task_helper.load_uri_content(
+                                            uri,
+                                            self.__cancellable,
+                                            self.__on_load_uri_content,
+                                            uris,
+                                            priority=FetchPriority.BACKGROUND)
         else:
             # Check entries in DB, do we need to update?
             mtime = 0
@@ -377,8 +395,11 @@ class DatabaseAdblock:
                 if v is not None:
                     mtime = v[0]
             # We ignore update value from rules file
-            if self.__adblock_mtime - mtime < self.__UPDATE:
+            if self.__adblock_mtime - mtime < self.__UPDATE and\
+                    GLib.file_test(ADBLOCK_FILTERS_PATH,
+                                   GLib.FileTest.IS_REGULAR):
                 return
+            self.__filters_lines = []
             locales = GLib.get_language_names()
             user_locale = locales[0].split("_")[0]
             try:
@@ -387,10 +408,12 @@ class DatabaseAdblock:
                 uris = []
             uris += list(self.__CSS_URIS)
             uri = uris.pop(0)
-            self.__task_helper.load_uri_content(uri,
-                                                self.__cancellable,
-                                                self.__on_load_uri_css_content,
-                                                uris)
+            self.__task_helper.load_uri_content(
+                                            uri,
+                                            self.__cancellable,
+                                            self.__on_load_uri_css_content,
+                                            uris,
+                                            priority=FetchPriority.BACKGROUND)
 
     def __on_load_uri_content(self, uri, status, content, uris):
         """
@@ -402,4 +425,5 @@ class DatabaseAdblock:
         """
         if status:
             self.__task_helper.run(self.__save_rules, content, uris,
-                                   callback=(self.__on_save_rules, uris))
+                                   callback=(self.__on_save_rules, uris),
+                                   queue=TaskQueue.BACKGROUND)
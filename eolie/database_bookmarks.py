@@ -14,6 +14,10 @@ from gi.repository import GLib, Gio
 
 import sqlite3
 import itertools
+import codecs
+import json
+from html.parser import HTMLParser
+from os import stat
 from urllib.parse import urlparse
 from threading import Lock
 
@@ -21,6 +25,79 @@ from eolie.utils import noaccents, get_random_string
 from eolie.define import EOLIE_DATA_PATH
 from eolie.localized import LocalizedCollation
 from eolie.sqlcursor import SqlCursor
+from eolie.bookmarks_tree import BookmarksTree
+
+
+class BookmarksHTMLParser(HTMLParser):
+    """
+        Incremental parser for Netscape bookmarks files
+        Folders (H3 followed by DL) are used as tags
+    """
+
+    def __init__(self):
+        """
+            Init parser
+        """
+        HTMLParser.__init__(self, convert_charrefs=True)
+        self.__folders = []
+        self.__folder = None
+        self.__text = None
+        self.__link = None
+        self.__bookmarks = []
+
+    def pop(self):
+        """
+            Get bookmarks parsed since last call
+            @return [(title as str, uri as str, tags as [str])]
+        """
+        bookmarks = self.__bookmarks
+        self.__bookmarks = []
+        return bookmarks
+
+    def handle_starttag(self, tag, attrs):
+        """
+            Start collecting text for links and folders
+            @param tag as str
+            @param attrs as [(str, str)]
+        """
+        if tag == "a":
+            self.__link = dict(attrs)
+            self.__text = ""
+        elif tag == "h3":
+            self.__text = ""
+        elif tag == "dl":
+            self.__folders.append(self.__folder or "")
+            self.__folder = None
+
+    def handle_endtag(self, tag):
+        """
+            Save links and folders
+            @param tag as str
+        """
+        if tag == "a" and self.__link is not None:
+            uri = self.__link.get("href", None)
+            if uri is not None:
+                tags = self.__link.get("tags", None)
+                if tags:
+                    tags = tags.split(",")
+                else:
+                    tags = [self.__folders[-1] if self.__folders else ""]
+                self.__bookmarks.append((self.__text.strip(), uri, tags))
+            self.__link = None
+            self.__text = None
+        elif tag == "h3" and self.__text is not None:
+            self.__folder = self.__text.strip()
+            self.__text = None
+        elif tag == "dl" and self.__folders:
+            self.__folders.pop()
+
+    def handle_data(self, data):
+        """
+            Collect text
+            @param data as str
+        """
+        if self.__text is not None:
+            self.__text += data
 
 
 class DatabaseBookmarks:
@@ -30,6 +107,11 @@ class DatabaseBookmarks:
 
     DB_PATH = "%s/bookmarks.db" % EOLIE_DATA_PATH
 
+    # Bookmarks inserted by import batch
+    __IMPORT_BATCH = 500
+    # Bytes read at once from html files
+    __CHUNK_SIZE = 65536
+
     # SQLite documentation:
     # In SQLite, a column with type INTEGER PRIMARY KEY
     # is an alias for the ROWID.
@@ -58,25 +140,114 @@ class DatabaseBookmarks:
                                         bookmark_id INT NOT NULL,
                                         parent_guid TEXT NOT NULL,
                                         parent_name TEXT NOT NULL)'''
+    __create_indexes = (
+        "CREATE INDEX IF NOT EXISTS idx_bookmarks_uri ON bookmarks(uri)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_bookmarks_tags\
+            ON bookmarks_tags(bookmark_id, tag_id)",
+        "CREATE INDEX IF NOT EXISTS idx_bookmarks_tags_tag_id\
+            ON bookmarks_tags(tag_id)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_tags_title\
+            ON tags(title COLLATE NOCASE)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_parents_bookmark_id\
+            ON parents(bookmark_id)")
+    __create_guid_index = "CREATE UNIQUE INDEX IF NOT EXISTS\
+                           idx_bookmarks_guid ON bookmarks(guid)"
+
+    # An upgrade is a request or a tuple of requests
+    __UPGRADES = {
+        # Drop duplicates before adding unique indexes:
+        # orphan tags associations, tags only differing by case,
+        # duplicated associations and parents (keep last one)
+        1: ("DELETE FROM bookmarks_tags\
+                WHERE tag_id NOT IN (SELECT rowid FROM tags)",
+            "UPDATE bookmarks_tags SET tag_id=(\
+                SELECT MIN(t2.rowid) FROM tags AS t1, tags AS t2\
+                WHERE t1.rowid=bookmarks_tags.tag_id\
+                AND t2.title=t1.title COLLATE NOCASE)",
+            "DELETE FROM tags WHERE rowid NOT IN (\
+                SELECT MIN(rowid) FROM tags GROUP BY title COLLATE NOCASE)",
+            "DELETE FROM bookmarks_tags WHERE rowid NOT IN (\
+                SELECT MIN(rowid) FROM bookmarks_tags\
+                GROUP BY bookmark_id, tag_id)",
+            "DELETE FROM parents WHERE rowid NOT IN (\
+                SELECT MAX(rowid) FROM parents GROUP BY bookmark_id)") +
+        __create_indexes,
+        # One row by guid: last not deleted one, else last one.
+        # Folders (guid as uri) can be duplicated by imports after a
+        # delete: children use parent guid, extra rows are dropped.
+        # Other duplicated bookmarks get a new guid
+        2: ("DROP TABLE IF EXISTS temp.bookmarks_keep",
+            "CREATE TEMP TABLE bookmarks_keep (guid TEXT PRIMARY KEY,\
+                                               id INT NOT NULL)",
+            "INSERT INTO bookmarks_keep (guid, id)\
+                SELECT guid, MAX(rowid) FROM bookmarks\
+                WHERE del=0 GROUP BY guid",
+            "INSERT OR IGNORE INTO bookmarks_keep (guid, id)\
+                SELECT guid, MAX(rowid) FROM bookmarks GROUP BY guid",
+            "DELETE FROM bookmarks_tags WHERE bookmark_id IN (\
+                SELECT rowid FROM bookmarks WHERE uri=guid\
+                AND rowid NOT IN (SELECT id FROM bookmarks_keep))",
+            "DELETE FROM parents WHERE bookmark_id IN (\
+                SELECT rowid FROM bookmarks WHERE uri=guid\
+                AND rowid NOT IN (SELECT id FROM bookmarks_keep))",
+            "DELETE FROM bookmarks WHERE uri=guid\
+                AND rowid NOT IN (SELECT id FROM bookmarks_keep)",
+            "UPDATE bookmarks SET guid=lower(hex(randomblob(6)))\
+                WHERE rowid NOT IN (SELECT id FROM bookmarks_keep)",
+            "DROP TABLE bookmarks_keep",
+            __create_guid_index)
+    }
 
     def __init__(self):
         """
             Create database tables or manage update if needed
         """
+        new_version = len(self.__UPGRADES)
         self.thread_lock = Lock()
+        # Tags for bookmark ids, see get_tags()
+        self.__tags_cache = {}
+        self.__tags_generation = 0
         if not GLib.file_test(self.DB_PATH, GLib.FileTest.IS_REGULAR):
             try:
                 if not GLib.file_test(EOLIE_DATA_PATH, GLib.FileTest.IS_DIR):
                     GLib.mkdir_with_parents(EOLIE_DATA_PATH, 0o0750)
                 # Create db schema
                 with SqlCursor(self) as sql:
+                    # No VACUUM needed later, see MaintenanceHelper
+                    sql.execute("PRAGMA auto_vacuum=INCREMENTAL")
                     sql.execute(self.__create_bookmarks)
                     sql.execute(self.__create_tags)
                     sql.execute(self.__create_bookmarks_tags)
                     sql.execute(self.__create_parents)
+                    for request in self.__create_indexes:
+                        sql.execute(request)
+                    sql.execute(self.__create_guid_index)
+                    sql.execute("PRAGMA user_version=%s" % new_version)
                     sql.commit()
             except Exception as e:
                 print("DatabaseBookmarks::__init__(): %s" % e)
+        # DB upgrade, TODO Make it generic between class
+        version = 0
+        with SqlCursor(self) as sql:
+            result = sql.execute("PRAGMA user_version")
+            v = result.fetchone()
+            if v is not None:
+                version = v[0]
+            if version < new_version:
+                for i in range(version+1, new_version + 1):
+                    try:
+                        upgrade = self.__UPGRADES[i]
+                        if isinstance(upgrade, str):
+                            upgrade = (upgrade,)
+                        for request in upgrade:
+                            sql.execute(request)
+                        sql.execute("PRAGMA user_version=%s" % i)
+                        sql.commit()
+                    except Exception as e:
+                        # Retry on next start, never skip an upgrade
+                        print("Bookmarks DB upgrade %s failed:" % i, e)
+                        sql.rollback()
+                        break
 
     def add(self, title, uri, guid, tags, atime=0, commit=True):
         """
@@ -108,11 +279,12 @@ class DatabaseBookmarks:
                 tag_id = self.get_tag_id(tag)
                 if tag_id is None:
                     tag_id = self.add_tag(tag)
-                sql.execute("INSERT INTO bookmarks_tags\
+                sql.execute("INSERT OR IGNORE INTO bookmarks_tags\
                              (bookmark_id, tag_id) VALUES (?, ?)",
                             (bookmarks_id, tag_id))
             if commit:
                 sql.commit()
+            self.__invalidate_tags(bookmarks_id)
             return bookmarks_id
 
     def delete(self, bookmark_id, delete=True, commit=True):
@@ -144,6 +316,7 @@ class DatabaseBookmarks:
                          WHERE bookmark_id=?", (bookmark_id,))
             if commit:
                 sql.commit()
+        self.__invalidate_tags(bookmark_id)
 
     def add_tag(self, tag, commit=False):
         """
@@ -152,11 +325,14 @@ class DatabaseBookmarks:
             @return tag id as int
         """
         with SqlCursor(self) as sql:
-            result = sql.execute("INSERT INTO tags\
+            result = sql.execute("INSERT OR IGNORE INTO tags\
                                   (title) VALUES (?)",
                                  (tag,))
             if commit:
                 sql.commit()
+            # Titles are unique, case insensitive
+            if result.rowcount == 0:
+                return self.get_tag_id(tag)
             return result.lastrowid
 
     def del_tag(self, tag, commit=False):
@@ -174,16 +350,30 @@ class DatabaseBookmarks:
                          WHERE tag_id=?", (tag_id,))
             if commit:
                 sql.commit()
+        self.__invalidate_tags()
 
     def rename_tag(self, old, new):
         """
-            Rename tag
+            Rename tag, merge it if new tag exists
             @param old as str
             @param new as str
         """
         with SqlCursor(self) as sql:
-            sql.execute("UPDATE tags set title=? WHERE title=?", (new, old))
+            old_id = self.get_tag_id(old)
+            new_id = self.get_tag_id(new)
+            if old_id is not None and new_id is not None and\
+                    old_id != new_id:
+                # Associations are unique
+                sql.execute("UPDATE OR IGNORE bookmarks_tags\
+                             SET tag_id=? WHERE tag_id=?", (new_id, old_id))
+                sql.execute("DELETE FROM bookmarks_tags\
+                             WHERE tag_id=?", (old_id,))
+                sql.execute("DELETE FROM tags WHERE rowid=?", (old_id,))
+            else:
+                sql.execute("UPDATE tags set title=? WHERE title=?",
+                            (new, old))
             sql.commit()
+        self.__invalidate_tags()
 
     def get_tags(self, bookmark_id):
         """
@@ -191,6 +381,10 @@ class DatabaseBookmarks:
             @param bookmark id as int
             @return [str]
         """
+        tags = self.__tags_cache.get(bookmark_id, None)
+        if tags is not None:
+            return list(tags)
+        generation = self.__tags_generation
         with SqlCursor(self) as sql:
             result = sql.execute("SELECT tags.title\
                                   FROM tags, bookmarks_tags\
@@ -198,7 +392,11 @@ class DatabaseBookmarks:
                                   AND bookmarks_tags.tag_id=tags.rowid\
                                   ORDER BY title COLLATE LOCALIZED",
                                  (bookmark_id,))
-            return list(itertools.chain(*result))
+            tags = list(itertools.chain(*result))
+        # Tags changed while reading them, do not cache
+        if generation == self.__tags_generation:
+            self.__tags_cache[bookmark_id] = tags
+        return list(tags)
 
     def has_tag(self, bookmark_id, tag):
         """
@@ -375,6 +573,29 @@ class DatabaseBookmarks:
                                   ORDER BY position ASC", (guid,))
             return list(itertools.chain(*result))
 
+    def get_tree(self):
+        """
+            Get a snapshot of all bookmarks, loaded in two queries
+            @return BookmarksTree
+        """
+        with SqlCursor(self) as sql:
+            result = sql.execute("SELECT bookmarks.rowid, bookmarks.guid,\
+                                         bookmarks.uri, bookmarks.title,\
+                                         bookmarks.position, bookmarks.del,\
+                                         bookmarks.mtime, parents.parent_guid,\
+                                         parents.parent_name\
+                                  FROM bookmarks LEFT JOIN parents\
+                                  ON parents.bookmark_id=bookmarks.rowid\
+                                  ORDER BY bookmarks.rowid")
+            rows = list(result)
+            result = sql.execute("SELECT bookmarks_tags.bookmark_id,\
+                                         tags.title\
+                                  FROM tags, bookmarks_tags\
+                                  WHERE bookmarks_tags.tag_id=tags.rowid\
+                                  ORDER BY title COLLATE LOCALIZED")
+            tags = list(result)
+        return BookmarksTree(rows, tags)
+
     def get_mtime(self, bookmark_id):
         """
             Get bookmark mtime
@@ -678,6 +899,7 @@ class DatabaseBookmarks:
         with SqlCursor(self) as sql:
             sql.execute("UPDATE tags SET title=? WHERE id=?", (title, tag_id,))
             sql.commit()
+        self.__invalidate_tags()
 
     def set_more_popular(self, uri):
         """
@@ -702,11 +924,12 @@ class DatabaseBookmarks:
             @param commit as bool
         """
         with SqlCursor(self) as sql:
-            sql.execute("INSERT INTO bookmarks_tags\
+            sql.execute("INSERT OR IGNORE INTO bookmarks_tags\
                          (bookmark_id, tag_id) VALUES (?, ?)",
                         (bookmark_id, tag_id))
             if commit:
                 sql.commit()
+        self.__invalidate_tags(bookmark_id)
 
     def del_tag_from(self, tag_id, bookmark_id, commit=True):
         """
@@ -721,6 +944,7 @@ class DatabaseBookmarks:
                         (bookmark_id, tag_id))
             if commit:
                 sql.commit()
+        self.__invalidate_tags(bookmark_id)
 
     def clean_tags(self):
         """
@@ -735,6 +959,7 @@ class DatabaseBookmarks:
                             AND bookmarks.rowid = bookmarks_tags.bookmark_id\
                             AND bookmarks.del!=1)")
             sql.commit()
+        self.__invalidate_tags()
 
     def reset_popularity(self, uri):
         """
@@ -758,129 +983,51 @@ class DatabaseBookmarks:
                 return True
             return False
 
-    def import_html(self, path):
+    def import_html(self, path, progress=None):
         """
-            Import html bookmarks
+            Import html bookmarks (Netscape format)
             @param path as str
+            @param progress as function(fraction as float)/None
+            @return imported bookmarks count as int
+            @thread safe
         """
         try:
-            self.thread_lock.acquire()
-            from bs4 import BeautifulSoup
-            SqlCursor.add(self)
-            f = Gio.File.new_for_path(path)
-            if not f.query_exists():
-                return
-            (status, content, tag) = f.load_contents(None)
-            if status:
-                data = content.decode("utf-8")
-                soup = BeautifulSoup(data, "html.parser")
-                parent_name = ""
-                position = 0
-                for dt in soup.findAll("dt"):
-                    h3 = dt.find("h3")
-                    if h3 is not None:
-                        parent_name = h3.contents[0]
-                        continue
-                    else:
-                        a = dt.find("a")
-                        uri = a.get("href")
-                        if a.get("tags") is None:
-                            tags = [parent_name]
-                        else:
-                            tags = [a.get("tags")]
-                        title = a.contents[0]
-                        if uri is None:
-                            parent_name = title
-                            continue
-                        elif not uri.startswith('http') or not title:
-                            continue
-                        uri = uri.rstrip('/')
-                        rowid = self.get_id(uri)
-                        if rowid is None:
-                            if not tags:
-                                tags = [parent_name]
-                            # Add bookmark
-                            bookmark_id = self.add(title, uri, None,
-                                                   tags, 0, False)
-                            # Set position
-                            self.set_position(bookmark_id, position, False)
-                            position += 1
-            with SqlCursor(self) as sql:
-                sql.commit()
-            SqlCursor.remove(self)
+            return self.__import(self.__parse_html(path), progress)
         except Exception as e:
             print("DatabaseBookmarks::import_html:", e)
-        finally:
-            self.thread_lock.release()
+            return 0
 
-    def import_chromium(self, chrome):
+    def import_chromium(self, chrome, progress=None):
         """
             Chromium/Chrome importer
             As Eolie doesn't sync with Chromium, we do not handle parent
             guid and just import parents as tags
             @param chrome as bool
+            @param progress as function(fraction as float)/None
+            @return imported bookmarks count as int
+            @thread safe
         """
         try:
-            self.thread_lock.acquire()
-            SqlCursor.add(self)
-            import json
             homedir = GLib.get_home_dir()
             if chrome:
                 path = homedir + "/.config/chrome/Default/Bookmarks"
             else:
                 path = homedir + "/.config/chromium/Default/Bookmarks"
-            f = Gio.File.new_for_path(path)
-            if not f.query_exists():
-                return
-            (status, content, tag) = f.load_contents(None)
-            if status:
-                data = content.decode("utf-8")
-                j = json.loads(data)
-                parents = []
-                # Setup initial parents
-                for root in j["roots"]:
-                    parents.append(("", j["roots"][root]["children"]))
-                # Walk parents and children
-                while parents:
-                    (parent_name, children) = parents.pop(0)
-                    bookmarks = []
-                    for child in children:
-                        if child["type"] == "folder":
-                            parents.append((child["name"], child["children"]))
-                        elif child["type"] == "url":
-                            bookmarks.append((child["name"],
-                                             child["url"]))
-                    position = 0
-                    for bookmark in bookmarks:
-                        tags = [parent_name]
-                        title = bookmark[0]
-                        uri = bookmark[1]
-                        if not uri.startswith('http') or not title:
-                            continue
-                        uri = uri.rstrip('/')
-                        rowid = self.get_id(uri)
-                        if rowid is None:
-                            # Add bookmark
-                            bookmark_id = self.add(title, uri, None,
-                                                   tags, 0, False)
-                            # Set position
-                            self.set_position(bookmark_id, position, False)
-                            position += 1
-                with SqlCursor(self) as sql:
-                    sql.commit()
-                SqlCursor.remove(self)
+            if not GLib.file_test(path, GLib.FileTest.IS_REGULAR):
+                return 0
+            return self.__import(self.__parse_chromium(path), progress)
         except Exception as e:
             print("DatabaseBookmarks::import_chromium:", e)
-        finally:
-            self.thread_lock.release()
+            return 0
 
-    def import_firefox(self):
+    def import_firefox(self, progress=None):
         """
             Mozilla Firefox importer
+            @param progress as function(fraction as float)/None
+            @return imported bookmarks count as int
+            @thread safe
         """
         try:
-            self.thread_lock.acquire()
-            SqlCursor.add(self)
             firefox_path = GLib.get_home_dir() + "/.mozilla/firefox/"
             d = Gio.File.new_for_path(firefox_path)
             infos = d.enumerate_children(
@@ -896,55 +1043,16 @@ class DatabaseBookmarks:
                     if f.query_exists():
                         sqlite_path = f.get_path()
                         break
-            if sqlite_path is not None:
-                c = sqlite3.connect(sqlite_path, 600.0)
-                # Add bookmarks
-                bookmarks = self.__get_firefox_bookmarks(c)
-                for (title, uri,  parent_name, bookmark_guid,
-                     parent_guid, position) in bookmarks:
-                    tags = self.__get_tags_for_firefox_bookmark(c,
-                                                                bookmark_guid)
-                    bookmark_guid = self.__clean_guid(bookmark_guid)
-                    parent_guid = self.__clean_guid(parent_guid)
-                    if not uri.startswith('http') or not title:
-                        continue
-                    uri = uri.rstrip('/')
-                    rowid = self.get_id(uri)
-                    if rowid is None:
-                        # If bookmark is not tagged, we use parent name
-                        if not tags:
-                            tags = [parent_name]
-                        # Bookmarks and folder
-                        bookmark_id = self.add(title, uri, bookmark_guid,
-                                               tags, 0, False)
-                        self.set_parent(bookmark_id, parent_guid,
-                                        parent_name, False)
-                        self.set_position(bookmark_id, position, False)
-                # Add folders, we need to get them
-                # as Firefox needs children order
-                parents = self.__get_firefox_parents(c)
-                for (title, parent_name, bookmark_guid,
-                     parent_guid, position) in parents:
-                    bookmark_guid = self.__clean_guid(bookmark_guid)
-                    parent_guid = self.__clean_guid(parent_guid)
-                    if not title or bookmark_guid == "root":
-                        continue
-                    uri = bookmark_guid
-                    rowid = self.get_id(uri)
-                    if rowid is None:
-                        # Bookmarks and folder
-                        bookmark_id = self.add(title, uri, bookmark_guid,
-                                               [], 0, False)
-                        self.set_parent(bookmark_id, parent_guid,
-                                        parent_name, False)
-                        self.set_position(bookmark_id, position, False)
-            with SqlCursor(self) as sql:
-                sql.commit()
-            SqlCursor.remove(self)
+            if sqlite_path is None:
+                return 0
+            c = sqlite3.connect(sqlite_path, 600.0)
+            try:
+                return self.__import(self.__parse_firefox(c), progress)
+            finally:
+                c.close()
         except Exception as e:
             print("DatabaseBookmarks::import_firefox:", e)
-        finally:
-            self.thread_lock.release()
+            return 0
 
     def exists_guid(self, guid):
         """
@@ -1072,24 +1180,25 @@ class DatabaseBookmarks:
                             AND bookmarks.type=1")
         return list(result)
 
-    def __get_tags_for_firefox_bookmark(self, c, guid):
+    def __get_firefox_tags(self, c):
         """
-            Return firefox bookmarks
+            Return firefox tags for all bookmarks
             @param c as Sqlite cursor
-            @param guid as str
-            @return (title, url, parent title, guid, parent guid, position)
-             as (str, str, str, str, str, int)
+            @return {guid as str: [str]}
         """
-        result = c.execute("SELECT parent.title\
+        result = c.execute("SELECT bookmarks.guid, parent.title\
                             FROM moz_bookmarks AS bookmarks,\
                                  moz_bookmarks AS tag,\
                                  moz_bookmarks AS parent\
                             WHERE bookmarks.fk=tag.fk\
-                            AND tag.fk=bookmarks.fk\
                             AND tag.title is null\
-                            AND parent.id=tag.parent\
-                            AND bookmarks.guid=?", (guid,))
-        return list(itertools.chain(*result))
+                            AND parent.id=tag.parent")
+        tags = {}
+        for (guid, title) in result:
+            if guid not in tags.keys():
+                tags[guid] = []
+            tags[guid].append(title)
+        return tags
 
     def __get_firefox_parents(self, c):
         """
@@ -1127,3 +1236,211 @@ class DatabaseBookmarks:
             return "mobile"
         else:
             return guid
+
+    def __invalidate_tags(self, bookmark_id=None):
+        """
+            Forget cached tags
+            @param bookmark_id as int/None for all bookmarks
+        """
+        self.__tags_generation += 1
+        if bookmark_id is None:
+            self.__tags_cache = {}
+        else:
+            self.__tags_cache.pop(bookmark_id, None)
+
+    def __get_tag_key(self, title):
+        """
+            Get a key matching tags like COLLATE NOCASE (ASCII only)
+            @param title as str
+            @return str
+        """
+        return "".join(c.lower() if c < "\x80" else c for c in title)
+
+    def __import(self, items, progress):
+        """
+            Add new bookmarks from items in one transaction
+            Existing uris, guids and tags are loaded first, then rows are
+            inserted by batches
+            @param items as iterator of (fraction as float,
+                                         (title, uri, guid, tags,
+                                          parent_guid, parent_name,
+                                          position))
+            @param progress as function(fraction as float)/None
+            @return imported bookmarks count as int
+        """
+        count = 0
+        with self.thread_lock:
+            with SqlCursor(self) as sql:
+                result = sql.execute("SELECT uri FROM bookmarks WHERE del=0")
+                uris = set(itertools.chain(*result))
+                result = sql.execute("SELECT guid FROM bookmarks")
+                guids = set(itertools.chain(*result))
+                tags = {}
+                result = sql.execute("SELECT rowid, title FROM tags\
+                                      ORDER BY rowid")
+                for (tag_id, title) in result:
+                    tags.setdefault(self.__get_tag_key(title), tag_id)
+                # Ids are set here, no need to query them back
+                result = sql.execute("SELECT MAX(rowid) FROM bookmarks")
+                bookmark_id = result.fetchone()[0] or 0
+                result = sql.execute("SELECT MAX(rowid) FROM tags")
+                tag_id = result.fetchone()[0] or 0
+                rows = {"bookmarks": [], "tags": [],
+                        "bookmarks_tags": [], "parents": []}
+                for (fraction, item) in items:
+                    (title, uri, guid, item_tags,
+                     parent_guid, parent_name, position) = item
+                    uri = uri.rstrip("/")
+                    if uri in uris:
+                        continue
+                    # Guids are unique, folders are known by their guid
+                    if guid in guids:
+                        if uri == guid:
+                            continue
+                        guid = None
+                    uris.add(uri)
+                    while guid is None:
+                        guid = get_random_string(12)
+                        if guid in guids:
+                            guid = None
+                    guids.add(guid)
+                    bookmark_id += 1
+                    rows["bookmarks"].append((bookmark_id, title, uri,
+                                              0, 0, guid, 0, position))
+                    for key in set(self.__get_tag_key(tag)
+                                   for tag in item_tags if tag):
+                        if key not in tags.keys():
+                            tag_id += 1
+                            tags[key] = tag_id
+                            tag = [tag for tag in item_tags
+                                   if self.__get_tag_key(tag) == key][0]
+                            rows["tags"].append((tag_id, tag))
+                        rows["bookmarks_tags"].append((bookmark_id,
+                                                       tags[key]))
+                    if parent_guid is not None:
+                        rows["parents"].append((bookmark_id, parent_guid,
+                                                parent_name))
+                    count += 1
+                    if len(rows["bookmarks"]) >= self.__IMPORT_BATCH:
+                        self.__insert_rows(sql, rows)
+                        if progress is not None:
+                            progress(fraction)
+                self.__insert_rows(sql, rows)
+                sql.commit()
+        self.__invalidate_tags()
+        if progress is not None:
+            progress(1.0)
+        return count
+
+    def __insert_rows(self, sql, rows):
+        """
+            Insert pending import rows, lists are emptied
+            @param sql as sqlite cursor
+            @param rows as {str: [tuple]}
+        """
+        sql.executemany("INSERT INTO bookmarks\
+                         (id, title, uri, popularity, atime,\
+                          guid, mtime, position)\
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows["bookmarks"])
+        sql.executemany("INSERT INTO tags (id, title) VALUES (?, ?)",
+                        rows["tags"])
+        sql.executemany("INSERT INTO bookmarks_tags\
+                         (bookmark_id, tag_id) VALUES (?, ?)",
+                        rows["bookmarks_tags"])
+        sql.executemany("INSERT INTO parents\
+                         (bookmark_id, parent_guid, parent_name)\
+                         VALUES (?, ?, ?)", rows["parents"])
+        for value in rows.values():
+            del value[:]
+
+    def __parse_html(self, path):
+        """
+            Read html bookmarks by chunks, folders are used as tags
+            @param path as str
+            @return iterator of (fraction, item), see __import()
+        """
+        size = max(stat(path).st_size, 1)
+        parser = BookmarksHTMLParser()
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        position = 0
+        read = 0
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(self.__CHUNK_SIZE)
+                read += len(chunk)
+                parser.feed(decoder.decode(chunk, not chunk))
+                for (title, uri, tags) in parser.pop():
+                    if not uri.startswith("http") or not title:
+                        continue
+                    yield (read / size,
+                           (title, uri, None, tags, None, None, position))
+                    position += 1
+                if not chunk:
+                    break
+        parser.close()
+
+    def __parse_chromium(self, path):
+        """
+            Read chromium bookmarks, folders are used as tags
+            @param path as str
+            @return iterator of (fraction, item), see __import()
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            j = json.load(f)
+        bookmarks = []
+        parents = []
+        # Setup initial parents
+        for root in j["roots"]:
+            if isinstance(j["roots"][root], dict):
+                parents.append(("", j["roots"][root].get("children", [])))
+        # Walk parents and children
+        while parents:
+            (parent_name, children) = parents.pop(0)
+            position = 0
+            for child in children:
+                if child["type"] == "folder":
+                    parents.append((child["name"], child["children"]))
+                elif child["type"] == "url":
+                    title = child["name"]
+                    uri = child["url"]
+                    if not uri.startswith("http") or not title:
+                        continue
+                    bookmarks.append((title, uri, None, [parent_name],
+                                      None, None, position))
+                    position += 1
+        for (i, bookmark) in enumerate(bookmarks):
+            yield ((i + 1) / len(bookmarks), bookmark)
+
+    def __parse_firefox(self, c):
+        """
+            Read firefox bookmarks then folders
+            as Firefox needs children order
+            @param c as Sqlite cursor
+            @return iterator of (fraction, item), see __import()
+        """
+        tags = self.__get_firefox_tags(c)
+        bookmarks = self.__get_firefox_bookmarks(c)
+        parents = self.__get_firefox_parents(c)
+        total = max(len(bookmarks) + len(parents), 1)
+        index = 0
+        for (title, uri,  parent_name, bookmark_guid,
+             parent_guid, position) in bookmarks:
+            index += 1
+            if not uri.startswith('http') or not title:
+                continue
+            # If bookmark is not tagged, we use parent name
+            bookmark_tags = tags.get(bookmark_guid, [parent_name])
+            yield (index / total,
+                   (title, uri, self.__clean_guid(bookmark_guid),
+                    bookmark_tags, self.__clean_guid(parent_guid),
+                    parent_name, position))
+        for (title, parent_name, bookmark_guid,
+             parent_guid, position) in parents:
+            index += 1
+            bookmark_guid = self.__clean_guid(bookmark_guid)
+            if not title or bookmark_guid == "root":
+                continue
+            # Folders uri is their guid
+            yield (index / total,
+                   (title, bookmark_guid, bookmark_guid, [],
+                    self.__clean_guid(parent_guid), parent_name, position))
@@ -93,6 +93,15 @@ class DatabaseExceptions:
                                   WHERE domain=?", (domain,))
             return list(itertools.chain(*result))
 
+    def get_all(self):
+        """
+            Get all exceptions
+            @return [(value as str, domain as str)]
+        """
+        with SqlCursor(self) as sql:
+            result = sql.execute("SELECT value, domain FROM exceptions")
+            return list(result)
+
     def find(self, value, domain=""):
         """
             True if value is an exception
@@ -14,13 +14,16 @@ from gi.repository import GLib
 
 import sqlite3
 import itertools
+from bisect import bisect_left, insort
 from urllib.parse import urlparse
 from threading import Lock
 
 from eolie.utils import noaccents, get_random_string
-from eolie.define import EOLIE_DATA_PATH
+from eolie.define import EOLIE_DATA_PATH, El
 from eolie.localized import LocalizedCollation
 from eolie.sqlcursor import SqlCursor
+from eolie.helper_task import TaskHelper
+from eolie.trie import Trie
 
 
 class DatabaseHistory:
@@ -29,9 +32,49 @@ class DatabaseHistory:
     """
     DB_PATH = "%s/history.db" % EOLIE_DATA_PATH
 
+    # Delay before writing pending visits to db (ms)
+    __DELAY = 5000
+    # Rows deleted per transaction when enforcing retention
+    __BATCH_SIZE = 500
+
+    # An upgrade is a request or a tuple of requests
     __UPGRADES = {
         1: "ALTER TABLE history ADD opened INT NOT NULL DEFAULT 0",
-        2: "ALTER TABLE history ADD netloc TEXT NOT NULL DEFAULT ''"
+        2: "ALTER TABLE history ADD netloc TEXT NOT NULL DEFAULT ''",
+        # Merge duplicated uris, keep last entry, drop orphan atimes
+        # No index on uri yet: kept entries go in an indexed temp table
+        3: ("DROP TABLE IF EXISTS temp.history_keep",
+            "DELETE FROM history_atime\
+                WHERE history_id NOT IN (SELECT rowid FROM history)",
+            "CREATE TEMP TABLE history_keep (uri TEXT PRIMARY KEY,\
+                                             id INT NOT NULL)",
+            "INSERT INTO history_keep (uri, id)\
+                SELECT uri, MAX(rowid) FROM history GROUP BY uri",
+            "UPDATE history_atime SET history_id=(\
+                SELECT k.id FROM history AS h, history_keep AS k\
+                WHERE h.rowid=history_atime.history_id AND k.uri=h.uri)\
+             WHERE history_id NOT IN (SELECT id FROM history_keep)",
+            "DELETE FROM history\
+                WHERE rowid NOT IN (SELECT id FROM history_keep)",
+            "DROP TABLE history_keep",
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_history_uri\
+                ON history(uri)"),
+        # Atimes follow their history entry, orphans are dropped
+        4: ("CREATE TABLE history_atime_new (\
+                history_id INT NOT NULL\
+                    REFERENCES history(id) ON DELETE CASCADE,\
+                atime REAL NOT NULL)",
+            "INSERT INTO history_atime_new (history_id, atime)\
+                SELECT history_id, atime FROM history_atime\
+                WHERE history_id IN (SELECT rowid FROM history)",
+            "DROP TABLE history_atime",
+            "ALTER TABLE history_atime_new RENAME TO history_atime",
+            "CREATE INDEX IF NOT EXISTS idx_history_atime_atime\
+                ON history_atime(atime)",
+            "CREATE INDEX IF NOT EXISTS idx_history_atime_history_id\
+                ON history_atime(history_id, atime)"),
+        5: "CREATE INDEX IF NOT EXISTS idx_history_netloc\
+                ON history(netloc)"
     }
 
     # SQLite documentation:
@@ -50,9 +93,20 @@ class DatabaseHistory:
                                                popularity INT NOT NULL
                                                )'''
     __create_history_atime = '''CREATE TABLE history_atime (
-                                                history_id INT NOT NULL,
-                                                atime REAL NOT NULL
-                                               )'''
+                                        history_id INT NOT NULL
+                                            REFERENCES history(id)
+                                            ON DELETE CASCADE,
+                                        atime REAL NOT NULL
+                                       )'''
+    __create_history_uri_idx = '''CREATE UNIQUE INDEX idx_history_uri
+                                  ON history(uri)'''
+    __create_history_netloc_idx = '''CREATE INDEX idx_history_netloc
+                                     ON history(netloc)'''
+    __create_history_atime_idx = '''CREATE INDEX idx_history_atime_atime
+                                    ON history_atime(atime)'''
+    __create_history_atime_id_idx = '''CREATE INDEX
+                                       idx_history_atime_history_id
+                                       ON history_atime(history_id, atime)'''
 
     def __init__(self):
         """
@@ -60,14 +114,27 @@ class DatabaseHistory:
         """
         new_version = len(self.__UPGRADES)
         self.thread_lock = Lock()
+        self.__pending = {}
+        self.__flush_timeout_id = None
+        # Completion index, built by build_completion_index()
+        # Paths are {host: ([paths sorted], {path: score})}
+        self.__index_lock = Lock()
+        self.__hosts = None
+        self.__paths = {}
         if not GLib.file_test(self.DB_PATH, GLib.FileTest.IS_REGULAR):
             try:
                 if not GLib.file_test(EOLIE_DATA_PATH, GLib.FileTest.IS_DIR):
                     GLib.mkdir_with_parents(EOLIE_DATA_PATH, 0o0750)
                 # Create db schema
                 with SqlCursor(self) as sql:
+                    # No VACUUM needed later, see MaintenanceHelper
+                    sql.execute("PRAGMA auto_vacuum=INCREMENTAL")
                     sql.execute(self.__create_history)
                     sql.execute(self.__create_history_atime)
+                    sql.execute(self.__create_history_uri_idx)
+                    sql.execute(self.__create_history_netloc_idx)
+                    sql.execute(self.__create_history_atime_idx)
+                    sql.execute(self.__create_history_atime_id_idx)
                     sql.execute("PRAGMA user_version=%s" % new_version)
                     sql.commit()
             except Exception as e:
@@ -82,15 +149,23 @@ class DatabaseHistory:
             if version < new_version:
                 for i in range(version+1, new_version + 1):
                     try:
-                        sql.execute(self.__UPGRADES[i])
-                    except:
-                        print("History DB upgrade %s failed" % i)
-                sql.execute("PRAGMA user_version=%s" % new_version)
-                sql.commit()
+                        upgrade = self.__UPGRADES[i]
+                        if isinstance(upgrade, str):
+                            upgrade = (upgrade,)
+                        for request in upgrade:
+                            sql.execute(request)
+                        sql.execute("PRAGMA user_version=%s" % i)
+                        sql.commit()
+                    except Exception as e:
+                        # Retry on next start, never skip an upgrade
+                        print("History DB upgrade %s failed:" % i, e)
+                        sql.rollback()
+                        break
 
     def add(self, title, uri, mtime, guid=None, atimes=[], commit=True):
         """
             Add a new entry to history, if exists, update it
+            Entries are unique by uri
             @param title as str
             @param uri as str
             @param mtime as int
@@ -103,23 +178,31 @@ class DatabaseHistory:
             return
         uri = uri.rstrip('/')
         parsed = urlparse(uri)
-        # Find an uniq guid
-        while guid is None:
-            guid = get_random_string(12)
-            if self.exists_guid(guid):
-                guid = None
         with SqlCursor(self) as sql:
             result = sql.execute("SELECT rowid, popularity FROM history\
-                                  WHERE guid=?", (guid,))
+                                  WHERE uri=?", (uri,))
             v = result.fetchone()
+            # Sync item may have a new uri
+            if v is None and guid is not None:
+                result = sql.execute("SELECT rowid, popularity FROM history\
+                                      WHERE guid=?", (guid,))
+                v = result.fetchone()
             if v is not None:
                 history_id = v[0]
+                popularity = v[1] + 1
                 sql.execute("UPDATE history\
                              SET uri=?, netloc=?, mtime=?,\
-                                 title=?, popularity=?\
+                                 title=?, popularity=?,\
+                                 guid=COALESCE(?, guid)\
                              WHERE rowid=?", (uri, parsed.netloc, mtime, title,
-                                              v[1]+1, history_id))
+                                              popularity, guid, history_id))
             else:
+                popularity = 0
+                # Find an uniq guid
+                while guid is None:
+                    guid = get_random_string(12)
+                    if self.exists_guid(guid):
+                        guid = None
                 result = sql.execute("INSERT INTO history\
                                       (title, uri, netloc,\
                                        mtime, popularity, guid)\
@@ -138,17 +221,61 @@ class DatabaseHistory:
                                  VALUES (?, ?)", (history_id, atime))
             if commit:
                 sql.commit()
-            return history_id
+        with self.__index_lock:
+            if self.__hosts is not None:
+                self.__index_uri(self.__hosts, self.__paths,
+                                 uri, popularity, mtime)
+        return history_id
+
+    def add_visit(self, page_id, title, uri, mtime):
+        """
+            Add a visit, it will be written to db in a few seconds
+            Visits for same page and uri are merged (title changes)
+            @param page_id as str
+            @param title as str
+            @param uri as str
+            @param mtime as double
+        """
+        if not uri:
+            return
+        self.__pending[(page_id, uri.rstrip('/'))] = (title, mtime)
+        if self.__flush_timeout_id is None:
+            self.__flush_timeout_id = GLib.timeout_add(
+                                                     self.__DELAY,
+                                                     self.__on_flush_timeout)
+
+    def flush(self, background=True):
+        """
+            Write pending visits to db in one transaction
+            @param background as bool
+        """
+        if self.__flush_timeout_id is not None:
+            GLib.source_remove(self.__flush_timeout_id)
+            self.__flush_timeout_id = None
+        if not self.__pending:
+            return
+        visits = [(uri, title, mtime) for ((page_id, uri), (title, mtime))
+                  in self.__pending.items()]
+        self.__pending = {}
+        if background:
+            task_helper = TaskHelper()
+            task_helper.run(self.__write_visits, visits,
+                            callback=(self.__on_visits_written,))
+        else:
+            self.__write_visits(visits)
 
     def remove(self, history_id):
         """
             Remove item from history
             @param history id as int
         """
+        uri = self.get_uri(history_id)
         with SqlCursor(self) as sql:
             sql.execute("DELETE from history\
                          WHERE rowid=?", (history_id,))
             sql.commit()
+        if uri is not None:
+            self.__unindex_uris([uri])
 
     def clear_from(self, atime):
         """
@@ -162,13 +289,37 @@ class DatabaseHistory:
 
     def clear_to(self, atime):
         """
-            Clear history to atime
+            Clear history to atime, entries without atime are removed
+            Work is done by small transactions, others writers can run
+            between them
             @param atime as int
+            @thread safe
         """
         with SqlCursor(self) as sql:
-            sql.execute("DELETE FROM history_atime\
-                         WHERE atime <= ?", (atime,))
-            sql.commit()
+            self.__delete_by_batch(
+                sql,
+                "DELETE FROM history_atime WHERE rowid IN (\
+                    SELECT rowid FROM history_atime\
+                    WHERE atime <= ? LIMIT ?)", (atime,))
+            # Keep opened pages, needed to restore state
+            uris = []
+            count = self.__BATCH_SIZE
+            while count == self.__BATCH_SIZE:
+                with self.thread_lock:
+                    result = sql.execute("SELECT history.rowid, history.uri\
+                                          FROM history\
+                                          LEFT JOIN history_atime AS ha\
+                                          ON ha.history_id=history.rowid\
+                                          WHERE ha.history_id IS NULL\
+                                          AND history.opened=0 LIMIT ?",
+                                         (self.__BATCH_SIZE,))
+                    rows = list(result)
+                    sql.executemany("DELETE FROM history WHERE rowid=?",
+                                    [(row[0],) for row in rows])
+                    sql.commit()
+                count = len(rows)
+                uris += [row[1] for row in rows]
+        self.__unindex_uris(uris)
 
     def get_from_atime(self, atime):
         """
@@ -190,9 +341,9 @@ class DatabaseHistory:
         """
         with SqlCursor(self) as sql:
             result = sql.execute("SELECT history.rowid FROM history\
-                                  WHERE NOT EXISTS (\
-                                    SELECT rowid FROM history_atime AS ha\
-                                    WHERE ha.history_id=history.rowid)")
+                                  LEFT JOIN history_atime AS ha\
+                                  ON ha.history_id=history.rowid\
+                                  WHERE ha.history_id IS NULL")
             return list(itertools.chain(*result))
 
     def get(self, atime):
@@ -228,6 +379,21 @@ class DatabaseHistory:
                 return v[0]
             return None
 
+    def get_existing_netlocs(self, netlocs):
+        """
+            Get netlocs from list existing in history
+            @param netlocs as [str]
+            @return [str]
+            @thread safe
+        """
+        if not netlocs:
+            return []
+        with SqlCursor(self) as sql:
+            request = "SELECT DISTINCT netloc FROM history\
+                       WHERE netloc IN (%s)" % ",".join("?" * len(netlocs))
+            result = sql.execute(request, netlocs)
+            return list(itertools.chain(*result))
+
     def get_title(self, history_id):
         """
             Get history title
@@ -327,6 +493,57 @@ class DatabaseHistory:
                                   WHERE mtime > ?", (mtime,))
             return list(itertools.chain(*result))
 
+    def build_completion_index(self):
+        """
+            Build in memory completion index from history
+            @thread safe
+        """
+        hosts = Trie()
+        paths = {}
+        with SqlCursor(self) as sql:
+            result = sql.execute("SELECT uri, popularity, mtime\
+                                  FROM history")
+            for (uri, popularity, mtime) in result:
+                self.__index_uri(hosts, paths, uri, popularity, mtime)
+        with self.__index_lock:
+            self.__hosts = hosts
+            self.__paths = paths
+
+    def get_completion(self, value):
+        """
+            Get best host or host with path starting with value
+            @param value as str
+            @return str/None
+            @thread safe
+        """
+        if value.find("://") != -1:
+            return None
+        if value.startswith("www."):
+            value = value[4:]
+        split = value.split("/", 1)
+        host = split[0].lower()
+        if not host:
+            return None
+        with self.__index_lock:
+            # Index not built yet
+            if self.__hosts is None:
+                return self.__get_completion_from_db(value)
+            if len(split) == 1:
+                return self.__hosts.get(host)
+            path = "/" + split[1]
+            (keys, scores) = self.__paths.get(host, ([], {}))
+            best = None
+            # Paths starting with path are contiguous in sorted keys
+            for i in range(bisect_left(keys, path), len(keys)):
+                if not keys[i].startswith(path):
+                    break
+                score = scores[keys[i]]
+                if best is None or best[0] < score:
+                    best = (score, keys[i])
+            if best is None:
+                return None
+            return host + best[1]
+
     def get_match(self, uri):
         """
             Try to get best uri matching
@@ -562,6 +779,11 @@ class DatabaseHistory:
                 sql.execute("UPDATE history SET popularity=0 WHERE netloc=?",
                             (uri,))
             sql.commit()
+        # Scores only grow in index, index host again
+        if parsed.scheme:
+            self.__unindex_uris([uri])
+        else:
+            self.__unindex_uris(["http://%s" % uri])
 
     def exists_guid(self, guid):
         """
@@ -580,6 +802,7 @@ class DatabaseHistory:
         """
         try:
             c = sqlite3.connect(self.DB_PATH, 600.0)
+            c.execute("PRAGMA foreign_keys=ON")
             c.create_collation('LOCALIZED', LocalizedCollation())
             c.create_function("noaccents", 1, noaccents)
             return c
@@ -589,3 +812,143 @@ class DatabaseHistory:
 #######################
 # PRIVATE             #
 #######################
+    def __get_index_host(self, uri):
+        """
+            Get completion index host for uri
+            @param uri as str
+            @return (host as str, path as str)/None
+        """
+        parsed = urlparse(uri)
+        if parsed.scheme not in ["http", "https"] or not parsed.netloc:
+            return None
+        host = parsed.netloc.lower()
+        if host.startswith("www."):
+            host = host[4:]
+        return (host, parsed.path)
+
+    def __index_uri(self, hosts, paths, uri, popularity, mtime):
+        """
+            Add uri to completion index
+            @param hosts as Trie
+            @param paths as {}
+            @param uri as str
+            @param popularity as int
+            @param mtime as double
+        """
+        index_host = self.__get_index_host(uri)
+        if index_host is None:
+            return
+        (host, path) = index_host
+        score = (popularity, mtime)
+        hosts.add(host, score, host)
+        if path:
+            (keys, scores) = paths.setdefault(host, ([], {}))
+            if path not in scores.keys():
+                insort(keys, path)
+                scores[path] = score
+            elif scores[path] < score:
+                scores[path] = score
+
+    def __unindex_uris(self, uris):
+        """
+            Update completion index for removed uris: their hosts are
+            indexed again from db
+            @param uris as [str]
+            @thread safe
+        """
+        hosts = set()
+        for uri in uris:
+            index_host = self.__get_index_host(uri)
+            if index_host is not None:
+                hosts.add(index_host[0])
+        if not hosts:
+            return
+        with self.__index_lock:
+            if self.__hosts is None:
+                return
+            with SqlCursor(self) as sql:
+                for host in hosts:
+                    self.__hosts.remove(host)
+                    self.__paths.pop(host, None)
+                    result = sql.execute("SELECT uri, popularity, mtime\
+                                          FROM history\
+                                          WHERE netloc=? OR netloc=?",
+                                         (host, "www.%s" % host))
+                    for (uri, popularity, mtime) in result:
+                        self.__index_uri(self.__hosts, self.__paths,
+                                         uri, popularity, mtime)
+
+    def __delete_by_batch(self, sql, request, params):
+        """
+            Run delete request until it removes less than a batch
+            @param sql as sqlite cursor
+            @param request as str, last param is LIMIT
+            @param params as tuple
+            @return removed rows as int
+        """
+        removed = 0
+        count = self.__BATCH_SIZE
+        while count == self.__BATCH_SIZE:
+            with self.thread_lock:
+                result = sql.execute(request, params + (self.__BATCH_SIZE,))
+                sql.commit()
+            count = result.rowcount
+            removed += count
+        return removed
+
+    def __get_completion_from_db(self, value):
+        """
+            Get completion with a db request, slow
+            @param value as str
+            @return str/None
+        """
+        match = self.get_match(value)
+        if match is None:
+            return None
+        match_parsed = urlparse(match)
+        netloc = match_parsed.netloc.replace("www.", "")
+        if netloc.find(value) != 0:
+            return None
+        if match_parsed.path.find(value.split("/")[-1]) != -1:
+            return netloc + match_parsed.path
+        return netloc
+
+    def __write_visits(self, visits):
+        """
+            Write visits to db
+            @param visits as [(uri, title, mtime)]
+            @return history ids as [int]
+            @thread safe
+        """
+        history_ids = []
+        self.thread_lock.acquire()
+        try:
+            with SqlCursor(self) as sql:
+                for (uri, title, mtime) in visits:
+                    history_id = self.add(title, uri, mtime, commit=False)
+                    sql.execute("UPDATE history\
+                                 SET opened=1\
+                                 WHERE rowid=?", (history_id,))
+                    if history_id not in history_ids:
+                        history_ids.append(history_id)
+                sql.commit()
+        except Exception as e:
+            print("DatabaseHistory::__write_visits():", e)
+        finally:
+            self.thread_lock.release()
+        return history_ids
+
+    def __on_visits_written(self, history_ids):
+        """
+            Push written visits to sync
+            @param history_ids as [int]
+        """
+        if history_ids and El().sync_worker is not None:
+            El().sync_worker.push_history(history_ids)
+
+    def __on_flush_timeout(self):
+        """
+            Flush pending visits
+        """
+        self.__flush_timeout_id = None
+        self.flush()
@@ -18,7 +18,7 @@ import json
 
 from eolie.helper_task import TaskHelper
 from eolie.sqlcursor import SqlCursor
-from eolie.define import EOLIE_DATA_PATH
+from eolie.define import EOLIE_DATA_PATH, FetchPriority, TaskQueue
 
 
 class DatabasePhishing:
@@ -51,6 +51,8 @@ class DatabasePhishing:
                     GLib.mkdir_with_parents(EOLIE_DATA_PATH, 0o0750)
                 # Create db schema
                 with SqlCursor(self) as sql:
+                    # No VACUUM needed later, see MaintenanceHelper
+                    sql.execute("PRAGMA auto_vacuum=INCREMENTAL")
                     sql.execute(self.__create_phishing)
                     sql.commit()
             except Exception as e:
@@ -155,10 +157,13 @@ class DatabasePhishing:
             @param uris as [str]
         """
         if status:
-            self.__task_helper.run(self.__save_rules, content, uris)
+            self.__task_helper.run(self.__save_rules, content, uris,
+                                   queue=TaskQueue.BACKGROUND)
         if uris:
             uri = uris.pop(0)
-            self.__task_helper.load_uri_content(uri,
-                                                self.__cancellable,
-                                                self.__on_load_uri_content,
-                                                uris)
+            self.__task_helper.load_uri_content(
+                                            uri,
+                                            self.__cancellable,
+                                            self.__on_load_uri_content,
+                                            uris,
+                                            priority=FetchPriority.BACKGROUND)
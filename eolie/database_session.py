@@ -0,0 +1,321 @@
+# Copyright (c) 2017 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from gi.repository import GLib
+
+import sqlite3
+from urllib.parse import urlparse
+from pickle import load
+
+from eolie.sqlcursor import SqlCursor
+from eolie.define import EOLIE_DATA_PATH, El
+from eolie.utils import get_random_string
+
+
+class DatabaseSession:
+    """
+        Eolie session db: one row per window, one row per page
+        Pages are saved incrementally, each save is a small transaction
+    """
+    DB_PATH = "%s/session.db" % EOLIE_DATA_PATH
+    __LEGACY_PATH = "%s/session_states.bin" % EOLIE_DATA_PATH
+
+    # Delay before writing dirty pages to db (ms)
+    __DELAY = 2000
+
+    # SQLite documentation:
+    # In SQLite, a column with type INTEGER PRIMARY KEY
+    # is an alias for the ROWID.
+    # Here, we define an id INT PRIMARY KEY but never feed it,
+    # this make VACUUM not destroy rowids...
+    __create_windows = '''CREATE TABLE windows (
+                                        id INTEGER PRIMARY KEY,
+                                        window_id TEXT NOT NULL UNIQUE,
+                                        width INT NOT NULL,
+                                        height INT NOT NULL,
+                                        maximized INT NOT NULL,
+                                        current TEXT NOT NULL DEFAULT ''
+                                        )'''
+    __create_pages = '''CREATE TABLE pages (
+                                        id INTEGER PRIMARY KEY,
+                                        page_id TEXT NOT NULL UNIQUE,
+                                        window_id TEXT NOT NULL,
+                                        uri TEXT NOT NULL,
+                                        title TEXT NOT NULL,
+                                        atime INT NOT NULL,
+                                        gtime INT NOT NULL,
+                                        ephemeral INT NOT NULL,
+                                        state BLOB
+                                        )'''
+    __create_pages_idx = '''CREATE INDEX idx_pages_window_id
+                            ON pages(window_id)'''
+
+    def __init__(self):
+        """
+            Create database tables or manage update if needed
+        """
+        self.__dirty = {}
+        self.__removed = []
+        self.__flush_timeout_id = None
+        if not GLib.file_test(self.DB_PATH, GLib.FileTest.IS_REGULAR):
+            try:
+                if not GLib.file_test(EOLIE_DATA_PATH, GLib.FileTest.IS_DIR):
+                    GLib.mkdir_with_parents(EOLIE_DATA_PATH, 0o0750)
+                # Create db schema
+                with SqlCursor(self) as sql:
+                    # No VACUUM needed later, see MaintenanceHelper
+                    sql.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                    sql.execute(self.__create_windows)
+                    sql.execute(self.__create_pages)
+                    sql.execute(self.__create_pages_idx)
+                    sql.commit()
+                self.__import_legacy()
+            except Exception as e:
+                print("DatabaseSession::__init__(): %s" % e)
+
+    def add_page(self, webview):
+        """
+            Mark page as dirty, it will be saved in a few seconds
+            Multiple navigation events for a page are merged
+            @param webview as WebView
+        """
+        if webview.view is None or webview.view.subsurface:
+            return
+        self.__dirty[webview.session_id] = webview
+        if webview.session_id in self.__removed:
+            self.__removed.remove(webview.session_id)
+        if self.__flush_timeout_id is None:
+            self.__flush_timeout_id = GLib.timeout_add(
+                                                     self.__DELAY,
+                                                     self.__on_flush_timeout)
+
+    def remove_page(self, webview):
+        """
+            Remove page from session
+            @param webview as WebView
+        """
+        if webview.session_id in self.__dirty.keys():
+            del self.__dirty[webview.session_id]
+        self.__removed.append(webview.session_id)
+        if self.__flush_timeout_id is None:
+            self.__flush_timeout_id = GLib.timeout_add(
+                                                     self.__DELAY,
+                                                     self.__on_flush_timeout)
+
+    def remove_window(self, window_id):
+        """
+            Remove window and its pages from session
+            @param window_id as str
+        """
+        with SqlCursor(self) as sql:
+            sql.execute("DELETE FROM pages WHERE window_id=?", (window_id,))
+            sql.execute("DELETE FROM windows WHERE window_id=?", (window_id,))
+            sql.commit()
+
+    def move_window(self, old_id, new_id):
+        """
+            Move pages from old window to new window
+            @param old_id as str
+            @param new_id as str
+        """
+        with SqlCursor(self) as sql:
+            sql.execute("UPDATE pages SET window_id=?\
+                         WHERE window_id=?", (new_id, old_id))
+            sql.execute("UPDATE windows SET window_id=?\
+                         WHERE window_id=?", (new_id, old_id))
+            sql.commit()
+
+    def save_window(self, window, commit=True):
+        """
+            Save window geometry and current page
+            @param window as Window
+            @param commit as bool
+        """
+        (width, height) = window.get_size()
+        current = ""
+        if window.container.current is not None:
+            current = window.container.current.webview.session_id
+        with SqlCursor(self) as sql:
+            # Do not use REPLACE, we want to keep rowid for ordering
+            result = sql.execute("UPDATE windows\
+                                  SET width=?, height=?,\
+                                      maximized=?, current=?\
+                                  WHERE window_id=?",
+                                 (width, height, window.is_maximized(),
+                                  current, str(window)))
+            if result.rowcount == 0:
+                sql.execute("INSERT INTO windows\
+                             (window_id, width, height, maximized, current)\
+                             VALUES (?, ?, ?, ?, ?)",
+                            (str(window), width, height,
+                             window.is_maximized(), current))
+            if commit:
+                sql.commit()
+
+    def flush(self, windows=[]):
+        """
+            Write dirty pages and windows to db in one transaction
+            @param windows as [Window]
+        """
+        if self.__flush_timeout_id is not None:
+            GLib.source_remove(self.__flush_timeout_id)
+            self.__flush_timeout_id = None
+        remember = El().settings.get_value("remember-session")
+        try:
+            with SqlCursor(self) as sql:
+                dirty_windows = list(windows)
+                for webview in self.__dirty.values():
+                    window = webview._window
+                    if window not in dirty_windows:
+                        dirty_windows.append(window)
+                    if not remember:
+                        continue
+                    self.__save_page(sql, webview, str(window))
+                for session_id in self.__removed:
+                    sql.execute("DELETE FROM pages WHERE page_id=?",
+                                (session_id,))
+                for window in dirty_windows:
+                    self.save_window(window, False)
+                if not remember:
+                    sql.execute("DELETE FROM pages")
+                sql.commit()
+        except Exception as e:
+            print("DatabaseSession::flush():", e)
+        self.__dirty = {}
+        self.__removed = []
+
+    def get_windows(self):
+        """
+            Get saved windows
+            @return [(window_id, width, height, maximized, current)]
+        """
+        with SqlCursor(self) as sql:
+            result = sql.execute("SELECT window_id, width, height,\
+                                  maximized, current\
+                                  FROM windows ORDER BY rowid")
+            return list(result)
+
+    def get_pages(self, window_id, current=""):
+        """
+            Get pages for window, current page first, without state
+            @param window_id as str
+            @param current as str
+            @return [(page_id, uri, title, atime, gtime, ephemeral)]
+        """
+        with SqlCursor(self) as sql:
+            result = sql.execute("SELECT page_id, uri, title, atime,\
+                                  gtime, ephemeral\
+                                  FROM pages\
+                                  WHERE window_id=?\
+                                  ORDER BY page_id!=?, rowid",
+                                 (window_id, current))
+            return list(result)
+
+    def get_state(self, page_id):
+        """
+            Get serialized WebKit state for page
+            @param page_id as str
+            @return bytes/None
+        """
+        with SqlCursor(self) as sql:
+            result = sql.execute("SELECT state FROM pages\
+                                  WHERE page_id=?", (page_id,))
+            v = result.fetchone()
+            if v is not None:
+                return v[0]
+            return None
+
+    def get_cursor(self):
+        """
+            Return a new sqlite cursor
+        """
+        try:
+            c = sqlite3.connect(self.DB_PATH, 600.0)
+            c.execute("PRAGMA journal_mode=WAL")
+            return c
+        except Exception as e:
+            print(e)
+            exit(-1)
+
+#######################
+# PRIVATE             #
+#######################
+    def __save_page(self, sql, webview, window_id):
+        """
+            Save page to db
+            @param sql as sqlite cursor
+            @param webview as WebView
+            @param window_id as str
+        """
+        uri = webview.uri
+        parsed = urlparse(uri)
+        if parsed.scheme not in ["http", "https"]:
+            sql.execute("DELETE FROM pages WHERE page_id=?",
+                        (webview.session_id,))
+            return
+        state = webview.get_session_state()
+        if state is not None:
+            state = state.serialize().get_data()
+        # Do not use REPLACE, we want to keep rowid for ordering
+        result = sql.execute("UPDATE pages\
+                              SET window_id=?, uri=?, title=?, atime=?,\
+                                  gtime=?, ephemeral=?,\
+                                  state=COALESCE(?, state)\
+                              WHERE page_id=?",
+                             (window_id, uri, webview.title or "",
+                              webview.atime, webview.gtime,
+                              webview.ephemeral, state, webview.session_id))
+        if result.rowcount == 0:
+            sql.execute("INSERT INTO pages\
+                         (page_id, window_id, uri, title, atime,\
+                          gtime, ephemeral, state)\
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (webview.session_id, window_id, uri,
+                         webview.title or "", webview.atime, webview.gtime,
+                         webview.ephemeral, state))
+
+    def __on_flush_timeout(self):
+        """
+            Flush pending pages
+        """
+        self.__flush_timeout_id = None
+        self.flush()
+
+    def __import_legacy(self):
+        """
+            Import pickled session from previous Eolie versions
+        """
+        if not GLib.file_test(self.__LEGACY_PATH, GLib.FileTest.IS_REGULAR):
+            return
+        try:
+            windows = load(open(self.__LEGACY_PATH, "rb"))
+            with SqlCursor(self) as sql:
+                for window in windows:
+                    (width, height) = window["size"]
+                    sql.execute("INSERT OR REPLACE INTO windows\
+                                 (window_id, width, height, maximized)\
+                                 VALUES (?, ?, ?, ?)",
+                                (window["id"], width, height,
+                                 window["maximized"]))
+                    for (uri, title, atime,
+                         gtime, ephemeral, state) in window["states"]:
+                        sql.execute("INSERT INTO pages\
+                                     (page_id, window_id, uri, title, atime,\
+                                      gtime, ephemeral, state)\
+                                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                    (get_random_string(12), window["id"],
+                                     uri, title, atime, gtime,
+                                     ephemeral, state))
+                sql.commit()
+            GLib.unlink(self.__LEGACY_PATH)
+        except Exception as e:
+            print("DatabaseSession::__import_legacy():", e)
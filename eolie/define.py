@@ -22,6 +22,8 @@ PROXY_INTERFACE = 'org.gnome.Eolie.Proxy'
 EOLIE_DATA_PATH = GLib.get_user_data_dir() + "/eolie"
 EOLIE_CACHE_PATH = GLib.get_user_cache_dir() + "/eolie"
 ADBLOCK_JS = "%s/adblock_js" % EOLIE_DATA_PATH
+POLICY_SNAPSHOT_PATH = "%s/policy.snapshot" % EOLIE_DATA_PATH
+ADBLOCK_FILTERS_PATH = "%s/adblock_filters.bin" % EOLIE_DATA_PATH
 
 COOKIES_PATH = "%s/cookies_%s.db"
 
@@ -69,6 +71,20 @@ class LoadingType:
     POPOVER = 3
 
 
+class FetchPriority:
+    INTERACTIVE = 0
+    DEFAULT = 1
+    BACKGROUND = 2
+
+
+class TaskQueue:
+    INTERACTIVE = 0
+    IO = 1
+    BACKGROUND = 2
+    # Mozilla sync, may run for minutes
+    SYNC = 3
+
+
 class Type:
     NONE = -1
     POPULARS = -2
@@ -15,7 +15,8 @@ from gi.repository import Gtk, GLib, GObject, Gio, Gdk
 import json
 import sqlite3
 
-from eolie.define import El, EOLIE_DATA_PATH, COOKIES_PATH
+from eolie.define import El, EOLIE_DATA_PATH, COOKIES_PATH, TaskQueue
+from eolie.helper_task import TaskHelper
 
 
 class Profile(GObject.GObject):
@@ -160,8 +161,12 @@ class Row(Gtk.ListBoxRow):
 class CookiesDialog:
     """
         A cookie management dialog
+        Cookies are grouped by host and loaded by pages, filtered by sqlite
     """
 
+    # Hosts loaded at once
+    __PAGE_SIZE = 100
+
     def __init__(self, hide_cookies, parent):
         """
             Init widget
@@ -170,6 +175,10 @@ class CookiesDialog:
         """
         self.__hide_cookies = hide_cookies
         self.__filter = ""
+        self.__path = None
+        self.__loading = False
+        self.__complete = True
+        self.__model = Gio.ListStore.new(Cookie)
         builder = Gtk.Builder()
         builder.add_from_resource("/org/gnome/Eolie/DialogCookies.ui")
         self.__dialog = builder.get_object("dialog")
@@ -187,7 +196,9 @@ class CookiesDialog:
             self.__delete_button.hide()
             self.__dialog.set_size_request(300, 400)
         else:
-            self.__cookies.set_filter_func(self.__filter_func)
+            self.__cookies.bind_model(self.__model, self.__create_row)
+            adjustment = builder.get_object("scrolled").get_vadjustment()
+            adjustment.connect("value-changed", self.__on_value_changed)
             self.__dialog.set_size_request(600, 500)
         self.__remove_button.set_sensitive(False)
         builder.connect_signals(self)
@@ -288,8 +299,8 @@ class CookiesDialog:
             except Exception as e:
                 print("DialogSearchEngine::_on_remove_button_clicked():", e)
             row.destroy()
-            for child in self.__cookies.get_children():
-                GLib.idle_add(child.destroy)
+            self.__path = None
+            self.__model.remove_all()
 
     def _on_search_changed(self, entry):
         """
@@ -297,7 +308,7 @@ class CookiesDialog:
             @param entry as Gtk.SearchEntry
         """
         self.__filter = entry.get_text()
-        self.__cookies.invalidate_filter()
+        self.__load_cookies()
 
     def _on_cookie_selected(self, listbox, row):
         """
@@ -321,45 +332,67 @@ class CookiesDialog:
             profile = row.item.get_property("profile")
             self.__remove_button.set_sensitive(profile != "default")
             if not self.__hide_cookies:
-                for child in self.__cookies.get_children():
-                    GLib.idle_add(child.destroy)
                 self.__cookies.set_sensitive(True)
-                try:
-                    path = COOKIES_PATH % (EOLIE_DATA_PATH, profile)
-                    sql = sqlite3.connect(path, 600.0)
-                    result = sql.execute("SELECT DISTINCT host, value\
-                                          FROM moz_cookies")
-                    self.__add_cookies(list(result))
-                except Exception as e:
-                    print("DialogCookies::_on_profile_selected():", e)
+                self.__path = COOKIES_PATH % (EOLIE_DATA_PATH, profile)
+                self.__load_cookies()
 
 #######################
 # PRIVATE             #
 #######################
-    def __filter_func(self, row):
+    def __create_row(self, item):
         """
-            Filter cookies
-            @param row as Row
+            Create a row for model item
+            @param item as Cookie
+            @return Row
         """
-        name = row.item.get_property("name")
-        value = row.item.get_property("value")
-        return name.find(self.__filter) != -1 or\
-            value.find(self.__filter) != -1
+        row = Row(item)
+        row.show()
+        return row
 
-    def __add_cookies(self, cookies):
+    def __load_cookies(self, offset=0):
         """
-            Add cookies to model
-            @param [host]  as [str]
+            Load a page of cookies, first page clears model
+            @param offset as int
         """
-        if cookies:
-            (host, value) = cookies.pop(0)
-            item = Cookie()
-            item.set_property("name", host)
-            item.set_property("value", value)
-            row = Row(item)
-            row.show()
-            self.__cookies.add(row)
-            GLib.idle_add(self.__add_cookies, cookies)
+        if offset == 0:
+            self.__model.remove_all()
+            self.__complete = False
+        if self.__path is None or self.__complete:
+            return
+        self.__loading = True
+        task_helper = TaskHelper()
+        task_helper.run(self.__get_cookies, self.__path,
+                        self.__filter, offset,
+                        callback=(self.__on_get_cookies, offset),
+                        queue=TaskQueue.INTERACTIVE,
+                        token="cookies")
+
+    def __get_cookies(self, path, search, offset):
+        """
+            Get hosts with cookies count
+            @param path as str
+            @param search as str
+            @param offset as int
+            @return [(str, int)]
+            @thread safe
+        """
+        try:
+            search = search.replace("\\", "\\\\")
+            search = search.replace("%", "\\%").replace("_", "\\_")
+            like = "%" + search + "%"
+            sql = sqlite3.connect(path, 600.0)
+            result = sql.execute("SELECT host, COUNT(*) FROM moz_cookies\
+                                  WHERE host LIKE ? ESCAPE '\\'\
+                                  OR name LIKE ? ESCAPE '\\'\
+                                  GROUP BY host ORDER BY host\
+                                  LIMIT ? OFFSET ?",
+                                 (like, like, self.__PAGE_SIZE, offset))
+            cookies = list(result)
+            sql.close()
+            return cookies
+        except Exception as e:
+            print("DialogCookies::__get_cookies():", e)
+            return []
 
     def __add_profiles(self, profiles):
         """
@@ -405,6 +438,36 @@ class CookiesDialog:
             index += 1
         return index
 
+    def __on_get_cookies(self, cookies, offset):
+        """
+            Add cookies to model
+            @param cookies as [(str, int)]
+            @param offset as int
+        """
+        # Model changed since request
+        if offset != self.__model.get_n_items():
+            return
+        self.__loading = False
+        self.__complete = len(cookies) < self.__PAGE_SIZE
+        items = []
+        for (host, count) in cookies:
+            item = Cookie()
+            item.set_property("name", host)
+            item.set_property("value", str(count))
+            items.append(item)
+        self.__model.splice(offset, 0, items)
+
+    def __on_value_changed(self, adjustment):
+        """
+            Load next page when near the end
+            @param adjustment as Gtk.Adjustment
+        """
+        if self.__loading or self.__complete:
+            return
+        end = adjustment.get_value() + adjustment.get_page_size()
+        if end >= adjustment.get_upper() - adjustment.get_page_size():
+            self.__load_cookies(self.__model.get_n_items())
+
     def __on_moved(self, child, name, up):
         """
             Move child row
@@ -10,11 +10,12 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from gi.repository import Gtk
+from gi.repository import Gtk, GLib
 
 from gettext import gettext as _
 
 from eolie.define import El
+from eolie.helper_task import TaskHelper
 
 
 class ImportBookmarksDialog:
@@ -40,13 +41,10 @@ class ImportBookmarksDialog:
         self.__dialog = builder.get_object("dialog")
         self.__dialog.set_transient_for(window)
         self.__listbox = builder.get_object("listbox")
-        items = ["Firefox", "Chromium", "Chrome"]
-        try:
-            from bs4 import BeautifulSoup
-            BeautifulSoup
-            items.append(_("Others"))
-        except Exception as e:
-            print("ImportBookmarksDialog::__init__():", e)
+        self.__progress = builder.get_object("progress")
+        self.__import_button = builder.get_object("import_button")
+        self.__importing = False
+        items = ["Firefox", "Chromium", "Chrome", _("Others")]
         for item in items:
             label = Gtk.Label.new(item)
             label.show()
@@ -56,10 +54,9 @@ class ImportBookmarksDialog:
 
     def run(self):
         """
-            Run dialog
+            Show dialog, destroyed once bookmarks are imported
         """
-        self.__dialog.run()
-        self.__dialog.destroy()
+        self.__dialog.show()
 
 #######################
 # PROTECTED           #
@@ -70,15 +67,23 @@ class ImportBookmarksDialog:
             @param dialog as Gtk.Dialog
             @param response_id as int
         """
-        if response_id == Gtk.ResponseType.DELETE_EVENT:
+        if response_id != Gtk.ResponseType.OK:
+            # Import continues in background
+            if self.__importing:
+                dialog.hide()
+            else:
+                dialog.destroy()
             return
-        index = self.__listbox.get_selected_row().get_index()
+        row = self.__listbox.get_selected_row()
+        if row is None or self.__importing:
+            return
+        index = row.get_index()
         if index == self.__Choice.FIREFOX:
-            El().bookmarks.import_firefox()
+            self.__import(El().bookmarks.import_firefox)
         elif index == self.__Choice.CHROME:
-            El().bookmarks.import_chromium(True)
+            self.__import(El().bookmarks.import_chromium, True)
         elif index == self.__Choice.CHROMIUM:
-            El().bookmarks.import_chromium(False)
+            self.__import(El().bookmarks.import_chromium, False)
         else:
             dialog = Gtk.FileChooserDialog(
                                    _("Import HTML bookmarks"), self.__window,
@@ -93,6 +98,38 @@ class ImportBookmarksDialog:
 #######################
 # PRIVATE             #
 #######################
+    def __import(self, command, *args):
+        """
+            Run importer in background
+            @param command as function
+            @param *args as command arguments
+        """
+        self.__importing = True
+        self.__listbox.set_sensitive(False)
+        self.__import_button.set_sensitive(False)
+        self.__progress.show()
+        task_helper = TaskHelper()
+        task_helper.run(command, *args, self.__on_progress,
+                        callback=(self.__on_imported,))
+
+    def __on_progress(self, fraction):
+        """
+            Update progress bar
+            @param fraction as float
+            @thread safe
+        """
+        GLib.idle_add(self.__progress.set_fraction, fraction)
+
+    def __on_imported(self, count):
+        """
+            Show result and close dialog
+            @param count as int
+        """
+        self.__importing = False
+        self.__progress.set_fraction(1.0)
+        self.__progress.set_text(_("%s bookmarks imported") % count)
+        GLib.timeout_add(1000, self.__dialog.destroy)
+
     def __on_file_chooser_response(self, dialog, response_id):
         """
             Import file
@@ -101,4 +138,4 @@ class ImportBookmarksDialog:
         """
         if response_id == Gtk.ResponseType.OK:
             path = dialog.get_filename()
-            El().bookmarks.import_html(path)
+            self.__import(El().bookmarks.import_html, path)
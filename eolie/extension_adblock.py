@@ -10,14 +10,22 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
+from urllib.parse import urlparse
+
 from eolie.database_adblock import DatabaseAdblock
+from eolie.helper_filters import NetworkFilters
+from eolie.define import El
 
 
 class AdblockExtension:
     """
         Handle adblocking
+        Decisions are cached for each page until it navigates
     """
 
+    # Decisions kept for a page
+    __MAX_DECISIONS = 5000
+
     def __init__(self, extension, settings):
         """
             Connect wanted signal
@@ -26,18 +34,119 @@ class AdblockExtension:
         """
         self.__settings = settings
         self.__adblock = DatabaseAdblock()
+        self.__filters = NetworkFilters()
+        self.__pages = {}
+        self.__hits = 0
+        self.__misses = 0
+        self.__on_settings_changed(settings, None)
+        settings.connect("changed::adblock", self.__on_settings_changed)
+        settings.connect("changed::do-not-track", self.__on_settings_changed)
         extension.connect("page-created", self.__on_page_created)
 
+    @property
+    def hits(self):
+        """
+            Get decisions served from cache
+            @return int
+        """
+        return self.__hits
+
+    @property
+    def misses(self):
+        """
+            Get decisions computed
+            @return int
+        """
+        return self.__misses
+
 #######################
 # PRIVATE             #
 #######################
+    def __get_cache(self, webpage, uri):
+        """
+            Get decisions cache for page, a new one for a new document
+            @param webpage as WebKit2WebExtension.WebPage
+            @param uri as str
+            @return {}
+        """
+        page_id = webpage.get_id()
+        page_uri = webpage.get_uri()
+        netloc = urlparse(page_uri).netloc if page_uri else ""
+        cache = self.__pages.get(page_id, None)
+        # Main document request: page (re)loading
+        if cache is None or cache["netloc"] != netloc or uri == page_uri:
+            # Exceptions may have changed before this (re)load
+            if uri == page_uri:
+                El().adblock_exceptions.refresh()
+            exception = page_uri is not None and\
+                El().adblock_exceptions.find_parsed(urlparse(page_uri))
+            cache = {"netloc": netloc,
+                     "exception": exception,
+                     "uris": {},
+                     "hosts": {}}
+            self.__pages[page_id] = cache
+        return cache
+
+    def __is_blocked(self, webpage, uri):
+        """
+            True if uri loaded by page should be blocked
+            Network filters exceptions win over hosts lists
+            @param webpage as WebKit2WebExtension.WebPage
+            @param uri as str
+            @return bool
+        """
+        cache = self.__get_cache(webpage, uri)
+        blocked = cache["uris"].get(uri, None)
+        if blocked is not None:
+            self.__hits += 1
+            El().hook_stats.count(webpage.get_id(), "adblock cache hits")
+            return blocked
+        self.__misses += 1
+        if cache["exception"]:
+            blocked = False
+        else:
+            blocked = self.__filters.match(uri, webpage.get_uri())
+        # Hosts lists only depend on request netloc
+        if blocked is None:
+            netloc = urlparse(uri).netloc
+            blocked = cache["hosts"].get(netloc, None)
+            if blocked is None:
+                blocked = self.__adblock.is_blocked(uri)
+                El().hook_stats.count(webpage.get_id(), "adblock db lookups")
+                cache["hosts"][netloc] = blocked
+        if len(cache["uris"]) < self.__MAX_DECISIONS:
+            cache["uris"][uri] = blocked
+        return blocked
+
+    def __on_settings_changed(self, settings, key):
+        """
+            Update cached settings, forget decisions
+            @param settings as Settings
+            @param key as str
+        """
+        self.__adblock_enabled = settings.get_value("adblock").get_boolean()
+        self.__do_not_track = settings.get_value(
+                                              "do-not-track").get_boolean()
+        self.__pages = {}
+
     def __on_page_created(self, extension, webpage):
         """
             Connect to send request
             @param extension as WebKit2WebExtension
             @param webpage as WebKit2WebExtension.WebPage
         """
-        webpage.connect("send-request", self.__on_send_request)
+        webpage.connect("send-request",
+                        El().hook_stats.wrap("adblock",
+                                             self.__on_send_request))
+        webpage.connect("notify::uri", self.__on_notify_uri)
+
+    def __on_notify_uri(self, webpage, param):
+        """
+            Forget page decisions
+            @param webpage as WebKit2WebExtension.WebPage
+            @param param as GObject.ParamSpec
+        """
+        self.__pages.pop(webpage.get_id(), None)
 
     def __on_send_request(self, webpage, request, redirect):
         """
@@ -47,10 +156,10 @@ class AdblockExtension:
             @param redirect as WebKit2WebExtension.URIResponse
         """
         uri = request.get_uri()
-        if self.__settings.get_value("adblock") and\
-                self.__adblock.is_blocked(uri):
+        if self.__adblock_enabled and self.__is_blocked(webpage, uri):
+            El().hook_stats.count(webpage.get_id(), "adblock blocked")
             return True
-        if self.__settings.get_value("do-not-track"):
+        if self.__do_not_track:
             headers = request.get_http_headers()
             if headers is not None:
                 headers.append("DNT", "1")
@@ -15,7 +15,6 @@ from gi.repository import WebKit2WebExtension, GLib, GObject
 from urllib.parse import urlparse
 
 from eolie.define import Type
-from eolie.helper_passwords import PasswordsHelper
 
 
 class FormsExtension(GObject.Object):
@@ -34,7 +33,7 @@ class FormsExtension(GObject.Object):
             @param settings as Settings
         """
         GObject.Object.__init__(self)
-        self.__helper = PasswordsHelper()
+        self.__helper = None
         self.__extension = extension
         self.__settings = settings
         self.__elements_uri = None
@@ -53,12 +52,12 @@ class FormsExtension(GObject.Object):
             form_input_password = form["password"].get_name()
             if form_input_username is not None and\
                     form_input_password is not None:
-                self.__helper.get(form["element"].get_action(),
-                                  form_input_username,
-                                  form_input_password,
-                                  self.set_input_forms,
-                                  webpage,
-                                  form)
+                self.passwords_helper.get(form["element"].get_action(),
+                                          form_input_username,
+                                          form_input_password,
+                                          self.set_input_forms,
+                                          webpage,
+                                          form)
 
     def set_input_forms(self, attributes, password,
                         uri, index, count, webpage, form, username=None):
@@ -153,15 +152,26 @@ class FormsExtension(GObject.Object):
             user_form_value = form["username"].get_value()
             pass_form_name = form["password"].get_name()
             pass_form_value = form["password"].get_value()
-            self.__helper.get(form_uri, user_form_name,
-                              pass_form_name, self.__on_get_password,
-                              user_form_name, user_form_value,
-                              pass_form_name, pass_form_value,
-                              uri,
-                              self.__page_id)
+            self.passwords_helper.get(form_uri, user_form_name,
+                                      pass_form_name, self.__on_get_password,
+                                      user_form_name, user_form_value,
+                                      pass_form_name, pass_form_value,
+                                      uri,
+                                      self.__page_id)
         except Exception as e:
             print("FormsExtension::on_form_submit():", e)
 
+    @property
+    def passwords_helper(self):
+        """
+            Get passwords helper, libsecret is only loaded on first use
+            @return PasswordsHelper
+        """
+        if self.__helper is None:
+            from eolie.helper_passwords import PasswordsHelper
+            self.__helper = PasswordsHelper()
+        return self.__helper
+
     @property
     def pending_credentials(self):
         """
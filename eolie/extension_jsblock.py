@@ -56,7 +56,9 @@ class JSblockExtension:
             @param extension as WebKit2WebExtension
             @param webpage as WebKit2WebExtension.WebPage
         """
-        webpage.connect("send-request", self.__on_send_request)
+        webpage.connect("send-request",
+                        El().hook_stats.wrap("jsblock",
+                                             self.__on_send_request))
 
     def __on_send_request(self, webpage, request, redirect):
         """
@@ -72,11 +74,18 @@ class JSblockExtension:
                 document.get_elements_by_tag_name_as_html_collection("script")
         if self.__settings.get_value("jsblock"):
             request_uri = request.get_uri()
-            parsed = urlparse(webpage.get_uri())
+            page_uri = webpage.get_uri()
+            # Exceptions may have changed before this (re)load
+            if request_uri == page_uri:
+                El().js_exceptions.refresh()
+            parsed = urlparse(page_uri)
             parsed_request = urlparse(request_uri)
+            El().hook_stats.count(webpage.get_id(), "jsblock db lookups")
             if not El().js_exceptions.find(parsed_request.netloc,
                                            parsed.netloc):
                 for i in range(0, self.__scripts.get_length()):
                     script = self.__scripts.item(i)
                     if script.get_src() == request_uri:
+                        El().hook_stats.count(webpage.get_id(),
+                                              "jsblock blocked")
                         return True
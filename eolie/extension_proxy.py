@@ -13,12 +13,12 @@
 
 from gi.repository import Gio, GLib, WebKit2WebExtension
 
+import json
 from urllib.parse import urlparse
 from uuid import uuid4
 
-from eolie.define import PROXY_BUS, PROXY_PATH, Type
+from eolie.define import El, PROXY_BUS, PROXY_PATH, Type
 from eolie.list import LinkedList
-from eolie.helper_passwords import PasswordsHelper
 
 
 class Server:
@@ -115,6 +115,9 @@ class ProxyExtensionServer(Server):
     <method name="GetSelection">
       <arg type="s" name="selection" direction="out" />
     </method>
+    <method name="GetStats">
+      <arg type="s" name="stats" direction="out" />
+    </method>
 
     <signal name='UnsecureFormFocused'>
         <arg type="as" name="forms" direction="out" />
@@ -149,7 +152,6 @@ class ProxyExtensionServer(Server):
         self.__on_input_timeout_id = None
         self.__elements_history = {}
         self.__send_requests = []
-        self.__helper = PasswordsHelper()
         self.__proxy_bus = PROXY_BUS % self.__page.get_id()
         addr = Gio.dbus_address_get_for_bus_sync(Gio.BusType.SESSION, None)
         self.__bus = None
@@ -161,7 +163,8 @@ class ProxyExtensionServer(Server):
                                None,
                                self.__on_bus_new_for_address)
         form_extension.connect("submit-form", self.__on_submit_form)
-        page.connect("send-request", self.__on_send_request)
+        page.connect("send-request",
+                     El().hook_stats.wrap("proxy", self.__on_send_request))
         page.connect("context-menu", self.__on_context_menu)
         page.connect("notify::uri", self.__on_notify_uri)
         page.connect("form-controls-associated",
@@ -202,27 +205,28 @@ class ProxyExtensionServer(Server):
                 return
             parsed = urlparse(uri)
             uri = "%s://%s" % (parsed.scheme, parsed.netloc)
+            helper = self.__form_extension.passwords_helper
             if not uuid:
                 uuid = str(uuid4())
-                self.__helper.store(user_form_name,
-                                    user_form_value,
-                                    pass_form_name,
-                                    pass_form_value,
-                                    uri,
-                                    form_uri,
-                                    uuid,
-                                    None)
+                helper.store(user_form_name,
+                             user_form_value,
+                             pass_form_name,
+                             pass_form_value,
+                             uri,
+                             form_uri,
+                             uuid,
+                             None)
             else:
-                self.__helper.clear(uuid,
-                                    self.__helper.store,
-                                    user_form_name,
-                                    user_form_value,
-                                    pass_form_name,
-                                    pass_form_value,
-                                    uri,
-                                    form_uri,
-                                    uuid,
-                                    None)
+                helper.clear(uuid,
+                             helper.store,
+                             user_form_name,
+                             user_form_value,
+                             pass_form_name,
+                             pass_form_value,
+                             uri,
+                             form_uri,
+                             uuid,
+                             None)
         except Exception as e:
             print("ProxyExtension::SaveCredentials():", e)
 
@@ -239,13 +243,14 @@ class ProxyExtensionServer(Server):
             (forms, textareas) = self.__form_extension.get_elements(elements)
             for form in forms:
                 if form["username"].get_name() == userform:
-                    self.__helper.get(form["element"].get_action(),
-                                      userform,
-                                      form["password"].get_name(),
-                                      self.__form_extension.set_input_forms,
-                                      self.__page,
-                                      form,
-                                      username)
+                    helper = self.__form_extension.passwords_helper
+                    helper.get(form["element"].get_action(),
+                               userform,
+                               form["password"].get_name(),
+                               self.__form_extension.set_input_forms,
+                               self.__page,
+                               form,
+                               username)
                     return
         except Exception as e:
             print("ProxyExtension::SetAuthForms():", e)
@@ -358,6 +363,13 @@ class ProxyExtensionServer(Server):
             value = ""
         return value
 
+    def GetStats(self):
+        """
+            Get hooks stats for page
+            @return JSON as str
+        """
+        return json.dumps(El().hook_stats.get(self.__page.get_id()))
+
     def SetPreviousElementValue(self):
         """
             Set focused form to previous value
@@ -609,6 +621,8 @@ class ProxyExtension:
             @param webpage as WebKit2WebExtension.WebPage
             @param form_extension as FormsExtension
         """
+        if El().hook_stats.enabled:
+            webpage.weak_ref(El().hook_stats.remove, webpage.get_id())
         self.__server = ProxyExtensionServer(extension,
                                              webpage,
                                              form_extension,
@@ -0,0 +1,182 @@
+# Copyright (c) 2017 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from gi.repository import Gio
+
+from collections import OrderedDict
+from time import time
+
+from eolie.define import El, TaskQueue
+from eolie.helper_task import TaskHelper
+
+
+class DNSHelper:
+    """
+        Predict hosts for URL completion
+        Hosts from history are used first, others are resolved
+        asynchronously and results are cached
+    """
+
+    # Cache lifetime for resolved hosts (seconds)
+    __POSITIVE_TTL = 600
+    # Cache lifetime for unknown hosts (seconds)
+    __NEGATIVE_TTL = 60
+    # Cached hosts, least recently used are dropped first
+    __CACHE_SIZE = 500
+
+    def __init__(self):
+        """
+            Init helper
+        """
+        self.__cache = OrderedDict()
+        self.__cancellable = Gio.Cancellable.new()
+
+    def predict(self, name, suffixes, callback, *args):
+        """
+            Search first existing host for name with suffixes
+            Previous prediction is cancelled
+            @param name as str
+            @param suffixes as [str]
+            @param callback as function
+            @callback (host as str/None, args)
+        """
+        self.__cancellable.cancel()
+        self.__cancellable = Gio.Cancellable.new()
+        candidates = []
+        for suffix in suffixes:
+            for prefix in ["www.", ""]:
+                candidates.append("%s%s.%s" % (prefix, name, suffix))
+        prediction = {"candidates": candidates,
+                      "results": {},
+                      "done": False,
+                      "cancellable": self.__cancellable,
+                      "callback": callback,
+                      "args": args}
+        # Known hosts, no network needed, db is not read on main loop
+        task_helper = TaskHelper()
+        task_helper.run(El().history.get_existing_netlocs, candidates,
+                        callback=(self.__on_existing_netlocs, prediction),
+                        queue=TaskQueue.INTERACTIVE,
+                        token="dns-prediction")
+
+    def cancel(self):
+        """
+            Cancel current prediction
+        """
+        self.__cancellable.cancel()
+
+#######################
+# PRIVATE             #
+#######################
+    def __get_cached(self, host):
+        """
+            Get cached result for host
+            @param host as str
+            @return bool/None if not cached
+        """
+        if host in self.__cache.keys():
+            (expires, result) = self.__cache[host]
+            if expires > time():
+                self.__cache.move_to_end(host)
+                return result
+            del self.__cache[host]
+        return None
+
+    def __set_cached(self, host, result, ttl):
+        """
+            Cache result for host, drop expired and old results
+            @param host as str
+            @param result as bool
+            @param ttl as int
+        """
+        now = time()
+        for (cached, (expires, cached_result)) in list(self.__cache.items()):
+            if expires <= now:
+                del self.__cache[cached]
+        self.__cache[host] = (now + ttl, result)
+        self.__cache.move_to_end(host)
+        while len(self.__cache) > self.__CACHE_SIZE:
+            self.__cache.popitem(last=False)
+
+    def __check_prediction(self, prediction):
+        """
+            Run callback if first valid candidate is known
+            Candidates order is respected
+            @param prediction as {}
+            @return True if done
+        """
+        if prediction["done"]:
+            return True
+        results = prediction["results"]
+        for candidate in prediction["candidates"]:
+            if candidate not in results.keys():
+                return False
+            elif results[candidate]:
+                prediction["done"] = True
+                prediction["callback"](candidate, *prediction["args"])
+                return True
+        prediction["done"] = True
+        prediction["callback"](None, *prediction["args"])
+        return True
+
+    def __on_existing_netlocs(self, known, prediction):
+        """
+            Use known host or resolve candidates
+            @param known as [str]
+            @param prediction as {}
+        """
+        if prediction["cancellable"].is_cancelled():
+            return
+        for candidate in prediction["candidates"]:
+            if candidate in known:
+                prediction["done"] = True
+                prediction["callback"](candidate, *prediction["args"])
+                return
+        pending = []
+        for candidate in prediction["candidates"]:
+            result = self.__get_cached(candidate)
+            if result is None:
+                pending.append(candidate)
+            else:
+                prediction["results"][candidate] = result
+        if self.__check_prediction(prediction):
+            return
+        resolver = Gio.Resolver.get_default()
+        for candidate in pending:
+            resolver.lookup_by_name_async(candidate,
+                                          prediction["cancellable"],
+                                          self.__on_lookup_by_name,
+                                          candidate,
+                                          prediction)
+
+    def __on_lookup_by_name(self, resolver, result, candidate, prediction):
+        """
+            Cache result and check prediction
+            @param resolver as Gio.Resolver
+            @param result as Gio.AsyncResult
+            @param candidate as str
+            @param prediction as {}
+        """
+        try:
+            resolver.lookup_by_name_finish(result)
+            found = True
+            ttl = self.__POSITIVE_TTL
+        except:
+            if prediction["cancellable"].is_cancelled():
+                return
+            found = False
+            ttl = self.__NEGATIVE_TTL
+        self.__set_cached(candidate, found, ttl)
+        if prediction["cancellable"].is_cancelled():
+            return
+        prediction["results"][candidate] = found
+        self.__check_prediction(prediction)
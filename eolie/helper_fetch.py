@@ -0,0 +1,324 @@
+# Copyright (c) 2017 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import gi
+gi.require_version("Soup", "2.4")
+from gi.repository import GLib, Gio, Soup
+
+from heapq import heappush, heappop
+from urllib.parse import urlparse
+
+from eolie.define import FetchPriority
+
+
+class FetchHelper:
+    """
+        Process wide uri loader
+        One Soup session shared by all requests (keep-alive, DNS, TLS),
+        requests are queued by priority and limited per host
+    """
+
+    # Requests running at the same time
+    __MAX_RUNNING = 8
+    # Requests running at the same time for a host
+    __MAX_RUNNING_PER_HOST = 2
+    __CHUNK_SIZE = 65536
+
+    def __init__(self):
+        """
+            Init helper
+        """
+        self.__session = Soup.Session.new()
+        self.__session.set_property("accept-language-auto", True)
+        self.__session.set_property("max-conns", self.__MAX_RUNNING * 2)
+        self.__session.set_property("max-conns-per-host",
+                                    self.__MAX_RUNNING_PER_HOST)
+        self.__queue = []
+        self.__count = 0
+        self.__running = 0
+        self.__hosts = {}
+        self.__groups = {}
+
+    def load_uri_content(self, uri, cancellable, callback, *args,
+                         priority=FetchPriority.DEFAULT, group=None):
+        """
+            Load uri content
+            @param uri as str
+            @param cancellable as Gio.Cancellable
+            @param callback as a function
+            @param priority as FetchPriority
+            @param group as str, see cancel_group()
+            @callback (uri as str, status as bool, content as bytes, args)
+        """
+        self.__push(uri, cancellable, None, callback, args, priority, group)
+
+    def load_uri_stream(self, uri, cancellable, chunk_callback, callback,
+                        *args, priority=FetchPriority.DEFAULT, group=None):
+        """
+            Load uri content, pass each chunk to chunk_callback
+            @param uri as str
+            @param cancellable as Gio.Cancellable
+            @param chunk_callback as a function
+            @param callback as a function
+            @param priority as FetchPriority
+            @param group as str, see cancel_group()
+            @chunk_callback (uri as str, chunk as bytes, args)
+            @callback (uri as str, status as bool, b"", args)
+        """
+        self.__push(uri, cancellable, chunk_callback,
+                    callback, args, priority, group)
+
+    def load_uri_content_sync(self, uri, cancellable=None, headers=[]):
+        """
+            Load uri
+            @param uri as str
+            @param cancellable as Gio.Cancellable
+            @param headers as [(str, str)]
+            @return (loaded as bool, content as bytes)
+            @thread safe
+        """
+        try:
+            # Post message
+            if headers:
+                msg = Soup.Message.new("GET", uri)
+                request_headers = msg.get_property("request-headers")
+                for header in headers:
+                    request_headers.append(header[0], header[1])
+                self.__session.send_message(msg)
+                body = msg.get_property("response-body")
+                content = body.flatten().get_data()
+            # Get message
+            else:
+                request = self.__session.request(uri)
+                stream = request.send(cancellable)
+                chunks = []
+                buf = stream.read_bytes(self.__CHUNK_SIZE,
+                                        cancellable).get_data()
+                while buf:
+                    chunks.append(buf)
+                    buf = stream.read_bytes(self.__CHUNK_SIZE,
+                                            cancellable).get_data()
+                stream.close()
+                content = b"".join(chunks)
+            return (True, content)
+        except Exception as e:
+            print("FetchHelper::load_uri_content_sync():",  e)
+            return (False, b"")
+
+    def get_group_cancellable(self, group):
+        """
+            Get cancellable for group
+            @param group as str
+            @return Gio.Cancellable
+        """
+        if group not in self.__groups.keys():
+            self.__groups[group] = Gio.Cancellable.new()
+        return self.__groups[group]
+
+    def cancel_group(self, group):
+        """
+            Cancel all requests in group, queued and running
+            @param group as str
+        """
+        if group in self.__groups.keys():
+            self.__groups[group].cancel()
+            del self.__groups[group]
+
+    @property
+    def session(self):
+        """
+            Get shared session
+            @return Soup.Session
+        """
+        return self.__session
+
+    @property
+    def queued(self):
+        """
+            Get queued requests count
+            @return int
+        """
+        return len(self.__queue)
+
+#######################
+# PRIVATE             #
+#######################
+    def __push(self, uri, cancellable, chunk_callback,
+               callback, args, priority, group):
+        """
+            Queue a request and start it if possible
+            @param uri as str
+            @param cancellable as Gio.Cancellable
+            @param chunk_callback as function
+            @param callback as function
+            @param args as []
+            @param priority as FetchPriority
+            @param group as str
+        """
+        # Caller cancellable may be reused, group one is only checked
+        group_cancellable = None
+        if group is not None:
+            group_cancellable = self.get_group_cancellable(group)
+            if cancellable is None:
+                cancellable = group_cancellable
+        host = urlparse(uri).netloc
+        request = (uri, host, cancellable, group_cancellable,
+                   chunk_callback, callback, args, priority)
+        # Count keeps FIFO order for a priority
+        self.__count += 1
+        heappush(self.__queue, (priority, self.__count, request))
+        self.__run_next()
+
+    def __run_next(self):
+        """
+            Start queued requests while limits allow it
+        """
+        delayed = []
+        while self.__queue and self.__running < self.__MAX_RUNNING:
+            item = heappop(self.__queue)
+            (uri, host, cancellable, group_cancellable,
+             chunk_callback, callback, args, priority) = item[2]
+            if self.__is_cancelled(item[2]):
+                self.__callback(callback, None, False, b"", args)
+            elif self.__hosts.get(host, 0) >= self.__MAX_RUNNING_PER_HOST:
+                delayed.append(item)
+            else:
+                self.__start(item[2])
+        for item in delayed:
+            heappush(self.__queue, item)
+
+    def __start(self, request):
+        """
+            Send request
+            @param request as tuple
+        """
+        (uri, host, cancellable, group_cancellable,
+         chunk_callback, callback, args, priority) = request
+        self.__running += 1
+        self.__hosts[host] = self.__hosts.get(host, 0) + 1
+        try:
+            soup_request = self.__session.request(uri)
+            soup_request.send_async(cancellable,
+                                    self.__on_request_send_async,
+                                    request)
+        except Exception as e:
+            print("FetchHelper::__start():",  e)
+            self.__finish(request, False, b"")
+
+    def __finish(self, request, status, content):
+        """
+            Release request slot and pass result to callback
+            @param request as tuple
+            @param status as bool
+            @param content as bytes
+        """
+        (uri, host, cancellable, group_cancellable,
+         chunk_callback, callback, args, priority) = request
+        self.__running -= 1
+        self.__hosts[host] -= 1
+        if self.__hosts[host] == 0:
+            del self.__hosts[host]
+        self.__callback(callback, uri if status else None,
+                        status, content, args)
+        self.__run_next()
+
+    def __callback(self, callback, uri, status, content, args):
+        """
+            Run callback, do not let it break the queue
+            @param callback as function
+            @param uri as str
+            @param status as bool
+            @param content as bytes
+            @param args as []
+        """
+        try:
+            callback(uri, status, content, *args)
+        except Exception as e:
+            print("FetchHelper::__callback():",  e)
+
+    def __is_cancelled(self, request):
+        """
+            True if request or its group is cancelled
+            @param request as tuple
+            @return bool
+        """
+        (uri, host, cancellable, group_cancellable,
+         chunk_callback, callback, args, priority) = request
+        return cancellable is not None and cancellable.is_cancelled() or\
+            group_cancellable is not None and\
+            group_cancellable.is_cancelled()
+
+    def __get_io_priority(self, priority):
+        """
+            Get GLib priority for fetch priority
+            @param priority as FetchPriority
+            @return int
+        """
+        if priority == FetchPriority.INTERACTIVE:
+            return GLib.PRIORITY_DEFAULT
+        return GLib.PRIORITY_LOW
+
+    def __on_read_bytes_async(self, stream, result, request, chunks):
+        """
+            Read data from stream, when finished, pass to callback
+            @param stream as Gio.InputStream
+            @param result as Gio.AsyncResult
+            @param request as tuple
+            @param chunks as [bytes]
+        """
+        (uri, host, cancellable, group_cancellable,
+         chunk_callback, callback, args, priority) = request
+        try:
+            content_bytes = stream.read_bytes_finish(result).get_data()
+            if self.__is_cancelled(request):
+                stream.close(None)
+                self.__finish(request, False, b"")
+            elif content_bytes:
+                if chunk_callback is None:
+                    chunks.append(content_bytes)
+                else:
+                    chunk_callback(uri, content_bytes, *args)
+                stream.read_bytes_async(self.__CHUNK_SIZE,
+                                        self.__get_io_priority(priority),
+                                        cancellable,
+                                        self.__on_read_bytes_async,
+                                        request, chunks)
+            else:
+                stream.close(None)
+                self.__finish(request, True, b"".join(chunks))
+        except Exception as e:
+            print("FetchHelper::__on_read_bytes_async():", e)
+            self.__finish(request, False, b"")
+
+    def __on_request_send_async(self, source, result, request):
+        """
+            Get stream and start reading from it
+            @param source as Soup.Request
+            @param result as Gio.AsyncResult
+            @param request as tuple
+        """
+        (uri, host, cancellable, group_cancellable,
+         chunk_callback, callback, args, priority) = request
+        try:
+            stream = source.send_finish(result)
+            if self.__is_cancelled(request):
+                stream.close(None)
+                self.__finish(request, False, b"")
+                return
+            stream.read_bytes_async(self.__CHUNK_SIZE,
+                                    self.__get_io_priority(priority),
+                                    cancellable,
+                                    self.__on_read_bytes_async,
+                                    request, [])
+        except Exception as e:
+            print("FetchHelper::__on_request_send_async():",  e)
+            self.__finish(request, False, b"")
@@ -0,0 +1,377 @@
+# Copyright (c) 2017 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import mmap
+import re
+import struct
+from os import stat, replace
+from time import time
+from urllib.parse import urlparse
+from zlib import crc32
+
+from eolie.define import ADBLOCK_FILTERS_PATH
+
+
+class NetworkFilters:
+    """
+        Adblock Plus network filters: ||domain^, paths, wildcards,
+        @@exceptions, $third-party, $domain= and resource types
+        UI process compiles lists with write(): each rule goes in the
+        bucket of its longest token. Web processes map compiled file and
+        only test rules from buckets of request tokens
+    """
+
+    __MAGIC = b"EOLIEF01"
+    # Must be a power of 2, one more bucket for rules without token
+    __BUCKETS = 16384
+    # Delay between two checks for a new compiled file (seconds)
+    __CHECK_DELAY = 1
+    __TOKEN = re.compile("[a-z0-9%]+")
+    __COSMETIC = re.compile("#[@?$%]?#")
+    # Too common to be useful, used if nothing else
+    __COMMON_TOKENS = ["http", "https", "www", "com", "net", "org", "html"]
+    __TYPES = ["script", "image", "stylesheet", "object", "xmlhttprequest",
+               "subdocument", "font", "media", "websocket", "other"]
+    # Resource type guessed from uri extension
+    __EXTENSIONS = {"js": "script", "mjs": "script",
+                    "css": "stylesheet",
+                    "png": "image", "jpg": "image", "jpeg": "image",
+                    "gif": "image", "webp": "image", "svg": "image",
+                    "ico": "image", "bmp": "image",
+                    "woff": "font", "woff2": "font", "ttf": "font",
+                    "otf": "font", "eot": "font",
+                    "mp4": "media", "webm": "media", "ogg": "media",
+                    "mp3": "media", "m4a": "media",
+                    "swf": "object"}
+
+    def __init__(self):
+        """
+            Init filters, compiled file is mapped on first use
+        """
+        self.__data = None
+        self.__stat = None
+        self.__checked = 0
+        self.__rules = {}
+
+    def write(self, lines):
+        """
+            Compile filters
+            @param lines as [str]
+            @return compiled rules count as int
+        """
+        buckets = [{} for i in range(0, self.__BUCKETS + 1)]
+        count = 0
+        for line in lines:
+            line = line.strip()
+            if not line or line[0] in ["!", "["] or\
+                    self.__COSMETIC.search(line) is not None:
+                continue
+            rule = self.__parse(line)
+            if rule is None:
+                continue
+            buckets[self.__get_slot(rule[-1])][line] = None
+            count += 1
+        table = []
+        chunks = []
+        offset = 0
+        for bucket in buckets:
+            chunk = "\n".join(bucket.keys()).encode("utf-8")
+            table.append(struct.pack("<II", offset, len(chunk)))
+            chunks.append(chunk)
+            offset += len(chunk)
+        try:
+            # Mapped files stay valid, new file replaces old one
+            tmp_path = "%s.tmp" % ADBLOCK_FILTERS_PATH
+            with open(tmp_path, "wb") as f:
+                f.write(self.__MAGIC)
+                f.write(struct.pack("<I", self.__BUCKETS))
+                f.write(b"".join(table))
+                f.write(b"".join(chunks))
+            replace(tmp_path, ADBLOCK_FILTERS_PATH)
+        except Exception as e:
+            print("NetworkFilters::write():", e)
+        return count
+
+    def match(self, uri, page_uri):
+        """
+            Match uri loaded by page_uri against filters
+            @param uri as str
+            @param page_uri as str
+            @return True if blocked, False if an exception matches,
+                    None if no filter matches
+        """
+        data = self.__get_data()
+        if data is None:
+            return None
+        parsed = urlparse(uri)
+        if parsed.scheme not in ["http", "https", "ws", "wss"]:
+            return None
+        page_host = urlparse(page_uri or "").netloc.lower()
+        host = parsed.netloc.lower()
+        third_party = self.__get_base_domain(host) !=\
+            self.__get_base_domain(page_host)
+        resource_type = self.__get_type(uri, parsed, page_uri)
+        slots = {self.__get_slot(token)
+                 for token in self.__TOKEN.findall(uri.lower())}
+        slots.add(self.__BUCKETS)
+        rules = []
+        for slot in slots:
+            rules += self.__get_rules(data, slot)
+        blocked = None
+        for exception in [False, True]:
+            for rule in rules:
+                if rule[0] == exception and\
+                        self.__match_rule(rule, uri, page_host,
+                                          third_party, resource_type):
+                    if exception:
+                        return False
+                    blocked = True
+                    break
+            if blocked is None:
+                break
+        return blocked
+
+#######################
+# PRIVATE             #
+#######################
+    def __get_data(self):
+        """
+            Get mapped filters, map again if file changed
+            @return mmap.mmap/None
+        """
+        if time() - self.__checked < self.__CHECK_DELAY:
+            return self.__data
+        self.__checked = time()
+        try:
+            st = stat(ADBLOCK_FILTERS_PATH)
+            key = (st.st_ino, st.st_mtime_ns, st.st_size)
+            if key != self.__stat:
+                self.__stat = key
+                self.__rules = {}
+                if self.__data is not None:
+                    self.__data.close()
+                    self.__data = None
+                with open(ADBLOCK_FILTERS_PATH, "rb") as f:
+                    data = mmap.mmap(f.fileno(), 0,
+                                     access=mmap.ACCESS_READ)
+                magic = data[0:len(self.__MAGIC)]
+                (buckets,) = struct.unpack_from("<I", data, len(magic))
+                if magic == self.__MAGIC and buckets == self.__BUCKETS:
+                    self.__data = data
+                else:
+                    data.close()
+        except FileNotFoundError:
+            self.__data = None
+            self.__stat = None
+        except Exception as e:
+            print("NetworkFilters::__get_data():", e)
+        return self.__data
+
+    def __get_rules(self, data, slot):
+        """
+            Get rules for slot, parsed on first use
+            @param data as mmap.mmap
+            @param slot as int
+            @return [tuple]
+        """
+        if slot not in self.__rules.keys():
+            header = len(self.__MAGIC) + 4
+            table = header + (self.__BUCKETS + 1) * 8
+            (offset, length) = struct.unpack_from("<II", data,
+                                                  header + slot * 8)
+            rules = []
+            if length:
+                chunk = data[table + offset:table + offset + length]
+                for line in chunk.decode("utf-8").split("\n"):
+                    rule = self.__parse(line)
+                    if rule is not None:
+                        flags = 0 if rule[2] else re.IGNORECASE
+                        rules.append((rule[0], re.compile(rule[1], flags)) +
+                                     rule[3:-1])
+            self.__rules[slot] = rules
+        return self.__rules[slot]
+
+    def __get_slot(self, token):
+        """
+            Get bucket for token
+            @param token as str/None
+            @return int
+        """
+        if token is None:
+            return self.__BUCKETS
+        return crc32(token.encode("utf-8")) & (self.__BUCKETS - 1)
+
+    def __parse(self, line):
+        """
+            Parse a network filter
+            @param line as str
+            @return (exception as bool, regex as str, match_case as bool,
+                     types as [str], excluded types as [str],
+                     third_party as bool/None,
+                     domains as [str], excluded domains as [str],
+                     token as str/None)
+                    None if filter is not supported
+        """
+        exception = line.startswith("@@")
+        if exception:
+            line = line[2:]
+        pattern = line
+        options = []
+        dollar = line.rfind("$")
+        if dollar != -1:
+            pattern = line[:dollar]
+            options = line[dollar + 1:].split(",")
+        # Regex filters are too slow
+        if not pattern or pattern.startswith("/") and pattern.endswith("/"):
+            return None
+        types = []
+        excluded_types = []
+        third_party = None
+        domains = []
+        excluded_domains = []
+        match_case = False
+        for option in options:
+            negated = option.startswith("~")
+            name = option.lstrip("~").lower()
+            if name in self.__TYPES:
+                if negated:
+                    excluded_types.append(name)
+                else:
+                    types.append(name)
+            elif name == "third-party":
+                third_party = not negated
+            elif name.startswith("domain="):
+                for domain in option[7:].lower().split("|"):
+                    if domain.startswith("~"):
+                        excluded_domains.append(domain[1:])
+                    elif domain:
+                        domains.append(domain)
+            elif name == "match-case":
+                match_case = True
+            # popup, csp, document, ... Do not guess
+            else:
+                return None
+        (regex, token) = self.__compile_pattern(pattern)
+        return (exception, regex, match_case, types, excluded_types,
+                third_party, domains, excluded_domains, token)
+
+    def __compile_pattern(self, pattern):
+        """
+            Convert pattern to a regex and get its best token
+            @param pattern as str
+            @return (regex as str, token as str/None)
+        """
+        left_anchored = True
+        if pattern.startswith("||"):
+            prefix = r"^[a-z][a-z0-9+.-]*://([^/?#]*\.)?"
+            pattern = pattern[2:]
+        elif pattern.startswith("|"):
+            prefix = "^"
+            pattern = pattern[1:]
+        else:
+            prefix = ""
+            left_anchored = False
+        suffix = ""
+        right_anchored = False
+        if pattern.endswith("|"):
+            suffix = "$"
+            pattern = pattern[:-1]
+            right_anchored = True
+        regex = ""
+        for char in pattern:
+            if char == "*":
+                regex += ".*"
+            elif char == "^":
+                regex += r"(?:[^\w\-.%]|$)"
+            else:
+                regex += re.escape(char)
+        # A token must be a whole token in uri: not next to a wildcard
+        # or to an unanchored pattern edge
+        tokens = []
+        lower = pattern.lower()
+        for match in self.__TOKEN.finditer(lower):
+            (start, end) = match.span()
+            if start == 0 and not left_anchored or\
+                    start > 0 and lower[start - 1] == "*":
+                continue
+            if end == len(lower) and not right_anchored or\
+                    end < len(lower) and lower[end] == "*":
+                continue
+            tokens.append(match.group(0))
+        tokens.sort(key=lambda x: (x not in self.__COMMON_TOKENS, len(x)))
+        token = tokens[-1] if tokens else None
+        return (prefix + regex + suffix, token)
+
+    def __match_rule(self, rule, uri, page_host, third_party, resource_type):
+        """
+            True if rule matches request
+            @param rule as tuple
+            @param uri as str
+            @param page_host as str
+            @param third_party as bool
+            @param resource_type as str/None
+            @return bool
+        """
+        (exception, regex, types, excluded_types, rule_third_party,
+         domains, excluded_domains) = rule
+        if rule_third_party is not None and rule_third_party != third_party:
+            return False
+        # Unknown type only matches rules without types
+        if types and resource_type not in types:
+            return False
+        if resource_type in excluded_types:
+            return False
+        if domains and not self.__match_domains(page_host, domains):
+            return False
+        if excluded_domains and\
+                self.__match_domains(page_host, excluded_domains):
+            return False
+        return regex.search(uri) is not None
+
+    def __match_domains(self, host, domains):
+        """
+            True if host is one of domains or a subdomain
+            @param host as str
+            @param domains as [str]
+            @return bool
+        """
+        for domain in domains:
+            if host == domain or host.endswith("." + domain):
+                return True
+        return False
+
+    def __get_base_domain(self, host):
+        """
+            Get registrable domain, no public suffix list:
+            two last labels, three for "co.uk" like suffixes
+            @param host as str
+            @return str
+        """
+        labels = host.split(":")[0].split(".")
+        if len(labels) > 2 and len(labels[-1]) == 2 and len(labels[-2]) <= 3:
+            return ".".join(labels[-3:])
+        return ".".join(labels[-2:])
+
+    def __get_type(self, uri, parsed, page_uri):
+        """
+            Guess resource type, WebKit does not give it to extensions
+            @param uri as str
+            @param parsed as urllib.parse.ParseResult
+            @param page_uri as str
+            @return str/None
+        """
+        if parsed.scheme in ["ws", "wss"]:
+            return "websocket"
+        if uri == page_uri:
+            return None
+        extension = parsed.path.split("/")[-1].split(".")[-1].lower()
+        return self.__EXTENSIONS.get(extension, None)
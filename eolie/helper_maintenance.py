@@ -0,0 +1,185 @@
+# Copyright (c) 2017 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from gi.repository import GLib
+
+from time import time, perf_counter
+
+from eolie.define import El, TaskQueue
+from eolie.sqlcursor import SqlCursor
+from eolie.helper_task import TaskHelper
+from eolie.utils import debug
+
+
+class MaintenanceHelper:
+    """
+        Keep databases small while browsing, replace VACUUM on quit
+        Each slice maintains one database in a background worker:
+        incremental vacuum, optimize and WAL checkpoint
+        Slices only run when user is not using Eolie
+    """
+
+    # Delay between two slices (seconds)
+    __INTERVAL = 300
+    # Free pages released by a slice
+    __PAGES = 256
+    # Delay between two artwork cache cleanups (seconds)
+    __ART_INTERVAL = 86400
+    # Records kept for stats
+    __MAX_RECORDS = 50
+
+    def __init__(self):
+        """
+            Init helper
+        """
+        self.__index = 0
+        self.__running = False
+        self.__timeout_id = None
+        self.__art_time = 0
+        self.__records = []
+
+    def start(self):
+        """
+            Start running slices
+        """
+        if self.__timeout_id is None:
+            self.__timeout_id = GLib.timeout_add_seconds(self.__INTERVAL,
+                                                         self.__on_timeout)
+
+    def stop(self):
+        """
+            Stop running slices, running one is not interrupted
+        """
+        if self.__timeout_id is not None:
+            GLib.source_remove(self.__timeout_id)
+            self.__timeout_id = None
+
+    @property
+    def records(self):
+        """
+            Get last slices
+            @return [(time as float, name as str,
+                      actions as [str], duration as float)]
+        """
+        return list(self.__records)
+
+#######################
+# PRIVATE             #
+#######################
+    def __get_databases(self):
+        """
+            Get databases to maintain with their writers lock
+            @return [(str, object, threading.Lock/None)]
+        """
+        return [("history", El().history, El().history.thread_lock),
+                ("bookmarks", El().bookmarks, El().bookmarks.thread_lock),
+                ("session", El().session, None),
+                ("adblock", El().adblock, None),
+                ("phishing", El().phishing, None)]
+
+    def __is_idle(self):
+        """
+            True if user is not using Eolie: no window has focus
+            @return bool
+        """
+        for window in El().windows:
+            if window.is_active():
+                return False
+        return True
+
+    def __maintain(self, name, database, lock, clean_art):
+        """
+            Run a maintenance slice on database
+            @param name as str
+            @param database as Database*
+            @param lock as threading.Lock/None
+            @param clean_art as bool
+            @return (time as float, name as str,
+                     actions as [str], duration as float)
+            @thread safe
+        """
+        started = perf_counter()
+        actions = []
+        # Other writers wait for slice, mainly for the full VACUUM
+        if lock is not None:
+            lock.acquire()
+        try:
+            with SqlCursor(database) as sql:
+                result = sql.execute("PRAGMA auto_vacuum")
+                v = result.fetchone()
+                # Switching to incremental needs a full VACUUM, done once
+                if v is not None and v[0] != 2:
+                    sql.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                    sql.isolation_level = None
+                    sql.execute("VACUUM")
+                    sql.isolation_level = ""
+                    actions.append("vacuum")
+                else:
+                    result = sql.execute("PRAGMA freelist_count")
+                    free = result.fetchone()[0]
+                    if free:
+                        # Each step releases a page, fetch all steps
+                        sql.execute("PRAGMA incremental_vacuum(%s)" %
+                                    self.__PAGES).fetchall()
+                        actions.append("incremental_vacuum %s/%s" %
+                                       (min(free, self.__PAGES), free))
+                sql.execute("PRAGMA optimize")
+                actions.append("optimize")
+                result = sql.execute("PRAGMA journal_mode")
+                if result.fetchone()[0] == "wal":
+                    sql.execute("PRAGMA wal_checkpoint(PASSIVE)")
+                    actions.append("wal_checkpoint")
+        except Exception as e:
+            print("MaintenanceHelper::__maintain():", e)
+            actions.append("failed")
+        finally:
+            if lock is not None:
+                lock.release()
+        if clean_art:
+            El().art.vacuum()
+            actions.append("art cache")
+        return (time(), name, actions, perf_counter() - started)
+
+    def __on_maintained(self, record):
+        """
+            Save record, allow next slice
+            @param record as (float, str, [str], float)
+        """
+        self.__running = False
+        self.__records.append(record)
+        self.__records = self.__records[-self.__MAX_RECORDS:]
+        debug("MaintenanceHelper: %s: %s in %.1f ms" %
+              (record[1], ", ".join(record[2]), record[3] * 1000))
+
+    def __on_timeout(self):
+        """
+            Run a slice if nothing else uses the databases
+        """
+        # Retry later, user is browsing
+        if self.__running or not self.__is_idle():
+            return True
+        # Sync holds long transactions, retry later
+        sync_worker = El().sync_worker
+        if sync_worker is not None and sync_worker.syncing:
+            return True
+        databases = self.__get_databases()
+        (name, database, lock) = databases[self.__index % len(databases)]
+        self.__index += 1
+        clean_art = time() - self.__art_time > self.__ART_INTERVAL
+        if clean_art:
+            self.__art_time = time()
+        self.__running = True
+        task_helper = TaskHelper()
+        task_helper.run(self.__maintain, name, database, lock, clean_art,
+                        callback=(self.__on_maintained,),
+                        queue=TaskQueue.BACKGROUND)
+        return True
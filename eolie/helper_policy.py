@@ -0,0 +1,173 @@
+# Copyright (c) 2017 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import mmap
+from os import stat, replace
+from time import time
+
+from eolie.define import POLICY_SNAPSHOT_PATH
+
+
+class PolicySnapshot:
+    """
+        Read only copy of exceptions databases for web processes
+        UI process writes a sorted file, one "kind\\tdomain\\tvalue" line
+        per exception. Web processes map it in memory (pages are shared)
+        and look for lines with a binary search, no sqlite needed
+    """
+
+    # Delay between two checks for a new snapshot (seconds)
+    __CHECK_DELAY = 1
+
+    def __init__(self):
+        """
+            Init snapshot, file is mapped on first use
+        """
+        self.__data = None
+        self.__stat = None
+        self.__checked = 0
+
+    def write(self, databases):
+        """
+            Write snapshot for databases
+            @param databases as {kind as str: DatabaseExceptions}
+        """
+        lines = []
+        for (kind, database) in databases.items():
+            for (value, domain) in database.get_all():
+                line = "%s\t%s\t%s" % (kind, domain, value)
+                if line.find("\n") == -1 and line.count("\t") == 2:
+                    lines.append(line.encode("utf-8"))
+        lines.sort()
+        try:
+            # Mapped files stay valid, new file replaces old one
+            tmp_path = "%s.tmp" % POLICY_SNAPSHOT_PATH
+            with open(tmp_path, "wb") as f:
+                for line in lines:
+                    f.write(line + b"\n")
+            replace(tmp_path, POLICY_SNAPSHOT_PATH)
+        except Exception as e:
+            print("PolicySnapshot::write():", e)
+
+    def find(self, kind, value, domain=""):
+        """
+            True if value is an exception
+            @param kind as str
+            @param value as str
+            @param domain as str
+            @return bool
+        """
+        data = self.__get_data()
+        if data is None:
+            return False
+        key = ("%s\t%s\t%s" % (kind, domain, value)).encode("utf-8")
+        low = 0
+        high = len(data)
+        while low < high:
+            middle = (low + high) // 2
+            # Lines start after a \n, low is always a line start
+            start = data.rfind(b"\n", low, middle)
+            start = low if start == -1 else start + 1
+            end = data.find(b"\n", start)
+            line = data[start:end]
+            if line == key:
+                return True
+            elif line < key:
+                low = end + 1
+            else:
+                high = start
+        return False
+
+    def refresh(self):
+        """
+            Check for a new snapshot on next lookup
+            UI writes snapshot just before reloading pages
+        """
+        self.__checked = 0
+
+    def get_exceptions(self, kind):
+        """
+            Get a DatabaseExceptions like object for kind
+            @param kind as str
+            @return SnapshotExceptions
+        """
+        return SnapshotExceptions(self, kind)
+
+#######################
+# PRIVATE             #
+#######################
+    def __get_data(self):
+        """
+            Get mapped snapshot, map it again if file changed
+            @return mmap.mmap/None
+        """
+        if time() - self.__checked < self.__CHECK_DELAY:
+            return self.__data
+        self.__checked = time()
+        try:
+            st = stat(POLICY_SNAPSHOT_PATH)
+            key = (st.st_ino, st.st_mtime_ns, st.st_size)
+            if key != self.__stat:
+                self.__stat = key
+                if self.__data is not None:
+                    self.__data.close()
+                    self.__data = None
+                # Empty files can't be mapped
+                if st.st_size:
+                    with open(POLICY_SNAPSHOT_PATH, "rb") as f:
+                        self.__data = mmap.mmap(f.fileno(), 0,
+                                                access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            self.__data = None
+            self.__stat = None
+        except Exception as e:
+            print("PolicySnapshot::__get_data():", e)
+        return self.__data
+
+
+class SnapshotExceptions:
+    """
+        Exceptions for a kind, same API than DatabaseExceptions lookups
+    """
+
+    def __init__(self, snapshot, kind):
+        """
+            Init exceptions
+            @param snapshot as PolicySnapshot
+            @param kind as str
+        """
+        self.__snapshot = snapshot
+        self.__kind = kind
+
+    def find(self, value, domain=""):
+        """
+            True if value is an exception
+            @param value as str
+            @param domain as str
+            @return bool
+        """
+        return self.__snapshot.find(self.__kind, value, domain)
+
+    def refresh(self):
+        """
+            Check for a new snapshot on next lookup
+        """
+        self.__snapshot.refresh()
+
+    def find_parsed(self, parsed):
+        """
+            True if value is an exception
+            @param parsed as urlparse.parsed
+            @return bool
+        """
+        return self.find(parsed.netloc) or\
+            self.find(parsed.netloc + parsed.path)
@@ -0,0 +1,193 @@
+# Copyright (c) 2017 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import json
+from base64 import b64encode, b64decode
+from hashlib import sha256
+from hmac import new, compare_digest
+from queue import Queue, Full
+from threading import Thread, Event
+from concurrent.futures import Future
+
+
+def encrypt_payload(record, encryption_key, hmac_key):
+    """
+        Encrypt payload
+        @param record as {}
+        @param encryption_key as bytes
+        @param hmac_key as bytes
+        @return encrypted record payload
+    """
+    from Crypto.Cipher import AES
+    from Crypto import Random
+    plaintext = json.dumps(record).encode("utf-8")
+    # Input strings must be a multiple of 16 in length
+    length = 16 - (len(plaintext) % 16)
+    plaintext += bytes([length]) * length
+    iv = Random.new().read(16)
+    aes = AES.new(encryption_key, AES.MODE_CBC, iv)
+    ciphertext = b64encode(aes.encrypt(plaintext))
+    _hmac = new(hmac_key, ciphertext, sha256).hexdigest()
+    payload = {"ciphertext": ciphertext.decode("utf-8"),
+               "IV": b64encode(iv).decode("utf-8"), "hmac": _hmac}
+    return json.dumps(payload)
+
+
+def decrypt_payloads(payloads, encryption_key, hmac_key):
+    """
+        Decrypt payloads, run in crypto threads
+        @param payloads as [str] (json)
+        @param encryption_key as bytes
+        @param hmac_key as bytes
+        @return uncrypted payloads as [{}]
+        @raise ValueError on HMAC mismatch
+    """
+    # Import once for all payloads
+    from Crypto.Cipher import AES
+    decrypted = []
+    for payload in payloads:
+        j = json.loads(payload)
+        ciphertext = j["ciphertext"].encode("utf-8")
+        # Always check the hmac before decrypting anything.
+        expected_hmac = new(hmac_key, ciphertext, sha256).hexdigest()
+        if not compare_digest(j["hmac"], expected_hmac):
+            raise ValueError("HMAC mismatch: %s != %s" % (j["hmac"],
+                                                          expected_hmac))
+        iv = b64decode(j["IV"])
+        aes = AES.new(encryption_key, AES.MODE_CBC, iv)
+        plaintext = aes.decrypt(b64decode(ciphertext))
+        plaintext = plaintext.strip().decode("utf-8")
+        # Remove any CBC block padding,
+        # assuming it's a well-formed JSON payload.
+        plaintext = plaintext[:plaintext.rfind("}") + 1]
+        decrypted.append(json.loads(plaintext))
+    return decrypted
+
+
+def decrypt_payload(payload, encryption_key, hmac_key):
+    """
+        Decrypt payload
+        @param payload as str (json)
+        @param encryption_key as bytes
+        @param hmac_key as bytes
+        @return uncrypted payload as {}
+        @raise ValueError on HMAC mismatch
+    """
+    return decrypt_payloads([payload], encryption_key, hmac_key)[0]
+
+
+class RecordsPipeline:
+    """
+        Get records with decrypted payloads, in server order
+        A thread downloads pages and sends them to crypto threads while
+        caller applies previous pages: network, crypto and database work
+        overlap
+    """
+
+    # Records by server request
+    __PAGE_SIZE = 1000
+    # Pages downloaded ahead of caller
+    __AHEAD = 4
+
+    def __init__(self, fetch_page, encryption_key, hmac_key, executor=None):
+        """
+            Init pipeline
+            @param fetch_page as function(limit as int, offset as str/None)
+                   returning (records as [{}], next offset as str/None)
+            @param encryption_key as bytes
+            @param hmac_key as bytes
+            @param executor as concurrent.futures.Executor/None, owned by
+                   caller, pages are decrypted in fetch thread if None
+        """
+        self.__fetch_page = fetch_page
+        self.__keys = (encryption_key, hmac_key)
+        self.__executor = executor
+        self.__queue = Queue(self.__AHEAD)
+        self.__cancelled = Event()
+
+    def __iter__(self):
+        """
+            Get records, payloads decrypted
+            @return generator of {}
+            @raise network errors, ValueError on HMAC mismatch
+        """
+        thread = Thread(target=self.__fetch, name="RecordsPipeline")
+        thread.daemon = True
+        thread.start()
+        try:
+            while True:
+                item = self.__queue.get()
+                if item is None:
+                    break
+                elif isinstance(item, Exception):
+                    raise item
+                (records, future) = item
+                for (record, payload) in zip(records, future.result()):
+                    record["payload"] = payload
+                    yield record
+        finally:
+            # Caller may stop iterating early: cancelled or failed sync
+            self.__cancelled.set()
+
+#######################
+# PRIVATE             #
+#######################
+    def __fetch(self):
+        """
+            Download pages and queue their decryption, None at end
+        """
+        try:
+            offset = None
+            while not self.__cancelled.is_set():
+                (records, offset) = self.__fetch_page(self.__PAGE_SIZE,
+                                                      offset)
+                payloads = [record["payload"] for record in records]
+                future = self.__decrypt(payloads)
+                if not self.__put((records, future)) or offset is None:
+                    break
+        except Exception as e:
+            self.__put(e)
+        self.__put(None)
+
+    def __decrypt(self, payloads):
+        """
+            Decrypt payloads with executor if available
+            @param payloads as [str]
+            @return concurrent.futures.Future
+        """
+        if self.__executor is not None:
+            try:
+                return self.__executor.submit(decrypt_payloads,
+                                              payloads, *self.__keys)
+            # Executor shut down, sync is stopping
+            except RuntimeError:
+                pass
+        future = Future()
+        try:
+            future.set_result(decrypt_payloads(payloads, *self.__keys))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def __put(self, item):
+        """
+            Queue item for caller, give up if cancelled
+            @param item as (records, future)/Exception/None
+            @return True if queued
+        """
+        while not self.__cancelled.is_set():
+            try:
+                self.__queue.put(item, timeout=0.5)
+                return True
+            except Full:
+                continue
+        return False
@@ -10,11 +10,155 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-import gi
-gi.require_version("Soup", "2.4")
-from gi.repository import GLib, Soup
+from gi.repository import GLib
 
-from threading import Thread
+from threading import Thread, Lock, current_thread
+from queue import Queue
+from time import time
+
+from eolie.define import El, FetchPriority, TaskQueue
+
+
+class TaskPool:
+    """
+        Bounded pool of worker threads, one queue per TaskQueue
+        A task with a token is stale when a newer task with same token
+        is added: it is not run and its callback is dropped
+    """
+
+    # Sync has its own worker: it would hold a background worker
+    # for minutes, starving other background tasks
+    __WORKERS = {TaskQueue.INTERACTIVE: 2,
+                 TaskQueue.IO: 2,
+                 TaskQueue.BACKGROUND: 2,
+                 TaskQueue.SYNC: 1}
+    __NAMES = {TaskQueue.INTERACTIVE: "interactive",
+               TaskQueue.IO: "io",
+               TaskQueue.BACKGROUND: "background",
+               TaskQueue.SYNC: "sync"}
+    # Lower background threads priority, UI first
+    __NICENESS = {TaskQueue.BACKGROUND: 10,
+                  TaskQueue.SYNC: 10}
+
+    def __init__(self):
+        """
+            Init pool, start workers
+        """
+        self.__lock = Lock()
+        self.__queues = {}
+        self.__stats = {}
+        self.__tokens = {}
+        self.__serial = 0
+        for queue_id in self.__WORKERS.keys():
+            self.__queues[queue_id] = Queue()
+            self.__stats[queue_id] = {"submitted": 0,
+                                      "completed": 0,
+                                      "dropped": 0,
+                                      "wait": 0.0,
+                                      "run": 0.0}
+            for i in range(0, self.__WORKERS[queue_id]):
+                thread = Thread(target=self.__worker, args=(queue_id,),
+                                name="TaskPool-%s-%s" % (
+                                    self.__NAMES[queue_id], i))
+                thread.daemon = True
+                thread.start()
+
+    def add(self, queue_id, token, command, args, callback):
+        """
+            Queue command
+            @param queue_id as TaskQueue
+            @param token as str/None
+            @param command as function
+            @param args as []
+            @param callback as (function, *args)/None
+        """
+        with self.__lock:
+            self.__serial += 1
+            serial = self.__serial
+            if token is not None:
+                self.__tokens[token] = serial
+            self.__stats[queue_id]["submitted"] += 1
+        self.__queues[queue_id].put((time(), token, serial,
+                                     command, args, callback))
+
+    def get_stats(self):
+        """
+            Get queues statistics, times are averages in ms
+            @return {str: {}}
+        """
+        stats = {}
+        with self.__lock:
+            for (queue_id, values) in self.__stats.items():
+                completed = max(values["completed"], 1)
+                stats[self.__NAMES[queue_id]] = {
+                    "depth": self.__queues[queue_id].qsize(),
+                    "submitted": values["submitted"],
+                    "completed": values["completed"],
+                    "dropped": values["dropped"],
+                    "wait": round(values["wait"] * 1000 / completed, 2),
+                    "run": round(values["run"] * 1000 / completed, 2)}
+        return stats
+
+#######################
+# PRIVATE             #
+#######################
+    def __is_stale(self, token, serial):
+        """
+            True if a newer task exists for token
+            @param token as str/None
+            @param serial as int
+            @return bool
+        """
+        return token is not None and self.__tokens.get(token) != serial
+
+    def __worker(self, queue_id):
+        """
+            Run tasks from queue
+            @param queue_id as TaskQueue
+        """
+        if queue_id in self.__NICENESS.keys():
+            try:
+                # Linux only: niceness is per thread
+                from os import setpriority, PRIO_PROCESS
+                from threading import get_native_id
+                setpriority(PRIO_PROCESS, get_native_id(),
+                            self.__NICENESS[queue_id])
+            except:
+                pass
+        queue = self.__queues[queue_id]
+        while True:
+            (queued, token, serial, command, args, callback) = queue.get()
+            if self.__is_stale(token, serial):
+                with self.__lock:
+                    self.__stats[queue_id]["dropped"] += 1
+                continue
+            started = time()
+            try:
+                result = command(*args)
+                if callback is not None:
+                    (callback, *callback_args) = callback
+                    if callback is not None:
+                        GLib.idle_add(self.__on_result, token, serial,
+                                      callback, result, *callback_args)
+            except Exception as e:
+                print("TaskPool::__worker():", e, command,
+                      current_thread().getName())
+            with self.__lock:
+                stats = self.__stats[queue_id]
+                stats["completed"] += 1
+                stats["wait"] += started - queued
+                stats["run"] += time() - started
+
+    def __on_result(self, token, serial, callback, result, *args):
+        """
+            Pass result to callback if task is not stale
+            @param token as str/None
+            @param serial as int
+            @param callback as function
+            @param result as object
+        """
+        if not self.__is_stale(token, serial):
+            callback(result, *args)
 
 
 class TaskHelper:
@@ -42,132 +186,36 @@ class TaskHelper:
             run command with params and return to callback
             @param command as function
             @param *args as command arguments
-            @param **kwd as { "callback": (function, *args) }
+            @param **kwd as { "callback": (function, *args),
+                              "queue": TaskQueue,
+                              "token": str }
         """
-        thread = Thread(target=self.__run,
-                        args=(command, kwd, *args))
-        thread.daemon = True
-        thread.start()
+        queue_id = kwd.get("queue", TaskQueue.IO)
+        token = kwd.get("token", None)
+        callback = kwd.get("callback", None)
+        El().task_pool.add(queue_id, token, command, args, callback)
 
-    def load_uri_content(self, uri, cancellable, callback, *args):
+    def load_uri_content(self, uri, cancellable, callback, *args,
+                         priority=FetchPriority.DEFAULT, group=None):
         """
             Load uri with libsoup (better performance than Gio)
+            Use application shared session
             @param uri as str
             @param cancellable as Gio.Cancellable
             @param callback as a function
+            @param priority as FetchPriority
+            @param group as str, see FetchHelper.cancel_group()
             @callback (uri as str, status as bool, content as bytes, args)
         """
-        try:
-            session = Soup.Session.new()
-            session.set_property('accept-language-auto', True)
-            request = session.request(uri)
-            request.send_async(cancellable,
-                               self.__on_request_send_async,
-                               callback,
-                               cancellable,
-                               uri,
-                               *args)
-        except Exception as e:
-            print("HelperTask::load_uri_content():",  e)
-            callback(None, False, b"", *args)
+        El().fetch_helper.load_uri_content(uri, cancellable, callback, *args,
+                                           priority=priority, group=group)
 
     def load_uri_content_sync(self, uri, cancellable=None):
-            """
-                Load uri
-                @param uri as str
-                @param cancellable as Gio.Cancellable
-                @return (loaded as bool, content as bytes)
-            """
-            try:
-                session = Soup.Session.new()
-                # Post message
-                if self.__headers:
-                    msg = Soup.Message.new("GET", uri)
-                    headers = msg.get_property("request-headers")
-                    for header in self.__headers:
-                        headers.append(header[0],
-                                       header[1])
-                    session.send_message(msg)
-                    body = msg.get_property("response-body")
-                    bytes = body.flatten().get_data()
-                # Get message
-                else:
-                    request = session.request(uri)
-                    stream = request.send(cancellable)
-                    bytes = bytearray(0)
-                    buf = stream.read_bytes(1024, cancellable).get_data()
-                    while buf:
-                        bytes += buf
-                        buf = stream.read_bytes(1024, cancellable).get_data()
-                    stream.close()
-                return (True, bytes)
-            except Exception as e:
-                print("TaskHelper::load_uri_content_sync():",  e)
-                return (False, b"")
-
-#######################
-# PRIVATE             #
-#######################
-    def __run(self, command, kwd, *args):
-        """
-            Pass command result to callback
-            @param command as function
-            @param *args as command arguments
-            @param kwd as { "callback": (function, *args) }
-        """
-        try:
-            result = command(*args)
-            if "callback" in kwd.keys():
-                (callback, *callback_args) = kwd["callback"]
-                if callback is not None:
-                    GLib.idle_add(callback, result, *callback_args)
-        except Exception as e:
-            print("TaskHelper::__run():", e, command, kwd)
-
-    def __on_read_bytes_async(self, stream, result, content,
-                              cancellable, callback, uri, *args):
         """
-            Read data from stream, when finished, pass to callback
-            @param stream as Gio.InputStream
-            @param result as Gio.AsyncResult
-            @param cancellable as Gio.Cancellable
-            @param content as bytes
-            @param callback as function
+            Load uri
             @param uri as str
-        """
-        try:
-            content_result = stream.read_bytes_finish(result)
-            content_bytes = content_result.get_data()
-            if content_bytes:
-                content += content_bytes
-                stream.read_bytes_async(4096, GLib.PRIORITY_LOW,
-                                        cancellable,
-                                        self.__on_read_bytes_async,
-                                        content, cancellable, callback,
-                                        uri, *args)
-            else:
-                callback(uri, True, bytes(content), *args)
-        except Exception as e:
-            print("TaskHelper::__on_read_bytes_async():", e)
-            callback(None, False, b"", *args)
-
-    def __on_request_send_async(self, source, result, callback,
-                                cancellable, uri, *args):
-        """
-            Get stream and start reading from it
-            @param source as Soup.Session
-            @param result as Gio.AsyncResult
             @param cancellable as Gio.Cancellable
-            @param callback as a function
-            @param uri as str
+            @return (loaded as bool, content as bytes)
         """
-        try:
-            stream = source.send_finish(result)
-            # We use a bytearray here as seems that bytes += is really slow
-            stream.read_bytes_async(4096, GLib.PRIORITY_LOW,
-                                    cancellable, self.__on_read_bytes_async,
-                                    bytearray(0), cancellable, callback, uri,
-                                    *args)
-        except Exception as e:
-            print("TaskHelper::__on_soup_msg_finished():",  e)
-            callback(None, False, b"", *args)
+        return El().fetch_helper.load_uri_content_sync(uri, cancellable,
+                                                       self.__headers)
@@ -0,0 +1,227 @@
+# Copyright (c) 2017 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from time import perf_counter
+
+
+class TimingHelper:
+    """
+        Record wall time of named steps (startup profiling)
+    """
+
+    def __init__(self):
+        """
+            Init helper, time origin is now
+        """
+        self.__origin = perf_counter()
+        self.__started = {}
+        self.__timings = []
+
+    def start(self, name):
+        """
+            Start timing step
+            @param name as str
+        """
+        self.__started[name] = perf_counter()
+
+    def stop(self, name):
+        """
+            Stop timing step
+            @param name as str
+        """
+        started = self.__started.pop(name, None)
+        if started is not None:
+            self.__timings.append((name,
+                                   started - self.__origin,
+                                   perf_counter() - started))
+
+    def mark(self, name):
+        """
+            Record an instant event, relative to origin
+            @param name as str
+        """
+        self.__timings.append((name, perf_counter() - self.__origin, 0))
+
+    def run(self, name, command, *args):
+        """
+            Run command and record its duration
+            @param name as str
+            @param command as function
+            @param *args as command arguments
+            @return command result
+        """
+        self.start(name)
+        try:
+            return command(*args)
+        finally:
+            self.stop(name)
+
+    def dump(self):
+        """
+            Get timings as printable lines
+            @return [str]
+        """
+        lines = []
+        for (name, start, duration) in self.__timings:
+            lines.append("%8.1f ms %8.1f ms  %s" % (start * 1000,
+                                                    duration * 1000,
+                                                    name))
+        return lines
+
+    @property
+    def timings(self):
+        """
+            Get recorded timings
+            @return [(name as str, start as float, duration as float)]
+            times are in seconds
+        """
+        return list(self.__timings)
+
+
+class HookStats:
+    """
+        Per page statistics for signal hooks: calls, cumulative time
+        and counters (blocked requests, database lookups, ...)
+        Nothing is recorded until enabled, debug only
+    """
+
+    def __init__(self):
+        """
+            Init stats
+        """
+        self.__enabled = False
+        # {page_id: {"hooks": {name: [calls, seconds]},
+        #            "counters": {name: int},
+        #            "remote": {} (optional)}}
+        self.__pages = {}
+
+    def set_enabled(self, enabled):
+        """
+            Enable stats, hooks wrapped before stay untimed
+            @param enabled as bool
+        """
+        self.__enabled = enabled
+        if not enabled:
+            self.__pages = {}
+
+    def add(self, page_id, name, duration):
+        """
+            Record a hook call
+            @param page_id as int
+            @param name as str
+            @param duration as float (seconds)
+        """
+        if not self.__enabled:
+            return
+        hooks = self.__get_page(page_id)["hooks"]
+        if name not in hooks.keys():
+            hooks[name] = [0, 0.0]
+        hooks[name][0] += 1
+        hooks[name][1] += duration
+
+    def count(self, page_id, name, value=1):
+        """
+            Increment a counter
+            @param page_id as int
+            @param name as str
+            @param value as int
+        """
+        if not self.__enabled:
+            return
+        counters = self.__get_page(page_id)["counters"]
+        counters[name] = counters.get(name, 0) + value
+
+    def merge(self, page_id, stats):
+        """
+            Set stats exported by another process for page
+            @param page_id as int
+            @param stats as {} (see get())
+        """
+        if not self.__enabled:
+            return
+        self.__get_page(page_id)["remote"] = stats
+
+    def wrap(self, name, callback):
+        """
+            Get a signal handler timing callback
+            @param name as str
+            @param callback as function(webpage/webview, *args)
+            @return function, callback if stats are disabled
+        """
+        if not self.__enabled:
+            return callback
+
+        def hook(source, *args):
+            started = perf_counter()
+            try:
+                return callback(source, *args)
+            finally:
+                self.add(source.get_id(), name, perf_counter() - started)
+        return hook
+
+    @property
+    def enabled(self):
+        """
+            True if stats are recorded
+            @return bool
+        """
+        return self.__enabled
+
+    def get(self, page_id=None):
+        """
+            Get stats for page, for all pages if None
+            @param page_id as int/None
+            @return {} as JSON serializable
+        """
+        if page_id is None:
+            return {str(page_id): self.__export(page)
+                    for (page_id, page) in self.__pages.items()}
+        elif page_id in self.__pages.keys():
+            return self.__export(self.__pages[page_id])
+        else:
+            return self.__export({"hooks": {}, "counters": {}})
+
+    def remove(self, page_id):
+        """
+            Forget page
+            @param page_id as int
+        """
+        self.__pages.pop(page_id, None)
+
+#######################
+# PRIVATE             #
+#######################
+    def __get_page(self, page_id):
+        """
+            Get stats for page, create them if needed
+            @param page_id as int
+            @return {}
+        """
+        if page_id not in self.__pages.keys():
+            self.__pages[page_id] = {"hooks": {}, "counters": {}}
+        return self.__pages[page_id]
+
+    def __export(self, page):
+        """
+            Get page stats, times in milliseconds
+            @param page as {}
+            @return {}
+        """
+        hooks = {}
+        for (name, (calls, seconds)) in page["hooks"].items():
+            hooks[name] = {"calls": calls,
+                           "total_ms": round(seconds * 1000, 3),
+                           "mean_ms": round(seconds * 1000 / calls, 3)}
+        stats = {"hooks": hooks, "counters": dict(page["counters"])}
+        if "remote" in page.keys():
+            stats["remote"] = page["remote"]
+        return stats
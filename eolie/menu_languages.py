@@ -129,5 +129,7 @@ class LanguagesMenu(Gtk.Bin):
         listbox.set_sensitive(state)
         for window in El().windows:
             for view in window.container.views:
+                if view.offloaded:
+                    continue
                 context = view.webview.get_context()
                 context.set_spell_checking_enabled(state)
@@ -67,6 +67,7 @@ class ScriptRow(Gtk.EventBox):
             El().js_exceptions.remove_exception(self.__uri, self.__domain)
         else:
             El().js_exceptions.add_exception(self.__uri, self.__domain)
+        El().update_policy_snapshot()
 
 
 class ScriptsMenu(Gtk.Bin):
@@ -18,12 +18,15 @@ from hashlib import sha256
 import json
 from fcntl import flock, LOCK_EX, LOCK_NB, LOCK_UN
 from time import time, sleep
+from threading import Lock
 
 from eolie.helper_task import TaskHelper
-from eolie.define import El, EOLIE_DATA_PATH
+from eolie.define import El, EOLIE_DATA_PATH, TaskQueue
 from eolie.utils import debug
 from eolie.sqlcursor import SqlCursor
 from eolie.helper_passwords import PasswordsHelper
+from eolie.helper_sync_crypto import RecordsPipeline, encrypt_payload
+from eolie.helper_sync_crypto import decrypt_payload
 
 
 TOKENSERVER_URL = "https://token.services.mozilla.com/"
@@ -35,6 +38,9 @@ class SyncWorker:
        Manage sync with mozilla server, will start syncing on init
     """
 
+    # Pages decrypted at the same time
+    __CRYPTO_THREADS = 2
+
     def check_modules():
         """
             True if deps are installed
@@ -60,6 +66,8 @@ class SyncWorker:
         # We do not create this here because it's slow down Eolie startup
         # See __mozilla_sync property
         self.__mz = None
+        self.__executor = None
+        self.__executor_lock = Lock()
         self.__state_lock = True
         self.__session = None
         self.__helper = PasswordsHelper()
@@ -130,7 +138,8 @@ class SyncWorker:
         if Gio.NetworkMonitor.get_default().get_network_available() and\
                 self.__username and self.__password and not self.syncing:
             task_helper = TaskHelper()
-            task_helper.run(self.__sync, first_sync)
+            task_helper.run(self.__sync, first_sync,
+                            queue=TaskQueue.SYNC)
         return loop
 
     def push_history(self, history_ids):
@@ -141,7 +150,8 @@ class SyncWorker:
         if Gio.NetworkMonitor.get_default().get_network_available() and\
                 self.__username and self.__password:
             task_helper = TaskHelper()
-            task_helper.run(self.__push_history, history_ids)
+            task_helper.run(self.__push_history, history_ids,
+                            queue=TaskQueue.SYNC)
 
     def push_password(self, user_form_name, user_form_value, pass_form_name,
                       pass_form_value, uri, form_uri, uuid):
@@ -160,7 +170,8 @@ class SyncWorker:
             task_helper = TaskHelper()
             task_helper.run(self.__push_password,
                             user_form_name, user_form_value, pass_form_name,
-                            pass_form_value, uri, form_uri, uuid)
+                            pass_form_value, uri, form_uri, uuid,
+                            queue=TaskQueue.SYNC)
 
     def remove_from_history(self, guid):
         """
@@ -170,7 +181,8 @@ class SyncWorker:
         if Gio.NetworkMonitor.get_default().get_network_available() and\
                 self.__username and self.__password:
             task_helper = TaskHelper()
-            task_helper.run(self.__remove_from_history, guid)
+            task_helper.run(self.__remove_from_history, guid,
+                            queue=TaskQueue.SYNC)
 
     def remove_from_bookmarks(self, guid):
         """
@@ -180,7 +192,8 @@ class SyncWorker:
         if Gio.NetworkMonitor.get_default().get_network_available() and\
                 self.__username and self.__password:
             task_helper = TaskHelper()
-            task_helper.run(self.__remove_from_bookmarks, guid)
+            task_helper.run(self.__remove_from_bookmarks, guid,
+                            queue=TaskQueue.SYNC)
 
     def remove_from_passwords(self, uuid):
         """
@@ -190,7 +203,8 @@ class SyncWorker:
         if Gio.NetworkMonitor.get_default().get_network_available() and\
                 self.__username and self.__password:
             task_helper = TaskHelper()
-            task_helper.run(self.__remove_from_passwords, uuid)
+            task_helper.run(self.__remove_from_passwords, uuid,
+                            queue=TaskQueue.SYNC)
 
     def delete_secret(self):
         """
@@ -210,6 +224,10 @@ class SyncWorker:
         self.__sync_cancellable.cancel()
         if force:
             self.__session = None
+        with self.__executor_lock:
+            if self.__executor is not None:
+                self.__executor.shutdown(wait=False)
+                self.__executor = None
 
     def on_password_stored(self, secret, result, sync):
         """
@@ -273,6 +291,23 @@ class SyncWorker:
             self.__mz = MozillaSync()
         return self.__mz
 
+    @property
+    def __crypto_executor(self):
+        """
+            Get threads decrypting records, create if None
+            AES and HMAC are cheap, a page does not need a process
+            @return ThreadPoolExecutor/None if sync is stopped
+        """
+        with self.__executor_lock:
+            # Sync thread may still run after stop(), no new threads
+            if self.__sync_cancellable.is_cancelled():
+                return None
+            if self.__executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self.__executor = ThreadPoolExecutor(
+                    self.__CRYPTO_THREADS, thread_name_prefix="SyncCrypto")
+            return self.__executor
+
     def __get_session_bulk_keys(self):
         """
             Get session decrypt keys
@@ -513,38 +548,35 @@ class SyncWorker:
             @raise StopIteration
         """
         debug("push bookmarks")
+        # One snapshot instead of queries for each bookmark and folder
+        tree = El().bookmarks.get_tree()
+        # Ordered parents and a set for membership tests
         parents = []
-        for bookmark_id in El().bookmarks.get_ids_for_mtime(
-                                                   self.__mtimes["bookmarks"]):
+        parent_ids = set()
+        for bookmark_id in tree.get_ids_for_mtime(self.__mtimes["bookmarks"]):
             self.__check_worker()
             sleep(0.01)
-            parent_guid = El().bookmarks.get_parent_guid(bookmark_id)
-            # No parent, move it to unfiled
-            if parent_guid is None:
-                parent_guid = "unfiled"
-            parent_id = El().bookmarks.get_id_by_guid(parent_guid)
-            if parent_id not in parents:
-                parents.append(parent_id)
+            bookmark = tree.get(bookmark_id)
+            parent_guid = tree.get_parent_guid(bookmark_id)
+            self.__add_parent(tree, parents, parent_ids, parent_guid)
             record = {}
-            record["bmkUri"] = El().bookmarks.get_uri(bookmark_id)
-            record["id"] = El().bookmarks.get_guid(bookmark_id)
-            record["title"] = El().bookmarks.get_title(bookmark_id)
-            record["tags"] = El().bookmarks.get_tags(bookmark_id)
+            record["bmkUri"] = bookmark["uri"]
+            record["id"] = bookmark["guid"]
+            record["title"] = bookmark["title"]
+            record["tags"] = list(bookmark["tags"])
             record["parentid"] = parent_guid
-            record["parentName"] = El().bookmarks.get_parent_name(bookmark_id)
+            record["parentName"] = tree.get_parent_name(bookmark_id)
             record["type"] = "bookmark"
             debug("pushing %s" % record)
             self.__mozilla_sync.add(record, "bookmarks", bulk_keys)
-        # Del old bookmarks
-        for bookmark_id in El().bookmarks.get_deleted_ids():
+        # Del old bookmarks, tree already ignores them as children
+        for bookmark_id in tree.get_deleted_ids():
             self.__check_worker()
             sleep(0.01)
-            parent_guid = El().bookmarks.get_parent_guid(bookmark_id)
-            parent_id = El().bookmarks.get_id_by_guid(parent_guid)
-            if parent_id not in parents:
-                parents.append(parent_id)
+            parent_guid = tree.get_parent_guid(bookmark_id)
+            self.__add_parent(tree, parents, parent_ids, parent_guid)
             record = {}
-            record["id"] = El().bookmarks.get_guid(bookmark_id)
+            record["id"] = tree.get(bookmark_id)["guid"]
             record["type"] = "bookmark"
             record["deleted"] = True
             debug("deleting %s" % record)
@@ -552,39 +584,39 @@ class SyncWorker:
             El().bookmarks.remove(bookmark_id)
         # Push parents in this order, parents near root are handled later
         # Otherwise, order will be broken by new children updates
-        while parents:
-            parent_id = parents.pop(0)
-            parent_guid = El().bookmarks.get_guid(parent_id)
-            parent_name = El().bookmarks.get_title(parent_id)
-            children = El().bookmarks.get_children(parent_guid)
-            # So search if children in parents
-            found = False
-            for child_guid in children:
-                child_id = El().bookmarks.get_id_by_guid(child_guid)
-                if child_id in parents:
-                    found = True
-                    break
-            # Handle children first
-            if found:
-                parents.append(parent_id)
-                debug("later: %s" % parent_name)
-                continue
+        for parent_id in tree.sort_folders(parents):
+            parent = tree.get(parent_id)
             record = {}
-            record["id"] = parent_guid
+            record["id"] = parent["guid"]
             record["type"] = "folder"
             # A parent with parent as unfiled needs to be moved to places
             # Firefox internal
-            grand_parent_guid = El().bookmarks.get_parent_guid(parent_id)
+            grand_parent_guid = tree.get_parent_guid(parent_id)
             if grand_parent_guid == "unfiled":
                 grand_parent_guid = "places"
             record["parentid"] = grand_parent_guid
-            record["parentName"] = El().bookmarks.get_parent_name(parent_id)
-            record["title"] = parent_name
-            record["children"] = children
+            record["parentName"] = tree.get_parent_name(parent_id)
+            record["title"] = parent["title"]
+            record["children"] = tree.get_children(parent["guid"])
             debug("pushing parent %s" % record)
             self.__mozilla_sync.add(record, "bookmarks", bulk_keys)
         El().bookmarks.clean_tags()
 
+    def __add_parent(self, tree, parents, parent_ids, parent_guid):
+        """
+            Add parent to folders to push, if known and not deleted
+            @param tree as BookmarksTree
+            @param parents as [int]
+            @param parent_ids as set(int), same ids than parents
+            @param parent_guid as str
+        """
+        parent = tree.get_by_guid(parent_guid)
+        if parent is None or parent["deleted"]:
+            debug("no folder to push for %s" % parent_guid)
+        elif parent["id"] not in parent_ids:
+            parent_ids.add(parent["id"])
+            parents.append(parent["id"])
+
     def __pull_bookmarks(self, bulk_keys, first_sync):
         """
             Pull from bookmarks
@@ -594,7 +626,8 @@ class SyncWorker:
         """
         debug("pull bookmarks")
         SqlCursor.add(El().bookmarks)
-        records = self.__mozilla_sync.get_records("bookmarks", bulk_keys)
+        records = self.__mozilla_sync.get_records("bookmarks", bulk_keys,
+                                                  self.__crypto_executor)
         children_array = []
         for record in records:
             self.__check_worker()
@@ -701,7 +734,8 @@ class SyncWorker:
             @raise StopIteration
         """
         debug("pull passwords")
-        records = self.__mozilla_sync.get_records("passwords", bulk_keys)
+        records = self.__mozilla_sync.get_records("passwords", bulk_keys,
+                                                  self.__crypto_executor)
         for record in records:
             self.__check_worker()
             if record["modified"] < self.__mtimes["passwords"]:
@@ -731,7 +765,8 @@ class SyncWorker:
             @raise StopIteration
         """
         debug("pull history")
-        records = self.__mozilla_sync.get_records("history", bulk_keys)
+        records = self.__mozilla_sync.get_records("history", bulk_keys,
+                                                  self.__crypto_executor)
         for record in records:
             self.__check_worker()
             if record["modified"] < self.__mtimes["history"]:
@@ -844,9 +879,10 @@ class MozillaSync(object):
 
         # Fetch the sync bundle keys out of storage.
         # They're encrypted with the account-level key.
-        keys = self.__decrypt_payload(self.__client.get_record("crypto",
-                                                               "keys"),
-                                      sync_keys)
+        record = self.__client.get_record("crypto", "keys")
+        keys = decrypt_payload(record["payload"],
+                               sync_keys.encryption_key,
+                               sync_keys.hmac_key)
 
         # There's some provision for using separate
         # key bundles for separate collections
@@ -863,18 +899,21 @@ class MozillaSync(object):
                               b64decode(keys["default"][1]))
         return bulk_keys
 
-    def get_records(self, collection, bulk_keys):
+    def get_records(self, collection, bulk_keys, executor=None):
         """
-            Return records payload
+            Return records, payloads decrypted by executor while caller
+            handles previous ones
             @param collection as str
             @param bulk keys as KeyBundle
-            @return [{}]
+            @param executor as concurrent.futures.Executor/None
+            @return generator of {}
         """
-        records = []
-        for record in self.__client.get_records(collection):
-            record["payload"] = self.__decrypt_payload(record, bulk_keys)
-            records.append(record)
-        return records
+        def fetch_page(limit, offset):
+            return self.__client.get_records_page(collection, limit, offset)
+        return iter(RecordsPipeline(fetch_page,
+                                    bulk_keys.encryption_key,
+                                    bulk_keys.hmac_key,
+                                    executor))
 
     def add(self, item, collection, bulk_keys):
         """
@@ -883,7 +922,9 @@ class MozillaSync(object):
             @param collection as str
             @param bulk_keys as KeyBundle
         """
-        payload = self.__encrypt_payload(item, bulk_keys)
+        payload = encrypt_payload(item,
+                                  bulk_keys.encryption_key,
+                                  bulk_keys.hmac_key)
         record = {}
         record["modified"] = round(time(), 2)
         record["payload"] = payload
@@ -914,59 +955,6 @@ class MozillaSync(object):
         """
         return self.__fxa_client
 
-#######################
-# PRIVATE             #
-#######################
-    def __encrypt_payload(self, record, key_bundle):
-        """
-            Encrypt payload
-            @param record as {}
-            @param key bundle as KeyBundle
-            @return encrypted record payload
-        """
-        from Crypto.Cipher import AES
-        from Crypto import Random
-        from hmac import new
-        from base64 import b64encode
-        plaintext = json.dumps(record).encode("utf-8")
-        # Input strings must be a multiple of 16 in length
-        length = 16 - (len(plaintext) % 16)
-        plaintext += bytes([length]) * length
-        iv = Random.new().read(16)
-        aes = AES.new(key_bundle.encryption_key, AES.MODE_CBC, iv)
-        ciphertext = b64encode(aes.encrypt(plaintext))
-        _hmac = new(key_bundle.hmac_key, ciphertext, sha256).hexdigest()
-        payload = {"ciphertext": ciphertext.decode("utf-8"),
-                   "IV": b64encode(iv).decode("utf-8"), "hmac": _hmac}
-        return json.dumps(payload)
-
-    def __decrypt_payload(self, record, key_bundle):
-        """
-            Descrypt payload
-            @param record as str (json)
-            @param key bundle as KeyBundle
-            @return uncrypted record payload
-        """
-        from Crypto.Cipher import AES
-        from hmac import new
-        from base64 import b64decode
-        j = json.loads(record["payload"])
-        # Always check the hmac before decrypting anything.
-        expected_hmac = new(key_bundle.hmac_key,
-                            j['ciphertext'].encode("utf-8"),
-                            sha256).hexdigest()
-        if j['hmac'] != expected_hmac:
-            raise ValueError("HMAC mismatch: %s != %s" % (j['hmac'],
-                                                          expected_hmac))
-        ciphertext = b64decode(j['ciphertext'])
-        iv = b64decode(j['IV'])
-        aes = AES.new(key_bundle.encryption_key, AES.MODE_CBC, iv)
-        plaintext = aes.decrypt(ciphertext).strip().decode("utf-8")
-        # Remove any CBC block padding,
-        # assuming it's a well-formed JSON payload.
-        plaintext = plaintext[:plaintext.rfind("}") + 1]
-        return json.loads(plaintext)
-
 
 class KeyBundle:
     """
@@ -1094,6 +1082,16 @@ class SyncClient(object):
             @param url as str
             @param kwargs as requests.request named args
         """
+        return self._response(method, url, **kwargs).json()
+
+    def _response(self, method, url, **kwargs):
+        """
+            Same as _request() but returns the response, headers needed
+            @param method as str
+            @param url as str
+            @param kwargs as requests.request named args
+            @return requests.Response
+        """
         from requests import request, exceptions
         url = self.__api_endpoint.rstrip('/') + '/' + url.lstrip('/')
         raw_resp = request(method, url, auth=self.__auth, **kwargs)
@@ -1105,7 +1103,7 @@ class SyncClient(object):
                 raw_resp.reason,
                 raw_resp.url)
             raise exceptions.HTTPError(http_error_msg, response=raw_resp)
-        return raw_resp.json()
+        return raw_resp
 
     def info_collections(self, **kwargs):
         """
@@ -1207,6 +1205,24 @@ class SyncClient(object):
         return self._request('get', '/storage/%s' % collection.lower(),
                              params=params, **kwargs)
 
+    def get_records_page(self, collection, limit, offset=None, **kwargs):
+        """
+            Returns a page of full BSO objects contained in a collection
+            @param collection as str
+            @param limit as int
+            @param offset as str/None, from previous page
+            @return (records as [{}], next page offset as str/None)
+        """
+        params = kwargs.pop('params', {})
+        params['full'] = True
+        params['limit'] = limit
+        if offset is not None:
+            params['offset'] = offset
+        raw_resp = self._response('get', '/storage/%s' % collection.lower(),
+                                  params=params, **kwargs)
+        return (raw_resp.json(),
+                raw_resp.headers.get('X-Weave-Next-Offset', None))
+
     def get_record(self, collection, record_id, **kwargs):
         """Returns the BSO in the collection corresponding to the requested id.
         """
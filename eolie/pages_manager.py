@@ -12,8 +12,6 @@
 
 from gi.repository import Gtk, Gdk
 
-from urllib.parse import urlparse
-
 from eolie.pages_manager_child import PagesManagerChild
 
 
@@ -30,6 +28,8 @@ class PagesManager(Gtk.EventBox):
         Gtk.EventBox.__init__(self)
         self.__window = window
         self.__current_child = None
+        # Children by view
+        self.__children = {}
         self.__group_pages = True
         self.__allow_left_right_in_entry = False
         self.get_style_context().add_class("sidebar")
@@ -76,7 +76,9 @@ class PagesManager(Gtk.EventBox):
             @return child
         """
         child = PagesManagerChild(view, self.__window)
+        child.connect("destroy", self.__on_child_destroy)
         child.show()
+        self.__children[view] = child
         self.__box.add(child)
         return child
 
@@ -84,10 +86,9 @@ class PagesManager(Gtk.EventBox):
         """
             Remove view from pages manager
         """
-        for child in self.__box.get_children():
-            if child.view == view:
-                child.destroy()
-                break
+        child = self.__children.get(view)
+        if child is not None:
+            child.destroy()
 
     def update_visible_child(self, visible=None):
         """
@@ -97,13 +98,13 @@ class PagesManager(Gtk.EventBox):
         """
         if visible is None:
             visible = self.__window.container.current
-        for child in self.__box.get_children():
-            style_context = child.get_style_context()
-            if child.view == visible:
-                style_context.add_class("item-selected")
-                self.__current_child = child
-            else:
-                style_context.remove_class("item-selected")
+        child = self.__children.get(visible)
+        if self.__current_child is not None and self.__current_child != child:
+            self.__current_child.get_style_context().remove_class(
+                                                              "item-selected")
+        if child is not None:
+            child.get_style_context().add_class("item-selected")
+            self.__current_child = child
 
     def search_grab_focus(self):
         """
@@ -145,7 +146,7 @@ class PagesManager(Gtk.EventBox):
             @param switch as bool
         """
         children = self.__box.get_children()
-        if not children:
+        if not children or self.__current_child is None:
             return
         # Search for next child
         count = len(children)
@@ -165,7 +166,7 @@ class PagesManager(Gtk.EventBox):
             @param switch as bool
         """
         children = self.__box.get_children()
-        if not children:
+        if not children or self.__current_child is None:
             return
         # Search for next child
         count = len(children)
@@ -234,21 +235,6 @@ class PagesManager(Gtk.EventBox):
             count += 1
         return count
 
-    def __get_index(self, view):
-        """
-            Get view index
-            @param view as View
-            @return int
-        """
-        # Search current index
-        children = self.__box.get_children()
-        index = 0
-        for child in children:
-            if child.view == view:
-                break
-            index += 1
-        return index
-
     def __sort_func(self, row1, row2):
         """
             Sort listbox
@@ -258,10 +244,10 @@ class PagesManager(Gtk.EventBox):
         # Group pages by net location then atime
         if self.__group_pages and row2.view.webview.uri is not None and\
                 row1.view.webview.uri is not None:
-            parsed2 = urlparse(row2.view.webview.uri)
-            parsed1 = urlparse(row1.view.webview.uri)
-            if parsed2.netloc != parsed1.netloc:
-                return parsed2.netloc < parsed1.netloc
+            netloc2 = row2.view.webview.netloc
+            netloc1 = row1.view.webview.netloc
+            if netloc2 != netloc1:
+                return netloc2 < netloc1
             else:
                 return row2.view.webview.atime > row1.view.webview.atime
         # Always show current first
@@ -289,6 +275,16 @@ class PagesManager(Gtk.EventBox):
             return True
         return False
 
+    def __on_child_destroy(self, child):
+        """
+            Remove child from index
+            @param child as PagesManagerChild
+        """
+        if self.__children.get(child.view) == child:
+            del self.__children[child.view]
+        if self.__current_child == child:
+            self.__current_child = None
+
     def __on_search_changed(self, entry):
         """
             Update filter
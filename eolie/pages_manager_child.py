@@ -75,29 +75,9 @@ class PagesManagerChild(Gtk.FlowBoxChild):
                               ArtSize.PREVIEW_WIDTH_MARGIN)
         self.connect("query-tooltip", self.__on_query_tooltip)
         view.connect("destroying", self.__on_view_destroying)
+        view.connect("webview-changed", self.__on_view_webview_changed)
         self.__connected_signals = []
-        self.__connected_signals.append(
-            self.__view.webview.connect("favicon-changed",
-                                        self.__on_webview_favicon_changed))
-        self.__connected_signals.append(
-            self.__view.webview.connect(
-                                    "notify::is-playing-audio",
-                                    self.__on_webview_notify_is_playing_audio))
-        self.__connected_signals.append(
-            self.__view.webview.connect("uri-changed",
-                                        self.__on_webview_uri_changed))
-        self.__connected_signals.append(
-            self.__view.webview.connect("title-changed",
-                                        self.__on_webview_title_changed))
-        self.__connected_signals.append(
-            self.__view.webview.connect("scroll-event",
-                                        self.__on_webview_scroll_event))
-        self.__connected_signals.append(
-            self.__view.webview.connect("load-changed",
-                                        self.__on_webview_load_changed))
-        self.__connected_signals.append(
-            self.__view.webview.connect("shown",
-                                        self.__on_webview_shown))
+        self.__connect_webview_signals(view.webview)
         self.__set_favicon_artwork()
         if self.__view.webview.uri is not None:
             artwork_path = El().art.get_path(self.__view.webview.uri, "start")
@@ -111,6 +91,11 @@ class PagesManagerChild(Gtk.FlowBoxChild):
         """
         for signal_id in self.__connected_signals:
             self.__view.webview.disconnect(signal_id)
+        self.__connected_signals = []
+        try:
+            self.__view.disconnect_by_func(self.__on_view_webview_changed)
+        except:
+            pass
         Gtk.FlowBoxChild.destroy(self)
 
     @property
@@ -198,6 +183,33 @@ class PagesManagerChild(Gtk.FlowBoxChild):
         elif hasattr(widget, "forall"):
             GLib.idle_add(widget.forall, self.__update_popover_internals)
 
+    def __connect_webview_signals(self, webview):
+        """
+            Connect signals to webview
+            @param webview as WebView
+        """
+        self.__connected_signals.append(
+            webview.connect("favicon-changed",
+                            self.__on_webview_favicon_changed))
+        self.__connected_signals.append(
+            webview.connect("notify::is-playing-audio",
+                            self.__on_webview_notify_is_playing_audio))
+        self.__connected_signals.append(
+            webview.connect("uri-changed",
+                            self.__on_webview_uri_changed))
+        self.__connected_signals.append(
+            webview.connect("title-changed",
+                            self.__on_webview_title_changed))
+        self.__connected_signals.append(
+            webview.connect("scroll-event",
+                            self.__on_webview_scroll_event))
+        self.__connected_signals.append(
+            webview.connect("load-changed",
+                            self.__on_webview_load_changed))
+        self.__connected_signals.append(
+            webview.connect("shown",
+                            self.__on_webview_shown))
+
     def __set_favicon_artwork(self):
         """
             Set favicon artwork
@@ -227,7 +239,9 @@ class PagesManagerChild(Gtk.FlowBoxChild):
         """
             Set webpage preview
         """
-        if self.__view.webview.ephemeral:
+        if self.__view.offloaded:
+            return
+        elif self.__view.webview.ephemeral:
             self.__image.set_from_icon_name(
                                          "user-not-tracked-symbolic",
                                          Gtk.IconSize.DIALOG)
@@ -266,6 +280,20 @@ class PagesManagerChild(Gtk.FlowBoxChild):
                                       GLib.markup_escape_text(uri))
         widget.set_tooltip_markup(text)
 
+    def __on_view_webview_changed(self, view, previous):
+        """
+            Move signals to new webview
+            @param view as View
+            @param previous as WebView
+        """
+        for signal_id in self.__connected_signals:
+            previous.disconnect(signal_id)
+        self.__connected_signals = []
+        self.__indicator_label.mark_shown(previous)
+        if not view.webview.shown:
+            self.__indicator_label.mark_unshown(view.webview)
+        self.__connect_webview_signals(view.webview)
+
     def __on_view_destroying(self, view):
         """
             Destroy self
@@ -16,27 +16,23 @@ from hashlib import sha256
 from urllib.parse import urlparse
 
 from eolie.helper_task import TaskHelper
-from eolie.define import EOLIE_CACHE_PATH, ArtSize, El
+from eolie.define import EOLIE_CACHE_PATH, ArtSize, El, FetchPriority
+from eolie.define import TaskQueue
 
 
 class Image(Gtk.FlowBoxChild):
     """
         An image
     """
-    def __init__(self, uri):
+    def __init__(self, uri, pixbuf):
         """
             Create image
+            @param uri as str
+            @param pixbuf as GdkPixbuf.Pixbuf, already scaled
         """
         Gtk.FlowBoxChild.__init__(self)
         self.__uri = uri
         try:
-            encoded = sha256(uri.encode("utf-8")).hexdigest()
-            filepath = "%s/%s" % (EOLIE_CACHE_PATH, encoded)
-            pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(
-                                                       filepath,
-                                                       ArtSize.START_HEIGHT,
-                                                       ArtSize.START_HEIGHT,
-                                                       True)
             surface = Gdk.cairo_surface_create_from_pixbuf(
                                                        pixbuf,
                                                        self.get_scale_factor(),
@@ -76,8 +72,12 @@ class Image(Gtk.FlowBoxChild):
 class ImagesPopover(Gtk.Popover):
     """
         Show images for page id
+        Data comes from page resources if available, else from network
     """
 
+    # Images loaded at the same time
+    __MAX_LOADING = 6
+
     def __init__(self, uri, page_id, window):
         """
             Init popover
@@ -89,8 +89,14 @@ class ImagesPopover(Gtk.Popover):
         self.set_modal(False)
         window.register(self)
         self.__cache_uris = []
+        self.__pending = []
+        self.__loading = 0
         self.__uri = uri
         self.__page_id = page_id
+        self.__webview = None
+        webview = window.container.current.webview
+        if webview.get_page_id() == page_id:
+            self.__webview = webview
         self.__cancellable = Gio.Cancellable()
         self.__filter = ""
         builder = Gtk.Builder()
@@ -135,6 +141,7 @@ class ImagesPopover(Gtk.Popover):
             Cancel previous download
         """
         self.__cancellable.cancel()
+        self.__cancellable = Gio.Cancellable()
         self.__spinner.start()
         self.__button.set_sensitive(False)
         for child in self.__flowbox.get_children():
@@ -159,15 +166,68 @@ class ImagesPopover(Gtk.Popover):
         if child.uri.find(self.__filter) != -1:
             return True
 
-    def __add_image(self, uri):
+    def __add_image(self, uri, pixbuf):
         """
             Add a child to flowbox
             @param uri as str
+            @param pixbuf as GdkPixbuf.Pixbuf
         """
-        image = Image(uri)
+        image = Image(uri, pixbuf)
         image.show()
         self.__flowbox.add(image)
 
+    def __load_next(self):
+        """
+            Load pending uris, __MAX_LOADING at a time
+        """
+        cancellable = self.__cancellable
+        while self.__pending and self.__loading < self.__MAX_LOADING:
+            uri = self.__pending.pop(0)
+            self.__loading += 1
+            resource = None
+            if self.__webview is not None:
+                resource = self.__webview.get_resource(uri)
+            if resource is not None:
+                resource.get_data(cancellable, self.__on_get_data,
+                                  uri, cancellable)
+            else:
+                El().fetch_helper.load_uri_content(
+                    uri, cancellable,
+                    self.__on_load_uri_content, cancellable,
+                    priority=FetchPriority.INTERACTIVE)
+        if not self.__pending and self.__loading == 0:
+            self.__spinner.stop()
+            self.__button.set_sensitive(True)
+
+    def __decode(self, uri, content):
+        """
+            Save content to cache and get a thumbnail
+            @param uri as str
+            @param content as bytes
+            @return GdkPixbuf.Pixbuf/None
+            @thread safe
+        """
+        try:
+            data = GLib.Bytes.new(content)
+            stream = Gio.MemoryInputStream.new_from_bytes(data)
+            pixbuf = GdkPixbuf.Pixbuf.new_from_stream_at_scale(
+                                                       stream,
+                                                       ArtSize.START_HEIGHT,
+                                                       ArtSize.START_HEIGHT,
+                                                       True,
+                                                       None)
+            stream.close()
+            # Needed by __move_images()
+            encoded = sha256(uri.encode("utf-8")).hexdigest()
+            filepath = "%s/%s" % (EOLIE_CACHE_PATH, encoded)
+            f = Gio.File.new_for_path(filepath)
+            f.replace_contents(content, None, False,
+                               Gio.FileCreateFlags.REPLACE_DESTINATION, None)
+            return pixbuf
+        except Exception as e:
+            print("ImagesPopover::__decode():", e)
+            return None
+
     def __move_images(self):
         """
             Move image to download directory
@@ -212,46 +272,65 @@ class ImagesPopover(Gtk.Popover):
             except Exception as e:
                 print("ImagesPopover::__clean_cache():", e)
 
-    def __on_write_all_async(self, stream, result, uri):
+    def __on_content(self, uri, content, cancellable):
+        """
+            Decode content in background
+            @param uri as str
+            @param content as bytes/None
+            @param cancellable as Gio.Cancellable
+        """
+        if cancellable.is_cancelled():
+            return
+        if content:
+            self.__task_helper.run(self.__decode, uri, content,
+                                   callback=(self.__on_decoded,
+                                             uri, cancellable),
+                                   queue=TaskQueue.INTERACTIVE)
+        else:
+            self.__loading -= 1
+            self.__load_next()
+
+    def __on_decoded(self, pixbuf, uri, cancellable):
+        """
+            Add image and load next one
+            @param pixbuf as GdkPixbuf.Pixbuf/None
+            @param uri as str
+            @param cancellable as Gio.Cancellable
+        """
+        if cancellable.is_cancelled():
+            return
+        if pixbuf is not None:
+            self.__add_image(uri, pixbuf)
+            self.__cache_uris.append(uri)
+        self.__loading -= 1
+        self.__load_next()
+
+    def __on_get_data(self, resource, result, uri, cancellable):
         """
-            Add image
-            @param stream as Gio.OutputStream
+            Get resource data
+            @param resource as WebKit2.WebResource
             @param result as Gio.AsyncResult
             @param uri as str
+            @param cancellable as Gio.Cancellable
         """
         try:
-            stream.write_all_finish(result)
-            self.__add_image(uri)
-            self.__cache_uris.append(uri)
+            content = resource.get_data_finish(result)
         except Exception as e:
-            print("ImagesPopover::__on_write_all_async()", e)
+            if cancellable.is_cancelled():
+                return
+            print("ImagesPopover::__on_get_data():", e)
+            content = None
+        self.__on_content(uri, content, cancellable)
 
-    def __on_load_uri_content(self, uri, status, content, uris):
+    def __on_load_uri_content(self, uri, status, content, cancellable):
         """
-            Load pending uris
-            @param uri as str
+            Get network data
+            @param uri as str/None
             @param status as bool
             @param content as bytes
-            @param uris as [str]
+            @param cancellable as Gio.Cancellable
         """
-        if status:
-            encoded = sha256(uri.encode("utf-8")).hexdigest()
-            filepath = "%s/%s" % (EOLIE_CACHE_PATH, encoded)
-            f = Gio.File.new_for_path(filepath)
-            stream = f.append_to(Gio.FileCreateFlags.REPLACE_DESTINATION,
-                                 self.__cancellable)
-            stream.write_all_async(content, GLib.PRIORITY_DEFAULT,
-                                   self.__cancellable,
-                                   self.__on_write_all_async, uri)
-        if uris and not self.__cancellable.is_cancelled():
-            uri = uris.pop(0)
-            self.__task_helper.load_uri_content(uri,
-                                                self.__cancellable,
-                                                self.__on_load_uri_content,
-                                                uris)
-        else:
-            self.__spinner.stop()
-            self.__button.set_sensitive(True)
+        self.__on_content(uri, content if status else None, cancellable)
 
     def __on_get_images(self, source, result):
         """
@@ -264,8 +343,10 @@ class ImagesPopover(Gtk.Popover):
             uris = source.call_finish(result)[0]
         except Exception as e:
             print("ImagesPopover::__on_get_images()", e)
-        self.__cancellable.reset()
-        self.__on_load_uri_content(None, False, b"", uris)
+        # Remove duplicates, keep page order
+        self.__pending = list(dict.fromkeys(uris))
+        self.__loading = 0
+        self.__load_next()
 
     def __on_closed(self, popover):
         """
@@ -14,10 +14,12 @@ from gi.repository import Gio, GLib
 
 from gettext import gettext as _
 from urllib.parse import urlparse
+from collections import OrderedDict
+from time import time
 import json
 
 from eolie.helper_task import TaskHelper
-from eolie.define import El, EOLIE_DATA_PATH
+from eolie.define import El, EOLIE_DATA_PATH, FetchPriority
 
 
 class Search:
@@ -25,6 +27,11 @@ class Search:
         Eolie search engines
     """
 
+    # Cached suggestions per engine
+    __SUGGESTIONS_SIZE = 200
+    # Cached suggestions lifetime (seconds)
+    __SUGGESTIONS_TTL = 900
+
     def __init__(self):
         """
             Init search
@@ -77,6 +84,8 @@ class Search:
         self.__search = ""
         self.__suggest = ""
         self.__encoding = ""
+        # Suggestions by engine, LRU ordered
+        self.__suggestions = {}
         self.update_default_engine()
 
     def save_engines(self, engines):
@@ -127,19 +136,46 @@ class Search:
     def search_suggestions(self, value, cancellable, callback):
         """
             Search suggestions for value
+            Cached values are returned immediately, a new search cancels
+            previous pending search
             @param value as str
             @param cancellable as Gio.Cancellable
-            @param callback as str
+            @param callback as function
+            @callback (value as str, suggestions as [str])
         """
         try:
-            if not value.strip(" "):
+            prefix = " ".join(value.lower().split())
+            if not prefix:
                 return
+            El().fetch_helper.cancel_group("suggestions")
+            cache = self.__suggestions.get(self.__suggest, None)
+            if cache is None:
+                cache = OrderedDict()
+                self.__suggestions[self.__suggest] = cache
+            if prefix in cache.keys():
+                (mtime, suggestions) = cache[prefix]
+                if time() - mtime < self.__SUGGESTIONS_TTL:
+                    cache.move_to_end(prefix)
+                    callback(value, suggestions)
+                    return
+                del cache[prefix]
             uri = self.__suggest % GLib.uri_escape_string(value,
                                                           None,
                                                           True)
+            # Caller resets its cancellable, request needs its own
+            request_cancellable = Gio.Cancellable.new()
+            handler_id = None
+            if cancellable is not None:
+                handler_id = cancellable.connect(
+                    "cancelled", lambda x: request_cancellable.cancel())
             task_helper = TaskHelper()
-            task_helper.load_uri_content(uri, cancellable,
-                                         callback, self.__encoding, value)
+            task_helper.load_uri_content(uri, request_cancellable,
+                                         self.__on_suggestions_loaded,
+                                         cache, prefix, self.__encoding,
+                                         value, callback,
+                                         cancellable, handler_id,
+                                         priority=FetchPriority.INTERACTIVE,
+                                         group="suggestions")
         except Exception as e:
             print("Search::search_suggestions():", e)
 
@@ -208,6 +244,41 @@ class Search:
                                      self.__on_engine_loaded,
                                      window)
 
+    def __on_suggestions_loaded(self, uri, status, content, cache, prefix,
+                                encoding, value, callback,
+                                cancellable, handler_id):
+        """
+            Parse suggestions, cache them and pass them to callback
+            @param uri as str
+            @param status as bool
+            @param content as bytes
+            @param cache as OrderedDict
+            @param prefix as str
+            @param encoding as str
+            @param value as str
+            @param callback as function
+            @param cancellable as Gio.Cancellable/None
+            @param handler_id as int/None
+        """
+        if handler_id is not None:
+            cancellable.disconnect(handler_id)
+        if not status:
+            return
+        suggestions = []
+        try:
+            # format: ["words", ["result1", "result2"], ...]
+            result = json.loads(content.decode(encoding))
+            if len(result) > 1 and isinstance(result[1], list):
+                suggestions = [suggestion for suggestion in result[1]
+                               if isinstance(suggestion, str)]
+        except Exception as e:
+            print("Search::__on_suggestions_loaded():", e)
+            return
+        cache[prefix] = (time(), suggestions)
+        if len(cache) > self.__SUGGESTIONS_SIZE:
+            cache.popitem(last=False)
+        callback(value, suggestions)
+
     def __on_engine_loaded(self, uri, status, content, window):
         """
             Ask user to add engine
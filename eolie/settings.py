@@ -258,6 +258,8 @@ class SettingsDialog:
         El().settings.set_enum("cookie-storage", int(combo.get_active_id()))
         for window in El().windows:
             for view in window.container.views:
+                if view.offloaded:
+                    continue
                 context = view.webview.get_context()
                 cookie_manager = context.get_cookie_manager()
                 cookie_manager.set_accept_policy(
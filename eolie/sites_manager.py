@@ -12,8 +12,6 @@
 
 from gi.repository import Gtk, Gdk, GLib, WebKit2
 
-from urllib.parse import urlparse
-
 from eolie.sites_manager_child import SitesManagerChild
 from eolie.define import El, LoadingType
 
@@ -30,6 +28,11 @@ class SitesManager(Gtk.EventBox):
         """
         Gtk.EventBox.__init__(self)
         self.__window = window
+        # Children by netloc, ephemeral child is not grouped by netloc
+        self.__sites = {}
+        self.__ephemeral_site = None
+        # Children by view
+        self.__view_sites = {}
         self.set_property("width-request", 50)
         self.connect("button-press-event", self.__on_button_press)
         self.get_style_context().add_class("sidebar")
@@ -68,12 +71,14 @@ class SitesManager(Gtk.EventBox):
             self.__loaded_uri(view.webview, view.webview.uri)
         view.webview.connect("load-changed", self.__on_webview_load_changed)
         view.connect("destroying", self.__on_view_destroying)
+        view.connect("webview-changed", self.__on_view_webview_changed)
 
     def remove_view(self, view):
         """
             Remove view from pages manager
         """
         view.disconnect_by_func(self.__on_view_destroying)
+        view.disconnect_by_func(self.__on_view_webview_changed)
         self.__on_view_destroying(view)
 
     def set_favicon(self, view, surface):
@@ -82,9 +87,9 @@ class SitesManager(Gtk.EventBox):
             @param webview as WebView
             @param surface as cairo.Surface
         """
-        for child in self.__box.get_children():
-            if view in child.views:
-                child.set_favicon(surface)
+        child = self.__view_sites.get(view)
+        if child is not None:
+            child.set_favicon(surface)
 
     def set_minimal(self, minimal):
         """
@@ -99,10 +104,9 @@ class SitesManager(Gtk.EventBox):
             Update label for view
             @param view as View
         """
-        for child in self.__box.get_children():
-            if view in child.views:
-                child.update_label()
-                break
+        child = self.__view_sites.get(view)
+        if child is not None:
+            child.update_label()
 
     def next(self):
         """
@@ -182,25 +186,32 @@ class SitesManager(Gtk.EventBox):
             @param webview as WebView
             @param uri as str
         """
-        netloc = self.__get_netloc(uri)
-        child = None
+        view = webview.view
+        netloc = webview.netloc
         empty_child = None
         # Do not group by netloc
         if webview.ephemeral:
-            for site in self.__box.get_children():
-                if site.ephemeral:
-                    child = site
-                    break
+            child = self.__ephemeral_site
         else:
-            # Search for a child for wanted netloc
-            # Clean up any child matching view, allowing us to reuse it
-            for site in self.__box.get_children():
-                if site.netloc == netloc and site.ephemeral is False:
-                    child = site
-                else:
-                    site.remove_view(webview.view)
-                    if site.empty:
-                        empty_child = site
+            child = self.__sites.get(netloc)
+        # Remove view from its previous child, allowing us to reuse it
+        previous = self.__view_sites.get(view)
+        if previous is not None and previous != child:
+            previous.remove_view(view)
+            del self.__view_sites[view]
+            if previous.empty:
+                empty_child = previous
+        # Last child is kept when empty
+        if empty_child is None and not self.__view_sites:
+            row = self.__box.get_row_at_index(0)
+            if row is not None and row.empty and row != child:
+                empty_child = row
+        # Do not reuse a child from another kind
+        if empty_child is not None and\
+                empty_child.ephemeral != webview.ephemeral:
+            self.__unregister_child(empty_child)
+            empty_child.destroy()
+            empty_child = None
 
         if child is None:
             if empty_child is None:
@@ -212,44 +223,56 @@ class SitesManager(Gtk.EventBox):
                                                 "sidebar-position").get_int32()
                 child.set_minimal(position < 80)
                 child.show()
-                child.add_view(webview.view)
+                child.add_view(view)
+                self.__register_child(child)
                 self.__box.add(child)
                 self.update_visible_child()
             else:
                 child = empty_child
+                self.__unregister_child(child)
                 child.reset(netloc)
-                child.add_view(webview.view)
+                self.__register_child(child)
+                child.add_view(view)
         else:
             if empty_child is not None:
+                self.__unregister_child(empty_child)
                 empty_child.destroy()
-            child.add_view(webview.view)
+            child.add_view(view)
             self.update_visible_child()
+        self.__view_sites[view] = child
 
-    def __get_netloc(self, uri):
+    def __register_child(self, child):
         """
-            Calculate netloc
-            @param uri as str
+            Add child to indexes
+            @param child as SitesManagerChild
+        """
+        if child.ephemeral:
+            self.__ephemeral_site = child
+        else:
+            self.__sites[child.netloc] = child
+
+    def __unregister_child(self, child):
+        """
+            Remove child from indexes
+            @param child as SitesManagerChild
         """
-        parsed = urlparse(uri)
-        netloc = parsed.netloc
-        if not netloc:
-            netloc = "%s://" % urlparse(uri).scheme
-        return netloc
+        if child.ephemeral:
+            if self.__ephemeral_site == child:
+                self.__ephemeral_site = None
+        elif self.__sites.get(child.netloc) == child:
+            del self.__sites[child.netloc]
 
-    def __get_index(self, netloc):
+    def __get_child(self, netloc):
         """
-            Get child index
+            Get child for netloc
             @param netloc as str
-            @return int
+            @return SitesManagerChild/None
         """
-        # Search current index
-        children = self.__box.get_children()
-        index = 0
-        for child in children:
-            if child.netloc == netloc:
-                break
-            index += 1
-        return index
+        child = self.__sites.get(netloc)
+        if child is None and self.__ephemeral_site is not None and\
+                self.__ephemeral_site.netloc == netloc:
+            child = self.__ephemeral_site
+        return child
 
     def __scroll_to_child(self, child):
         """
@@ -275,11 +298,25 @@ class SitesManager(Gtk.EventBox):
             @param view as View
         """
         view.webview.disconnect_by_func(self.__on_webview_load_changed)
-        count = len(self.__box.get_children())
-        for site in self.__box.get_children():
-            site.remove_view(view)
-            if site.empty and count > 1:
-                site.destroy()
+        site = self.__view_sites.pop(view, None)
+        if site is None:
+            return
+        site.remove_view(view)
+        count = len(self.__sites)
+        if self.__ephemeral_site is not None:
+            count += 1
+        if site.empty and count > 1:
+            self.__unregister_child(site)
+            site.destroy()
+
+    def __on_view_webview_changed(self, view, previous):
+        """
+            Move signals to new webview
+            @param view as View
+            @param previous as WebView
+        """
+        previous.disconnect_by_func(self.__on_webview_load_changed)
+        view.webview.connect("load-changed", self.__on_webview_load_changed)
 
     def __on_webview_load_changed(self, webview, event):
         """
@@ -328,12 +365,11 @@ class SitesManager(Gtk.EventBox):
             @param netloc as str
             @param up as bool
         """
-        index = self.__get_index(netloc)
-        row = self.__box.get_row_at_index(index)
+        row = self.__get_child(netloc)
         if row is None:
             return
         self.__box.remove(row)
-        child_index = self.__get_index(child.netloc)
+        child_index = child.get_index()
         if not up:
             child_index += 1
         self.__box.insert(row, child_index)
@@ -58,6 +58,7 @@ class PageChildRow(Gtk.ListBoxRow):
         self.connect("query-tooltip", self.__on_query_tooltip)
         view.webview.connect("load-changed", self.__on_webview_load_changed)
         view.webview.connect("title-changed", self.__on_webview_title_changed)
+        view.connect("webview-changed", self.__on_view_webview_changed)
         eventbox.connect("button-press-event", self.__on_button_press_event)
 
     @property
@@ -108,6 +109,18 @@ class PageChildRow(Gtk.ListBoxRow):
         """
         self.__view.webview.disconnect_by_func(self.__on_webview_load_changed)
         self.__view.webview.disconnect_by_func(self.__on_webview_title_changed)
+        self.__view.disconnect_by_func(self.__on_view_webview_changed)
+
+    def __on_view_webview_changed(self, view, previous):
+        """
+            Move signals to new webview
+            @param view as View
+            @param previous as WebView
+        """
+        previous.disconnect_by_func(self.__on_webview_load_changed)
+        previous.disconnect_by_func(self.__on_webview_title_changed)
+        view.webview.connect("load-changed", self.__on_webview_load_changed)
+        view.webview.connect("title-changed", self.__on_webview_title_changed)
 
     def __on_webview_load_changed(self, webview, event):
         """
@@ -194,6 +207,7 @@ class SitesManagerChild(Gtk.ListBoxRow):
             view.webview.connect("shown", self.__on_webview_shown)
             view.webview.connect("favicon-changed",
                                  self.__on_webview_favicon_changed)
+            view.connect("webview-changed", self.__on_view_webview_changed)
             self.update_label()
             self.__indicator_label.update_count(True)
             if not view.webview.shown:
@@ -212,6 +226,7 @@ class SitesManagerChild(Gtk.ListBoxRow):
             self.__views.remove(view)
             view.webview.disconnect_by_func(self.__on_webview_shown)
             view.webview.disconnect_by_func(self.__on_webview_favicon_changed)
+            view.disconnect_by_func(self.__on_view_webview_changed)
             self.update_label()
             self.__indicator_label.update_count(False)
             if not view.webview.shown:
@@ -519,6 +534,21 @@ class SitesManagerChild(Gtk.ListBoxRow):
         self.get_style_context().remove_class("drag-up")
         self.get_style_context().remove_class("drag-down")
 
+    def __on_view_webview_changed(self, view, previous):
+        """
+            Move signals to new webview
+            @param view as View
+            @param previous as WebView
+        """
+        previous.disconnect_by_func(self.__on_webview_shown)
+        previous.disconnect_by_func(self.__on_webview_favicon_changed)
+        self.__indicator_label.mark_shown(previous)
+        if not view.webview.shown:
+            self.__indicator_label.mark_unshown(view.webview)
+        view.webview.connect("shown", self.__on_webview_shown)
+        view.webview.connect("favicon-changed",
+                             self.__on_webview_favicon_changed)
+
     def __on_webview_shown(self, webview):
         """
             Update indicataor
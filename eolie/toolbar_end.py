@@ -494,6 +494,7 @@ class ToolbarEnd(Gtk.Bin):
             database.add_exception(parsed.netloc)
         elif param.get_string() == "page":
             database.add_exception(parsed.netloc + parsed.path)
+        El().update_policy_snapshot()
         self.__window.container.current.webview.reload()
 
     def __on_adblock_change_state(self, action, param):
@@ -16,7 +16,7 @@ from gettext import gettext as _
 from urllib.parse import urlparse
 
 from eolie.helper_task import TaskHelper
-from eolie.define import El, Indicator, Type
+from eolie.define import El, Indicator, Type, TaskQueue
 from eolie.popover_uri import UriPopover
 
 
@@ -769,20 +769,14 @@ class ToolbarTitle(Gtk.Bin):
                                         Gtk.EntryIconPosition.PRIMARY,
                                         "system-search-symbolic")
 
-    def __search_suggestion(self, uri, status, content, encoding, value):
+    def __search_suggestion(self, value, suggestions):
         """
             Add suggestions
-            @param uri as str
-            @param status as bool
-            @param content as bytes
-            @param encoding as str
             @param value as str
+            @param suggestions as [str]
         """
-        if status and value == self.__entry.get_text():
-            string = content.decode(encoding)
-            # format: '["{"words"}",["result1","result2"]]'
-            sgs = string.replace('[', '').replace(']', '').split(',')[1:]
-            self.__popover.add_suggestions(sgs)
+        if value == self.__entry.get_text():
+            self.__popover.add_suggestions(suggestions)
 
     def __populate_completion(self, uri):
         """
@@ -792,37 +786,35 @@ class ToolbarTitle(Gtk.Bin):
         if self.__entry.get_text() == uri:
             self.__completion_model.clear()
             # Look for a match in history
-            match = El().history.get_match(uri)
-            if match is not None:
-                if self.__cancellable.is_cancelled():
-                    return
-                match_parsed = urlparse(match)
-                netloc = match_parsed.netloc.replace("www.", "")
-                if netloc.find(uri) == 0:
-                    if match_parsed.path.find(uri.split("/")[-1]) != -1:
-                        self.__completion_model.append([netloc +
-                                                        match_parsed.path])
-                    else:
-                        self.__completion_model.append([netloc])
-
-            if not El().settings.get_value("dns-prediction"):
-                return
-            # Try some DNS request, FIXME Better list?
-            from socket import gethostbyname
-            parsed = urlparse(uri)
-            if parsed.netloc:
-                uri = parsed.netloc
-            for suffix in self.__dns_suffixes:
-                for prefix in ["www.", ""]:
-                    try:
-                        lookup = "%s%s.%s" % (prefix, uri, suffix)
-                        gethostbyname(lookup)
-                        self.__completion_model.append(
-                                          [lookup.replace("www.", "")])
-                        return
-                    except:
-                        if self.__cancellable.is_cancelled():
-                            return
+            completion = El().history.get_completion(uri)
+            if completion is not None:
+                self.__completion_model.append([completion])
+
+            if El().settings.get_value("dns-prediction"):
+                GLib.idle_add(self.__predict_host, uri)
+
+    def __predict_host(self, uri):
+        """
+            Search a host for uri and add it to completion
+            @param uri as str
+        """
+        if self.__entry.get_text() != uri:
+            return
+        name = uri
+        parsed = urlparse(uri)
+        if parsed.netloc:
+            name = parsed.netloc
+        El().dns_helper.predict(name, self.__dns_suffixes,
+                                self.__on_host_predicted, uri)
+
+    def __on_host_predicted(self, host, uri):
+        """
+            Add host to completion
+            @param host as str/None
+            @param uri as str
+        """
+        if host is not None and self.__entry.get_text() == uri:
+            self.__completion_model.append([host.replace("www.", "")])
 
     def __search_in_current_views(self, value):
         """
@@ -847,6 +839,7 @@ class ToolbarTitle(Gtk.Bin):
         """
         self.__cancellable.cancel()
         self.__cancellable.reset()
+        El().dns_helper.cancel()
         webview = self.__window.container.current.webview
         if popover == self.__popover:
             webview.grab_focus()
@@ -906,7 +899,9 @@ class ToolbarTitle(Gtk.Bin):
         self.__window.container.current.webview.add_text_entry(value)
 
         # Populate completion model
-        task_helper.run(self.__populate_completion, value)
+        task_helper.run(self.__populate_completion, value,
+                        queue=TaskQueue.INTERACTIVE,
+                        token="completion%s" % self.__window)
 
         self.__cancellable.cancel()
         self.__cancellable.reset()
@@ -924,7 +919,9 @@ class ToolbarTitle(Gtk.Bin):
             El().search.search_suggestions(value,
                                            self.__cancellable,
                                            self.__search_suggestion)
-        task_helper.run(self.__search_in_current_views, value)
+        task_helper.run(self.__search_in_current_views, value,
+                        queue=TaskQueue.INTERACTIVE,
+                        token="views%s" % self.__window)
         self.__entry.set_icon_from_icon_name(Gtk.EntryIconPosition.PRIMARY,
                                              "system-search-symbolic")
         self.__entry.set_icon_tooltip_text(Gtk.EntryIconPosition.PRIMARY,
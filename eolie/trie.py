@@ -0,0 +1,102 @@
+# Copyright (c) 2017 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+class Trie:
+    """
+        Prefix tree, each node keeps best scored value of its subtree
+        A key keeps its best score, remove it to lower its score
+    """
+
+    def __init__(self):
+        """
+            Init tree
+        """
+        # A node is [children as {}, best (score, value) or None,
+        #            key (score, value) or None]
+        self.__root = [{}, None, None]
+
+    def add(self, key, score, value):
+        """
+            Add value for key
+            @param key as str
+            @param score as comparable
+            @param value as object
+        """
+        node = self.__root
+        for char in key:
+            children = node[0]
+            if char not in children.keys():
+                children[char] = [{}, None, None]
+            node = children[char]
+        if node[2] is not None and score <= node[2][0]:
+            return
+        node[2] = (score, value)
+        # Scores only grow here, update best values from root
+        node = self.__root
+        self.__set_best(node, score, value)
+        for char in key:
+            node = node[0][char]
+            self.__set_best(node, score, value)
+
+    def remove(self, key):
+        """
+            Remove key, its value is not best value anymore
+            @param key as str
+        """
+        nodes = [self.__root]
+        for char in key:
+            node = nodes[-1][0].get(char, None)
+            if node is None:
+                return
+            nodes.append(node)
+        if nodes[-1][2] is None:
+            return
+        nodes[-1][2] = None
+        # Compute best values again from leaf, drop empty nodes
+        for i in reversed(range(len(nodes))):
+            node = nodes[i]
+            best = node[2]
+            for child in node[0].values():
+                if best is None or best[0] < child[1][0]:
+                    best = child[1]
+            node[1] = best
+            if best is None and i > 0:
+                del nodes[i - 1][0][key[i - 1]]
+
+    def get(self, prefix):
+        """
+            Get best value for keys starting with prefix
+            @param prefix as str
+            @return object/None
+        """
+        node = self.__root
+        for char in prefix:
+            node = node[0].get(char, None)
+            if node is None:
+                return None
+        if node[1] is None:
+            return None
+        return node[1][1]
+
+#######################
+# PRIVATE             #
+#######################
+    def __set_best(self, node, score, value):
+        """
+            Set value as node best value if better
+            @param node as []
+            @param score as comparable
+            @param value as object
+        """
+        if node[1] is None or node[1][1] == value or node[1][0] < score:
+            node[1] = (score, value)
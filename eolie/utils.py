@@ -17,6 +17,7 @@ import string
 import cairo
 from random import choice
 from base64 import b64encode
+from urllib.parse import urlparse
 
 from eolie.define import El, ArtSize, LoadingType
 
@@ -48,6 +49,20 @@ def remove_www(netloc):
         return ""
 
 
+def get_netloc(uri):
+    """
+        Get netloc for uri, scheme:// if uri does not have a netloc
+        @param uri as str
+        @return str
+    """
+    if uri is None:
+        return ""
+    parsed = urlparse(uri)
+    if parsed.netloc:
+        return parsed.netloc
+    return "%s://" % parsed.scheme
+
+
 def wanted_loading_type(index):
     """
         Return window type based on current index
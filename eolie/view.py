@@ -14,6 +14,7 @@ from gi.repository import GObject, Gtk, Gdk, GLib, Gio, WebKit2
 
 from eolie.widget_find import FindWidget
 from eolie.webview import WebView
+from eolie.webview_placeholder import WebViewPlaceholder
 from eolie.widget_uri_label import UriLabelWidget
 from eolie.define import El
 
@@ -24,7 +25,10 @@ class View(Gtk.Overlay):
     """
 
     __gsignals__ = {
-        'destroying': (GObject.SignalFlags.RUN_FIRST, None, ())
+        'destroying': (GObject.SignalFlags.RUN_FIRST, None, ()),
+        # Previous webview as argument
+        'webview-changed': (GObject.SignalFlags.RUN_FIRST, None,
+                            (GObject.TYPE_PYOBJECT,))
     }
 
     def get_new_webview(ephemeral, window):
@@ -52,13 +56,9 @@ class View(Gtk.Overlay):
         self.__webview = webview
         self.__subsurface = subsurface
         webview.set_view(self)
-        self.__webview.show()
-        self.__find_widget = FindWidget(self.__webview)
-        self.__find_widget.show()
+        self.__find_widget = None
         self.__grid = Gtk.Grid()
         self.__grid.set_orientation(Gtk.Orientation.VERTICAL)
-        self.__grid.add(self.__find_widget)
-        self.__grid.add(self.__webview)
         self.__grid.show()
         self.add(self.__grid)
         self.__uri_label = UriLabelWidget()
@@ -75,9 +75,10 @@ class View(Gtk.Overlay):
             self.set_overlay_pass_through(image, True)
         # Connect signals
         self.connect("key-press-event", self.__on_key_press_event)
-        webview.connect("mouse-target-changed", self.__on_mouse_target_changed)
-        webview.connect("readable", self.__on_readable)
-        webview.connect("close", self.__on_close)
+        if self.offloaded:
+            self.connect("map", self.__on_map)
+        else:
+            self.__setup_webview()
 
     def switch_read_mode(self):
         """
@@ -116,6 +117,55 @@ class View(Gtk.Overlay):
             self.__reading_view.destroy()
             self.__reading_view = None
 
+    def load_webview(self):
+        """
+            Replace placeholder by a real webview
+        """
+        if not self.offloaded:
+            return
+        placeholder = self.__webview
+        webview = View.get_new_webview(placeholder.ephemeral, self.__window)
+        webview.set_view(self)
+        webview.set_atime(placeholder.atime)
+        webview.set_gtime(placeholder.gtime)
+        webview.set_session_id(placeholder.session_id)
+        state = placeholder.get_session_state()
+        if state is not None:
+            webview.restore_session_state(state)
+        if placeholder.get_title() is not None:
+            webview.set_title(placeholder.get_title())
+        if placeholder.uri is not None:
+            webview.set_uri(placeholder.uri)
+        self.disconnect_by_func(self.__on_map)
+        self.__webview = webview
+        # Let listeners move to new webview before it gets mapped
+        self.emit("webview-changed", placeholder)
+        self.__setup_webview()
+
+    def offload(self):
+        """
+            Replace webview by a placeholder, web process will be released
+        """
+        if self.offloaded or self.__subsurface:
+            return
+        webview = self.__webview
+        placeholder = WebViewPlaceholder(webview.ephemeral, self.__window)
+        placeholder.set_view(self)
+        placeholder.set_atime(webview.atime)
+        placeholder.set_gtime(webview.gtime)
+        placeholder.set_session_id(webview.session_id)
+        placeholder.restore_session_state(webview.get_session_state())
+        placeholder.set_uri(webview.uri)
+        placeholder.set_title(webview.title)
+        self.__webview = placeholder
+        self.emit("webview-changed", webview)
+        self.__grid.remove(self.__find_widget)
+        self.__find_widget.destroy()
+        self.__find_widget = None
+        self.__grid.remove(webview)
+        webview.destroy()
+        self.connect("map", self.__on_map)
+
     def free_webview(self):
         """
             Free the webview associated with view
@@ -147,6 +197,14 @@ class View(Gtk.Overlay):
         """
         return self.__destroying
 
+    @property
+    def offloaded(self):
+        """
+            True if view does not have a real webview
+            @return bool
+        """
+        return isinstance(self.__webview, WebViewPlaceholder)
+
     @property
     def subsurface(self):
         """
@@ -187,11 +245,32 @@ class View(Gtk.Overlay):
             Destroy view and webview
         """
         Gtk.Overlay.destroy(self)
-        if self.__webview is not None:
+        if self.__webview is not None and not self.offloaded:
             self.__webview.destroy()
         if self.__reading_view is not None:
             self.__reading_view.destroy()
 
+    def __setup_webview(self):
+        """
+            Add webview and find widget to view
+        """
+        self.__webview.show()
+        self.__find_widget = FindWidget(self.__webview)
+        self.__find_widget.show()
+        self.__grid.add(self.__find_widget)
+        self.__grid.add(self.__webview)
+        self.__webview.connect("mouse-target-changed",
+                               self.__on_mouse_target_changed)
+        self.__webview.connect("readable", self.__on_readable)
+        self.__webview.connect("close", self.__on_close)
+
+    def __on_map(self, widget):
+        """
+            Load real webview
+            @param widget as Gtk.Widget
+        """
+        self.load_webview()
+
     def __on_decide_policy(self, webview, decision, decision_type):
         """
             Forward decision to main view
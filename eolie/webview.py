@@ -12,11 +12,12 @@
 
 from gi.repository import WebKit2, Gtk, Gio, Gdk, GLib
 
+import json
 from urllib.parse import urlparse
-from time import time
+from time import time, perf_counter
 
 from eolie.define import El, Indicator, LoadingType
-from eolie.utils import debug
+from eolie.utils import debug, get_random_string, get_netloc
 from eolie.webview_errors import WebViewErrors
 from eolie.webview_navigation import WebViewNavigation
 from eolie.webview_signals import WebViewSignals
@@ -275,6 +276,13 @@ class WebView(WebKit2.WebView):
         """
         self.__gtime = gtime
 
+    def set_session_id(self, session_id):
+        """
+            Set session id, used when restoring a page
+            @param session_id as str
+        """
+        self.__session_id = session_id
+
     def set_view(self, view):
         """
             Set webview view
@@ -321,6 +329,14 @@ class WebView(WebKit2.WebView):
         """
         return self.__gtime
 
+    @property
+    def session_id(self):
+        """
+            Get session id
+            @return str
+        """
+        return self.__session_id
+
     @property
     def view(self):
         """
@@ -368,6 +384,17 @@ class WebView(WebKit2.WebView):
             uri = self._uri
         return uri
 
+    @property
+    def netloc(self):
+        """
+            Get netloc, parsed only when uri changes
+            @return str
+        """
+        uri = self.uri
+        if uri != self.__netloc[0]:
+            self.__netloc = (uri, get_netloc(uri))
+        return self.__netloc[1]
+
     @property
     def ephemeral(self):
         """
@@ -414,6 +441,8 @@ class WebView(WebKit2.WebView):
         self.__content_manager = content_manager
         self.__atime = 0
         self.__gtime = int(time())
+        self.__session_id = get_random_string(12)
+        self.__netloc = (None, "")
         self._new_pages_opened = 0
         # WebKitGTK doesn't provide an API to get selection, so try to guess
         # it from clipboard FIXME Get it from extensions
@@ -475,6 +504,7 @@ class WebView(WebKit2.WebView):
         settings.set_property("media-playback-allows-inline", True)
         self.connect("create", self.__on_create)
         self.connect("load-changed", self._on_load_changed)
+        self.connect("destroy", self.__on_destroy)
 
     def __set_system_fonts(self, settings, system=None):
         """
@@ -553,6 +583,13 @@ class WebView(WebKit2.WebView):
         else:
             self._window.container.popup_webview(webview, True)
 
+    def __on_destroy(self, webview):
+        """
+            Forget hooks stats
+            @param webview as WebView
+        """
+        El().hook_stats.remove(self.get_page_id())
+
     def __on_popup_close(self, webview, related):
         """
             Remove webview from popups
@@ -579,6 +616,33 @@ class WebViewMeta(WebViewNavigation, WebView, WebViewErrors,
             @param webview as WebView
             @param event as WebKit2.LoadEvent
         """
+        page_id = self.get_page_id()
+        started = perf_counter()
         WebViewNavigation._on_load_changed(self, webview, event)
+        El().hook_stats.add(page_id, "load %s" % event.value_nick,
+                            perf_counter() - started)
         WebViewSignals._on_load_changed(self, webview, event)
         WebViewArtwork._on_load_changed(self, webview, event)
+        if event in [WebKit2.LoadEvent.COMMITTED,
+                     WebKit2.LoadEvent.FINISHED]:
+            El().session.add_page(self)
+        # Web process hooks stats, only kept for debug dump
+        if event == WebKit2.LoadEvent.FINISHED and El().debug:
+            El().helper.call("GetStats", page_id, None,
+                             self.__on_get_stats, page_id)
+
+#######################
+# PRIVATE             #
+#######################
+    def __on_get_stats(self, source, result, page_id):
+        """
+            Keep web process stats
+            @param source as GObject.Object
+            @param result as Gio.AsyncResult
+            @param page_id as int
+        """
+        try:
+            stats = json.loads(source.call_finish(result)[0])
+            El().hook_stats.merge(page_id, stats)
+        except Exception as e:
+            print("WebViewMeta::__on_get_stats():", e)
@@ -0,0 +1,292 @@
+# Copyright (c) 2017 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from gi.repository import GObject, GLib, WebKit2
+
+from time import time
+
+from eolie.define import El
+from eolie.utils import get_random_string, get_netloc
+
+
+class WebViewPlaceholder(GObject.Object):
+    """
+        Lightweight page used for offloaded pages: no WebKit view, no web
+        process. Provides the WebView API used by pages/sites managers.
+        View replaces it with a real WebView when shown.
+    """
+
+    __gsignals__ = {
+        "load-changed": (GObject.SignalFlags.RUN_FIRST, None,
+                         (GObject.TYPE_PYOBJECT,)),
+        "scroll-event": (GObject.SignalFlags.RUN_LAST, bool,
+                         (GObject.TYPE_PYOBJECT,)),
+        "shown": (GObject.SignalFlags.RUN_FIRST, None, ()),
+        "title-changed": (GObject.SignalFlags.RUN_FIRST, None, (str,)),
+        "uri-changed": (GObject.SignalFlags.RUN_FIRST, None, (str,)),
+        "favicon-changed": (GObject.SignalFlags.RUN_FIRST, None,
+                            (GObject.TYPE_PYOBJECT, str)),
+    }
+
+    __gproperties__ = {
+        "is-playing-audio": (bool, "Playing audio", "Always False",
+                             False, GObject.ParamFlags.READABLE),
+    }
+
+    def __init__(self, ephemeral, window):
+        """
+            Init placeholder
+            @param ephemeral as bool
+            @param window as Window
+        """
+        GObject.Object.__init__(self)
+        self.__ephemeral = ephemeral
+        self.__window = window
+        self.__view = None
+        self.__uri = None
+        self.__netloc = ""
+        self.__title = None
+        self.__state = None
+        self.__atime = 0
+        self.__gtime = int(time())
+        self.__session_id = get_random_string(12)
+
+    def do_get_property(self, prop):
+        """
+            Return property value
+            @param prop as GObject.ParamSpec
+        """
+        return False
+
+    def restore_session_state(self, state):
+        """
+            Keep state, will be restored in real WebView
+            @param state as WebKit2.WebViewSessionState
+        """
+        self.__state = state
+
+    def get_session_state(self):
+        """
+            Get session state, load it from session db if needed
+            @return WebKit2.WebViewSessionState/None
+        """
+        if self.__state is None:
+            data = El().session.get_state(self.__session_id)
+            if data is not None:
+                self.__state = WebKit2.WebViewSessionState(
+                                                        GLib.Bytes.new(data))
+        return self.__state
+
+    def load_uri(self, uri):
+        """
+            Set uri, will be loaded when shown
+            @param uri as str
+        """
+        self.set_uri(uri)
+
+    def set_uri(self, uri):
+        """
+            Set delayed uri
+            @param uri as str
+        """
+        self.__uri = uri
+        self.__netloc = get_netloc(uri)
+        self.emit("uri-changed", uri)
+
+    def set_title(self, title):
+        """
+            Set title
+            @param title as str
+        """
+        self.__title = title
+        self.emit("title-changed", title)
+
+    def set_atime(self, atime):
+        """
+            Update access time
+            @param atime as int
+        """
+        self.__atime = atime
+
+    def set_gtime(self, gtime):
+        """
+            Update group time
+            @param gtime as int
+        """
+        self.__gtime = gtime
+
+    def set_session_id(self, session_id):
+        """
+            Set session id
+            @param session_id as str
+        """
+        self.__session_id = session_id
+
+    def set_view(self, view):
+        """
+            Set view
+            @param view as View
+        """
+        self.__view = view
+
+    def set_window(self, window):
+        """
+            Set window
+            @param window as Window
+        """
+        self.__window = window
+
+    def set_setting(self, key, value):
+        """
+            Nothing to do, settings are read on WebView creation
+            @param key as str
+            @param value as GLib.Variant
+        """
+        pass
+
+    def update_zoom_level(self):
+        """
+            Nothing to do, zoom is set on WebView creation
+        """
+        pass
+
+    def stop_loading(self):
+        """
+            Nothing to stop
+        """
+        pass
+
+    def get_title(self):
+        """
+            Get title
+            @return str
+        """
+        return self.__title
+
+    def get_uri(self):
+        """
+            Get uri
+            @return str
+        """
+        return self.__uri
+
+    def is_loading(self):
+        """
+            Never loading
+            @return bool
+        """
+        return False
+
+    def is_playing_audio(self):
+        """
+            Never playing audio
+            @return bool
+        """
+        return False
+
+    @property
+    def _window(self):
+        """
+            Get window, same as WebView._window
+            @return Window
+        """
+        return self.__window
+
+    @property
+    def uri(self):
+        """
+            Get uri
+            @return str
+        """
+        return self.__uri
+
+    @property
+    def netloc(self):
+        """
+            Get netloc
+            @return str
+        """
+        return self.__netloc
+
+    @property
+    def title(self):
+        """
+            Get title
+            @return str
+        """
+        if self.__title is None:
+            return self.__uri
+        return self.__title
+
+    @property
+    def atime(self):
+        """
+            Get access time
+            @return int
+        """
+        return self.__atime
+
+    @property
+    def gtime(self):
+        """
+            Get group time
+            @return int
+        """
+        return self.__gtime
+
+    @property
+    def session_id(self):
+        """
+            Get session id
+            @return str
+        """
+        return self.__session_id
+
+    @property
+    def ephemeral(self):
+        """
+            True if page is private/ephemeral
+            @return bool
+        """
+        return self.__ephemeral
+
+    @property
+    def view(self):
+        """
+            Get view
+            @return View
+        """
+        return self.__view
+
+    @property
+    def shown(self):
+        """
+            Never shown
+            @return bool
+        """
+        return False
+
+    @property
+    def popups(self):
+        """
+            No popups
+            @return []
+        """
+        return []
+
+    @property
+    def profile(self):
+        """
+            No profile
+            @return None
+        """
+        return None
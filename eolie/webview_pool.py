@@ -0,0 +1,190 @@
+# Copyright (c) 2017 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from gi.repository import GLib, Gio
+
+from time import time
+
+from eolie.view import View
+from eolie.define import El
+from eolie.utils import debug
+
+
+class WebViewPool:
+    """
+        Pool of preloaded webviews, one for normal pages, one for ephemeral
+        Pool size follows how many pages user opened recently
+    """
+
+    # Only count pages opened in this period (seconds)
+    __PERIOD = 300
+    # One more preloaded webview per __STEP pages opened in __PERIOD
+    __STEP = 3
+
+    def __init__(self, window):
+        """
+            Init pool
+            @param window as Window
+        """
+        self.__window = window
+        self.__pools = {False: [], True: []}
+        self.__opened = {False: [], True: []}
+        self.__hits = 0
+        self.__misses = 0
+        self.__low_memory = False
+        self.__stopped = False
+        self.__warm_id = None
+        self.__max = El().settings.get_value(
+                                         "preloaded-webviews").get_int32()
+        # Ignore stupid values
+        if self.__max < 0 or self.__max > 20:
+            self.__max = 0
+        # Gio.MemoryMonitor needs GLib >= 2.64
+        try:
+            self.__memory_monitor = Gio.MemoryMonitor.dup_default()
+            self.__memory_id = self.__memory_monitor.connect(
+                "low-memory-warning", self.__on_low_memory_warning)
+        except:
+            self.__memory_monitor = None
+            self.__memory_id = None
+        self.__trim_id = GLib.timeout_add_seconds(60, self.__on_trim_timeout)
+
+    def get(self, ephemeral):
+        """
+            Get a webview, from pool if possible
+            @param ephemeral as bool
+            @return WebView
+        """
+        self.__opened[ephemeral].append(time())
+        if self.__pools[ephemeral]:
+            self.__hits += 1
+            webview = self.__pools[ephemeral].pop(0)
+        else:
+            self.__misses += 1
+            webview = View.get_new_webview(ephemeral, self.__window)
+        self.warm()
+        return webview
+
+    def warm(self):
+        """
+            Fill pools when idle
+        """
+        if self.__warm_id is None and not self.__stopped:
+            self.__warm_id = GLib.idle_add(self.__on_warm_idle,
+                                           priority=GLib.PRIORITY_LOW)
+
+    def stop(self):
+        """
+            Stop pool and destroy preloaded webviews
+        """
+        self.__stopped = True
+        # Monitor is process wide, it would keep this pool alive
+        if self.__memory_id is not None:
+            self.__memory_monitor.disconnect(self.__memory_id)
+            self.__memory_id = None
+        if self.__warm_id is not None:
+            GLib.source_remove(self.__warm_id)
+            self.__warm_id = None
+        if self.__trim_id is not None:
+            GLib.source_remove(self.__trim_id)
+            self.__trim_id = None
+        for ephemeral in self.__pools.keys():
+            self.__trim(ephemeral, 0)
+
+    @property
+    def hits(self):
+        """
+            Get how many webviews were served from pool
+            @return int
+        """
+        return self.__hits
+
+    @property
+    def misses(self):
+        """
+            Get how many webviews were created on demand
+            @return int
+        """
+        return self.__misses
+
+    @property
+    def size(self):
+        """
+            Get preloaded webviews count
+            @return int
+        """
+        return len(self.__pools[False]) + len(self.__pools[True])
+
+#######################
+# PRIVATE             #
+#######################
+    def __get_wanted(self, ephemeral):
+        """
+            Get wanted pool size
+            @param ephemeral as bool
+            @return int
+        """
+        if self.__low_memory:
+            return 0
+        limit = time() - self.__PERIOD
+        opened = [t for t in self.__opened[ephemeral] if t > limit]
+        self.__opened[ephemeral] = opened
+        # Always keep one normal webview, new page is a common action
+        if ephemeral and not opened:
+            wanted = 0
+        else:
+            wanted = 1 + len(opened) // self.__STEP
+        return min(wanted, self.__max)
+
+    def __trim(self, ephemeral, wanted):
+        """
+            Destroy webviews above wanted size
+            @param ephemeral as bool
+            @param wanted as int
+        """
+        pool = self.__pools[ephemeral]
+        while len(pool) > wanted:
+            pool.pop(-1).destroy()
+
+    def __on_warm_idle(self):
+        """
+            Preload one webview, continue while pools are not full
+        """
+        for ephemeral in [False, True]:
+            if len(self.__pools[ephemeral]) < self.__get_wanted(ephemeral):
+                webview = View.get_new_webview(ephemeral, self.__window)
+                self.__pools[ephemeral].append(webview)
+                return True
+        self.__warm_id = None
+
+    def __on_trim_timeout(self):
+        """
+            Shrink pools when user stops opening pages
+        """
+        for ephemeral in [False, True]:
+            self.__trim(ephemeral, self.__get_wanted(ephemeral))
+        # Allow warming again
+        self.__low_memory = False
+        debug("WebViewPool: %s hits, %s misses, %s preloaded" %
+              (self.__hits, self.__misses, self.size))
+        return True
+
+    def __on_low_memory_warning(self, monitor, level):
+        """
+            Release preloaded webviews
+            @param monitor as Gio.MemoryMonitor
+            @param level as Gio.MemoryMonitorWarningLevel
+        """
+        self.__low_memory = True
+        debug("WebViewPool: low memory, releasing preloaded webviews")
+        for ephemeral in self.__pools.keys():
+            self.__trim(ephemeral, 0)
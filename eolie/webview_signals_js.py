@@ -22,6 +22,9 @@ class WebViewJsSignals:
         Handle webview scripts signals
     """
 
+    # Resources remembered for a page, see get_resource()
+    __MAX_RESOURCES = 1000
+
     def __init__(self):
         """
             Init class
@@ -29,7 +32,17 @@ class WebViewJsSignals:
         self.__google_fix_count = 0
         self.__js_blocker_count = 0
         self.__js_blocker_timeout_id = None
+        self.__resources = {}
         self.connect("script-dialog", self.__on_script_dialog)
+        self.connect("load-changed", self.__on_load_changed)
+
+    def get_resource(self, uri):
+        """
+            Get resource loaded by current page while shown
+            @param uri as str
+            @return WebKit2.WebResource/None
+        """
+        return self.__resources.get(uri, None)
 
 #######################
 # PROTECTED           #
@@ -100,6 +113,15 @@ class WebViewJsSignals:
                                                        self.__reset_js_blocker)
         return True
 
+    def __on_load_changed(self, webview, event):
+        """
+            Forget previous page resources
+            @param webview as WebView
+            @param event as WebKit2.LoadEvent
+        """
+        if event == WebKit2.LoadEvent.STARTED:
+            self.__resources = {}
+
     def __on_resource_load_started(self, webview, resource, request):
         """
             Listen to off loading events
@@ -107,6 +129,9 @@ class WebViewJsSignals:
             @param resource WebKit2.WebResource
             @param request as WebKit2.URIRequest
         """
+        # Allow reusing data, see ImagesPopover
+        if len(self.__resources) < self.__MAX_RESOURCES:
+            self.__resources[resource.get_uri()] = resource
         # Javascript execution happened
         if self.current_event == WebKit2.LoadEvent.FINISHED:
             # Special google notifications fix
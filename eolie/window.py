@@ -401,7 +401,7 @@ class Window(Gtk.ApplicationWindow):
             else:
                 self.fullscreen()
         elif string == "quit":
-            El().quit(True)
+            El().quit()
         elif string == "new_page":
             self.container.add_webview(El().start_page, LoadingType.FOREGROUND)
         elif string == "close_page":